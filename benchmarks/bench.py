@@ -0,0 +1,463 @@
+"""Offline refresh benchmark for the NZ WITS integration.
+
+Drives WitsApiClient, WitsHub and one WitsDataUpdateCoordinator per node
+against the local stand-in in ``fake_wits.py``, and reports requests per
+cycle, refresh wall time (p50/p99), CPU time per cycle and peak memory.
+
+Run from the repository root, with Home Assistant installed:
+
+    python -m benchmarks.bench --nodes 1 10 100 500 --cycles 20
+    python -m benchmarks.bench --nodes 100 --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench --nodes 100 --compare benchmarks/baseline.json
+    python -m benchmarks.bench --nodes 100 --dedicated-session
+    python -m benchmarks.bench --nodes 100 500 --hub-entry
+    python -m benchmarks.bench --nodes 10 100 --soak --soak-days 30
+
+With ``--compare``, the run exits non-zero if any metric is worse than the
+baseline by more than ``--tolerance``.
+
+With ``--soak``, each node count instead replays ``--soak-days`` of 5-minute
+cycles on a simulated clock, rendering every sensor's state as Home Assistant
+would, and exits non-zero if memory retained by the integration grows by more
+than ``--max-retained-kib`` per node between the end of the warm-up and the
+end of the run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterator
+from unittest import mock
+
+import aiohttp
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.nz_wits import auth as auth_module, hub as hub_module, sensor as sensor_module
+from custom_components.nz_wits.api import WitsApiClient
+from custom_components.nz_wits.const import CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_NODE, DOMAIN
+from custom_components.nz_wits.coordinator import WitsDataUpdateCoordinator, WitsHubCoordinator
+from custom_components.nz_wits.hub import WitsHub
+from custom_components.nz_wits.resilience import RequestPolicy
+from custom_components.nz_wits.session import WitsSession
+
+from .fake_wits import FakeWitsConfig, FakeWitsServer
+
+# Metrics compared against a baseline; all are "lower is better"
+COMPARED_METRICS = ("requests_per_cycle", "p50_ms", "p99_ms", "cpu_ms_per_cycle", "peak_kib")
+
+SOAK_CYCLE = timedelta(minutes=5)
+SOAK_WARMUP = timedelta(days=2)  # Long enough for every window and forecast ring to fill
+# Imports and tracemalloc's own snapshots are not retained by the run
+SOAK_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Return the pct-th percentile of values (nearest rank)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class SimulatedClock:
+    """A wall clock the soak test moves forward instead of waiting for it.
+
+    While active it stands in for Home Assistant's ``utcnow``, the clocks the
+    hub result cache and the token manager read, and the fake server's clock,
+    so a month of polling plays out in minutes. The hub's batching window is
+    dropped too, as it would otherwise dominate every simulated cycle.
+    """
+
+    def __init__(self, server: FakeWitsServer, start: datetime) -> None:
+        self.server = server
+        self.now = start
+
+    def advance(self, delta: timedelta) -> None:
+        """Move the clock forward."""
+        self.now += delta
+        self.server.now = self.now
+
+    def _timestamp(self) -> float:
+        return self.now.timestamp()
+
+    @contextlib.contextmanager
+    def active(self) -> Iterator[SimulatedClock]:
+        """Patch the clocks for the duration of the block."""
+        clock = SimpleNamespace(
+            time=self._timestamp, monotonic=self._timestamp, perf_counter=time.perf_counter
+        )
+        self.server.now = self.now
+        with mock.patch.object(dt_util, "utcnow", lambda: self.now), \
+                mock.patch.object(hub_module, "time", clock), \
+                mock.patch.object(auth_module, "time", clock), \
+                mock.patch.object(hub_module, "HUB_BATCH_WINDOW", 0):
+            yield self
+
+
+class Harness:
+    """A Home Assistant core, a fake WITS server and coordinators for N nodes.
+
+    With ``hub_entry`` the nodes are driven by one WitsHubCoordinator, as in a
+    multi-node hub config entry, instead of refreshing independently.
+    """
+
+    def __init__(
+        self,
+        node_count: int,
+        server_config: FakeWitsConfig,
+        dedicated_session: bool = False,
+        hub_entry: bool = False,
+    ) -> None:
+        self.node_count = node_count
+        self.hub_entry = hub_entry
+        self.hub_coordinator: WitsHubCoordinator | None = None
+        self.dedicated_session = dedicated_session
+        self.wits_session: WitsSession | None = None
+        self.server = FakeWitsServer(server_config)
+        self.coordinators: list[WitsDataUpdateCoordinator] = []
+        self._config_dir = tempfile.TemporaryDirectory()
+        self.hass: HomeAssistant | None = None
+        self.session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> Harness:
+        base_url = await self.server.start()
+        self.hass = HomeAssistant(self._config_dir.name)
+        if self.dedicated_session:
+            self.wits_session = WitsSession()
+            self.session = self.wits_session.session
+        else:
+            self.session = aiohttp.ClientSession()
+        config = {CONF_CLIENT_ID: "bench", CONF_CLIENT_SECRET: "secret", CONF_NODE: None}
+        client = WitsApiClient(
+            config,
+            self.session,
+            # The production budget would throttle hundreds of nodes in a tight loop
+            policy=RequestPolicy(requests_per_minute=1_000_000),
+            base_url=base_url,
+        )
+        hub = WitsHub(client)
+        for i in range(self.node_count):
+            node = f"BEN{i:04d}"
+            hub.register_node(node)
+            self.coordinators.append(
+                WitsDataUpdateCoordinator(self.hass, hub, node, driven=self.hub_entry)
+            )
+        if self.hub_entry:
+            self.hub_coordinator = WitsHubCoordinator(
+                self.hass, hub, {c.node: c for c in self.coordinators}
+            )
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self.hub_coordinator is not None:
+            await self.hub_coordinator.async_shutdown()
+        for coordinator in self.coordinators:
+            await coordinator.async_shutdown()
+        await self.session.close()
+        await self.server.stop()
+        await self.hass.async_stop(force=True)
+        self._config_dir.cleanup()
+
+    def create_sensors(self) -> list[sensor_module.WitsScheduleEntity]:
+        """Create every node's sensors as the sensor platform would, without a platform.
+
+        The sensors register their schedules with the coordinators, so only
+        what they show is fetched.
+        """
+        entry = ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title="WITS soak test",
+            data={CONF_NODE: self.coordinators[0].node},
+            source="user",
+            options={},
+        )
+        sensors = []
+        for coordinator in self.coordinators:
+            for factory in sensor_module._wanted_sensors(coordinator, entry).values():
+                entity = factory()
+                entity.hass = self.hass
+                entity.entity_id = f"sensor.wits_soak_{len(sensors)}"
+                sensors.append(entity)
+        return sensors
+
+    async def run_cycle(self) -> float:
+        """Refresh every schedule on every node; return the wall time in seconds."""
+        for coordinator in self.coordinators:
+            for schedule in coordinator.fetch_plan:
+                coordinator.async_mark_due(schedule)
+        start = time.perf_counter()
+        if self.hub_coordinator is not None:
+            await self.hub_coordinator.async_refresh()
+        else:
+            await asyncio.gather(*(c.async_refresh() for c in self.coordinators))
+        return time.perf_counter() - start
+
+    async def run_soak_cycle(self) -> None:
+        """Refresh whatever is due on the current (simulated) clock."""
+        if self.hub_coordinator is not None:
+            await self.hub_coordinator.async_refresh()
+        else:
+            await asyncio.gather(*(c.async_refresh() for c in self.coordinators))
+
+
+async def run_benchmark(
+    node_count: int,
+    cycles: int,
+    server_config: FakeWitsConfig,
+    dedicated_session: bool = False,
+    hub_entry: bool = False,
+) -> dict[str, Any]:
+    """Run ``cycles`` refresh cycles for ``node_count`` nodes and return the metrics."""
+    tracemalloc.start()
+    async with Harness(node_count, server_config, dedicated_session, hub_entry) as harness:
+        await harness.run_cycle()  # Warm up: token, first full windows
+        before = harness.server.stats.snapshot()
+        tracemalloc.reset_peak()
+
+        wall_times = []
+        cpu_start = time.process_time()
+        for _ in range(cycles):
+            wall_times.append(await harness.run_cycle())
+        cpu = time.process_time() - cpu_start
+        _, peak = tracemalloc.get_traced_memory()
+
+        after = harness.server.stats.snapshot()
+        failed = sum(1 for c in harness.coordinators if not c.last_update_success)
+        pool = harness.wits_session.stats.as_dict() if harness.wits_session else None
+    tracemalloc.stop()
+
+    requests = (after["price_requests"] + after["token_requests"]) - (
+        before["price_requests"] + before["token_requests"]
+    )
+    return {
+        "nodes": node_count,
+        "cycles": cycles,
+        "requests_per_cycle": requests / cycles,
+        "token_requests": after["token_requests"] - before["token_requests"],
+        "bytes_per_cycle": (after["bytes_sent"] - before["bytes_sent"]) / cycles,
+        "p50_ms": statistics.median(wall_times) * 1000,
+        "p99_ms": _percentile(wall_times, 99) * 1000,
+        "cpu_ms_per_cycle": cpu / cycles * 1000,
+        "peak_kib": peak / 1024,
+        "failed_coordinators": failed,
+        "connection_pool": pool,
+    }
+
+
+async def run_soak(
+    node_count: int,
+    days: float,
+    server_config: FakeWitsConfig,
+    dedicated_session: bool = False,
+    hub_entry: bool = False,
+) -> dict[str, Any]:
+    """Replay ``days`` of 5-minute cycles and return how much memory the integration kept.
+
+    Only the schedules that are due are polled, as in production. After each
+    cycle, every sensor whose data changed has its state and attributes
+    rendered, as a state write would. Retained memory is everything still
+    allocated at the end of the run that was not at the end of the warm-up;
+    the harness holds nothing else that should grow. Tracing one frame per
+    allocation keeps a month of cycles to minutes.
+    """
+    tracemalloc.start()
+    async with Harness(node_count, server_config, dedicated_session, hub_entry) as harness:
+        start = datetime.fromtimestamp(time.time() // 1800 * 1800, timezone.utc)
+        clock = SimulatedClock(harness.server, start)
+        with clock.active():
+            sensors = harness.create_sensors()
+            cycles = 0
+            warmup_end = start + SOAK_WARMUP
+            end = warmup_end + timedelta(days=days)
+            next_day = warmup_end
+            baseline: tracemalloc.Snapshot | None = None
+            traced_at_baseline = 0
+            daily_kib: list[float] = []
+            wall_start = time.perf_counter()
+            while clock.now < end:
+                await harness.run_soak_cycle()
+                for entity in sensors:
+                    # The same test as the sensors' coordinator update handler
+                    available = entity.available
+                    if entity._data_changed() or available != entity._written_available:
+                        entity._written_available = available
+                        entity._async_calculate_state()
+                cycles += 1
+                clock.advance(SOAK_CYCLE)
+                if clock.now < next_day:
+                    continue
+                if baseline is None:
+                    baseline = _retained_snapshot()
+                    traced_at_baseline = tracemalloc.get_traced_memory()[0]
+                else:
+                    gc.collect()
+                    daily_kib.append((tracemalloc.get_traced_memory()[0] - traced_at_baseline) / 1024)
+                next_day += timedelta(days=1)
+            wall = time.perf_counter() - wall_start
+            final = _retained_snapshot()
+        failed = sum(1 for c in harness.coordinators if not c.last_update_success)
+        requests = harness.server.stats.snapshot()["price_requests"]
+    tracemalloc.stop()
+
+    retained = _traced_kib(final) - _traced_kib(baseline)
+    return {
+        "nodes": node_count,
+        "days": days,
+        "cycles": cycles,
+        "sensors": len(sensors),
+        "price_requests": requests,
+        "wall_s": wall,
+        "baseline_kib": _traced_kib(baseline),
+        "retained_kib": retained,
+        "retained_kib_per_node": retained / node_count,
+        "daily_growth_kib": [round(kib, 1) for kib in daily_kib],
+        "top_growth": [
+            str(stat) for stat in final.compare_to(baseline, "lineno")[:5] if stat.size_diff > 0
+        ],
+        "failed_coordinators": failed,
+    }
+
+
+def _retained_snapshot() -> tracemalloc.Snapshot:
+    """Return the allocations still live after a full garbage collection."""
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(SOAK_TRACE_FILTERS)
+
+
+def _traced_kib(snapshot: tracemalloc.Snapshot) -> float:
+    """Return the total size of a snapshot's allocations in KiB."""
+    return sum(trace.size for trace in snapshot.traces) / 1024
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed beyond tolerance."""
+    by_nodes = {entry["nodes"]: entry for entry in baseline}
+    regressions = []
+    for result in results:
+        base = by_nodes.get(result["nodes"])
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = base[metric], result[metric]
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(
+                    f"{result['nodes']} nodes: {metric} {old:.1f} -> {new:.1f} (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def _print_table(results: list[dict[str, Any]]) -> None:
+    columns = ("nodes", "requests_per_cycle", "p50_ms", "p99_ms", "cpu_ms_per_cycle", "peak_kib", "bytes_per_cycle")
+    print("  ".join(f"{c:>18}" for c in columns))
+    for result in results:
+        print("  ".join(f"{result[c]:>18.1f}" if isinstance(result[c], float) else f"{result[c]:>18}" for c in columns))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of price requests that fail")
+    parser.add_argument("--token-ttl", type=int, default=3600, help="Token lifetime in seconds")
+    parser.add_argument("--extra-fields", type=int, default=4, help="Unused fields added to every price")
+    parser.add_argument(
+        "--dedicated-session", action="store_true", help="Use the integration's tuned keep-alive session"
+    )
+    parser.add_argument(
+        "--hub-entry", action="store_true", help="Drive the nodes from one hub coordinator"
+    )
+    parser.add_argument(
+        "--soak", action="store_true", help="Replay a long run on a simulated clock and check memory"
+    )
+    parser.add_argument("--soak-days", type=float, default=30, help="Simulated days after warm-up")
+    parser.add_argument(
+        "--max-retained-kib", type=float, default=16.0,
+        help="Allowed growth in retained memory per node over the soak",
+    )
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    server_config = FakeWitsConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+        extra_fields=args.extra_fields,
+    )
+    if args.soak:
+        return _soak(args, server_config)
+    results = [
+        asyncio.run(
+            run_benchmark(
+                nodes, args.cycles, server_config, args.dedicated_session, args.hub_entry
+            )
+        )
+        for nodes in args.nodes
+    ]
+    _print_table(results)
+    for result in results:
+        if result["connection_pool"]:
+            print(f"{result['nodes']} nodes connection pool: {result['connection_pool']}")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+def _soak(args: argparse.Namespace, server_config: FakeWitsConfig) -> int:
+    """Run the soak test for each node count and report whether memory stayed bounded."""
+    exceeded = False
+    for nodes in args.nodes:
+        result = asyncio.run(
+            run_soak(nodes, args.soak_days, server_config, args.dedicated_session, args.hub_entry)
+        )
+        verdict = "ok" if result["retained_kib_per_node"] <= args.max_retained_kib else "FAIL"
+        exceeded |= verdict == "FAIL"
+        print(
+            f"{nodes} nodes, {result['days']:g} days ({result['cycles']} cycles, "
+            f"{result['sensors']} sensors, {result['price_requests']} price requests) in "
+            f"{result['wall_s']:.0f} s: retained {result['retained_kib']:.1f} KiB over "
+            f"{result['baseline_kib']:.1f} KiB after warm-up, "
+            f"{result['retained_kib_per_node']:.2f} KiB/node (limit {args.max_retained_kib:g}) {verdict}"
+        )
+        print(f"  growth by day (KiB): {result['daily_growth_kib']}")
+        if result["failed_coordinators"]:
+            print(f"  {result['failed_coordinators']} coordinators failed their last refresh")
+        if verdict == "FAIL":
+            for line in result["top_growth"]:
+                print(f"  {line}")
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
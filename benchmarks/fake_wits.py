@@ -0,0 +1,164 @@
+"""A local stand-in for the WITS token and prices endpoints.
+
+Serves enough of the API for WitsApiClient: client-credentials tokens with a
+configurable lifetime, and price responses for any set of nodes honouring the
+``schedules``, ``back``, ``forward``, ``offset`` and ``nodes`` parameters. Latency, extra
+payload per price and a failure rate can be injected.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import secrets
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+TOKEN_PATH = "/login/oauth2/token"
+PRICES_PATH = "/api/market-prices/v1/prices"
+
+NZ = ZoneInfo("Pacific/Auckland")
+PERIOD = timedelta(minutes=30)
+
+
+@dataclass
+class FakeWitsConfig:
+    """Behaviour of the stand-in server."""
+
+    latency: float = 0.0  # Seconds added to every response
+    error_rate: float = 0.0  # Fraction of price requests answered with HTTP 500
+    token_ttl: int = 3600  # Seconds a token stays valid
+    extra_fields: int = 4  # Unused fields added to every price, to grow the payload
+    seed: int = 0
+
+
+@dataclass
+class FakeWitsStats:
+    """Requests the server has answered."""
+
+    token_requests: int = 0
+    price_requests: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    nodes_requested: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        """Return the counters as a dict."""
+        return dict(self.__dict__)
+
+
+@dataclass
+class FakeWitsServer:
+    """Runs the stand-in on a local port."""
+
+    config: FakeWitsConfig = field(default_factory=FakeWitsConfig)
+    stats: FakeWitsStats = field(default_factory=FakeWitsStats)
+    now: datetime | None = None  # Simulated wall clock; real time if None
+
+    def __post_init__(self) -> None:
+        self._tokens: dict[str, float] = {}
+        self._random = random.Random(self.config.seed)
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def start(self) -> str:
+        """Start serving and return the base URL."""
+        app = web.Application()
+        app.router.add_post(TOKEN_PATH, self._handle_token)
+        app.router.add_get(PRICES_PATH, self._handle_prices)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def expire_tokens(self) -> None:
+        """Invalidate every token issued so far."""
+        self._tokens.clear()
+
+    async def _handle_token(self, request: web.Request) -> web.Response:
+        self.stats.token_requests += 1
+        form = await request.post()
+        if not form.get("client_id") or not form.get("client_secret"):
+            return web.json_response({"error": "invalid_client"}, status=401)
+        await self._delay()
+        now = self._clock()
+        # Forget expired tokens, so a long run does not accumulate them
+        self._tokens = {t: expires for t, expires in self._tokens.items() if expires >= now}
+        token = secrets.token_hex(16)
+        self._tokens[token] = now + self.config.token_ttl
+        return web.json_response(
+            {"access_token": token, "token_type": "Bearer", "expires_in": self.config.token_ttl}
+        )
+
+    async def _handle_prices(self, request: web.Request) -> web.Response:
+        self.stats.price_requests += 1
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        expires = self._tokens.get(token)
+        if expires is None or expires < self._clock():
+            return web.json_response({"error": "invalid_token"}, status=401)
+        await self._delay()
+        if self._random.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return web.json_response({"error": "injected"}, status=500)
+
+        schedule = request.query.get("schedules", "RTD")
+        nodes = [n for n in request.query.get("nodes", "").split(",") if n]
+        back = int(request.query.get("back", 0))
+        forward = int(request.query.get("forward", 0))
+        offset = int(request.query.get("offset", 0))
+        self.stats.nodes_requested += len(nodes)
+
+        now = self.now or datetime.now(timezone.utc)
+        current = datetime.fromtimestamp(
+            int(now.timestamp()) // 1800 * 1800, timezone.utc
+        ) - PERIOD * offset
+        if back:
+            starts = [current - PERIOD * i for i in range(back - 1, -1, -1)]
+        elif forward:
+            starts = [current + PERIOD * i for i in range(forward)]
+        else:
+            starts = [current]
+
+        prices = [
+            self._price(schedule, node, start)
+            for node in nodes
+            for start in starts
+        ]
+        response = web.json_response([{"schedule": schedule, "prices": prices}])
+        self.stats.bytes_sent += len(response.body)
+        return response
+
+    def _price(self, schedule: str, node: str, start: datetime) -> dict:
+        local = start.astimezone(NZ)
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        price = {
+            "schedule": schedule,
+            "node": node,
+            "tradingDateTime": local.isoformat(),
+            "tradingPeriod": int((start - midnight.astimezone(timezone.utc)) / PERIOD) + 1,
+            "price": round(self._random.uniform(20, 400), 2),
+            "lastRunTime": local.isoformat(),
+            "isProxyPriceFlag": "N",
+        }
+        for i in range(self.config.extra_fields):
+            price[f"extra{i}"] = f"value-{i}-{node}"
+        return price
+
+    def _clock(self) -> float:
+        """Return the server's time in seconds, simulated if ``now`` is set."""
+        return self.now.timestamp() if self.now is not None else time.monotonic()
+
+    async def _delay(self) -> None:
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
@@ -7,23 +7,58 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady, ConfigEntryAuthFailed
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.typing import ConfigType
 
-from .api import WitsApiClient, CannotConnect, InvalidAuth
-from .const import DOMAIN, CONF_NODE
-from .coordinator import WitsDataUpdateCoordinator
+from .analytics import window_hours_from_options
+from .resample import resampling_from_options
+from .api import CannotConnect, InvalidAuth
+from .backfill import async_get_backfill_manager
+from .cache import WitsDataCache
+from .const import (
+    DOMAIN,
+    CONF_NODE,
+    CONF_NODES,
+    CONF_DEDICATED_SESSION,
+    CONF_MAX_RETRIES,
+    CONF_REQUESTS_PER_MINUTE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    SIGNAL_OPTIONS_UPDATED,
+)
+from .coordinator import (
+    WitsDataUpdateCoordinator,
+    WitsHubCoordinator,
+    enabled_schedules_from_options,
+)
+from .hub import (
+    async_get_hub,
+    async_release_hub,
+    async_set_dedicated_session,
+    config_nodes,
+)
+from .resilience import RequestPolicy
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
 # List the platforms that you want to support.
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the NZ WITS Spot Price integration."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up NZ WITS Spot Price from a config entry."""
-    session = async_get_clientsession(hass)
-    # Pass the whole entry.data to WitsApiClient, as it expects a config dict
-    api_client = WitsApiClient(entry.data, session)
+    if CONF_NODES in entry.data:
+        return await _async_setup_hub_entry(hass, entry)
 
     # Get the WITS node (region) from the config entry
     # It's assumed CONF_NODE is defined in your const.py and present in entry.data
@@ -35,7 +70,35 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         return False
 
 
-    coordinator = WitsDataUpdateCoordinator(hass, api_client, wits_node)
+    # Entries sharing credentials share one hub, which batches their nodes
+    # into a single request per schedule.
+    hub = await async_get_hub(
+        hass,
+        entry.data,
+        entry.entry_id,
+        request_policy_from_options(entry.options),
+        entry.options.get(CONF_DEDICATED_SESSION, False),
+    )
+    cache = WitsDataCache(hass, entry.entry_id)
+    coordinator = WitsDataUpdateCoordinator(
+        hass,
+        hub,
+        wits_node,
+        enabled_schedules_from_options(entry.options),
+        cache,
+        window_hours_from_options(entry.options),
+        resampling=resampling_from_options(entry.options),
+    )
+
+    if (cached_data := await cache.async_load()) is not None:
+        # Bring entities up from the last good data and refresh in the background,
+        # so a restart does not depend on WITS being reachable.
+        coordinator.async_restore(cached_data)
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} warm-start refresh ({wits_node})"
+        )
+        await _async_finish_setup(hass, entry, coordinator)
+        return True
 
     try:
         # Perform initial refresh to fetch data and confirm API access.
@@ -45,31 +108,150 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         # If auth fails during the first refresh, raise ConfigEntryAuthFailed
         # This will typically prompt the user to reconfigure or re-authenticate.
         _LOGGER.error("Authentication failed during initial WITS data refresh: %s", err)
+        async_release_hub(hass, entry.data, entry.entry_id)
         raise ConfigEntryAuthFailed(f"Authentication failed: {err}") from err
     except (CannotConnect, Exception) as err:
         # For other connection errors or unexpected issues during first refresh,
         # raise ConfigEntryNotReady to allow Home Assistant to retry setup later.
         _LOGGER.error("Error connecting to WITS API during initial refresh: %s", err)
+        async_release_hub(hass, entry.data, entry.entry_id)
         raise ConfigEntryNotReady(f"Failed to connect to WITS API: {err}") from err
 
+    await _async_finish_setup(hass, entry, coordinator)
+    return True
+
+
+async def _async_setup_hub_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up a hub entry: one coordinator driving every node it monitors.
+
+    Each node keeps its own warm-start cache. If any node has cached data, the
+    entry comes up from it and the first batched refresh runs in the background.
+    """
+    hub = await async_get_hub(
+        hass,
+        entry.data,
+        entry.entry_id,
+        request_policy_from_options(entry.options),
+        entry.options.get(CONF_DEDICATED_SESSION, False),
+    )
+    enabled_schedules = enabled_schedules_from_options(entry.options)
+    window_hours = window_hours_from_options(entry.options)
+    resampling = resampling_from_options(entry.options)
+    caches = {node: _node_cache(hass, entry, node) for node in config_nodes(entry.data)}
+    coordinator = WitsHubCoordinator(
+        hass,
+        hub,
+        {
+            node: WitsDataUpdateCoordinator(
+                hass,
+                hub,
+                node,
+                enabled_schedules,
+                cache,
+                window_hours,
+                driven=True,
+                resampling=resampling,
+            )
+            for node, cache in caches.items()
+        },
+    )
+
+    restored = False
+    for node, node_coordinator in coordinator.nodes.items():
+        if (cached_data := await caches[node].async_load()) is not None:
+            node_coordinator.async_restore(cached_data)
+            restored = True
+    if restored:
+        # Nodes without cached data come up with the background refresh
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} warm-start refresh ({entry.title})"
+        )
+        await _async_finish_setup(hass, entry, coordinator)
+        return True
+
+    try:
+        await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        await coordinator.async_shutdown()
+        async_release_hub(hass, entry.data, entry.entry_id)
+        raise
+
+    await _async_finish_setup(hass, entry, coordinator)
+    return True
+
+
+def _node_cache(hass: HomeAssistant, entry: ConfigEntry, node: str) -> WitsDataCache:
+    """Return the warm-start cache of one node of a hub entry."""
+    return WitsDataCache(hass, f"{entry.entry_id}.{node}")
+
+
+async def _async_finish_setup(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: WitsDataUpdateCoordinator | WitsHubCoordinator,
+) -> None:
+    """Store the coordinator, listen for option changes and set up platforms."""
+    # Add a listener to apply options updates (reloading if credentials/node changed)
+    setup_data = dict(entry.data)
+    # The options flow updates the data before reloading, so unload releases the hub
+    # with the data the entry was set up with
+    coordinator.setup_data = setup_data
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
 
-    # Add a listener to reload the integration when options are updated
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    async def _async_entry_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Apply schedule toggles and other options live; reload for data changes."""
+        if dict(entry.data) != setup_data:
+            await async_reload_entry(hass, entry)
+            return
+        coordinator.async_set_enabled_schedules(enabled_schedules_from_options(entry.options))
+        coordinator.async_set_window_hours(window_hours_from_options(entry.options))
+        coordinator.async_set_resampling(resampling_from_options(entry.options))
+        coordinator.hub.set_policy(entry.entry_id, request_policy_from_options(entry.options))
+        async_set_dedicated_session(
+            hass, coordinator.hub, entry.entry_id, entry.options.get(CONF_DEDICATED_SESSION, False)
+        )
+        async_dispatcher_send(hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id))
+
+    entry.async_on_unload(entry.add_update_listener(_async_entry_updated))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    return True
+    # Pick up any history import that was interrupted by a restart
+    if "recorder" in hass.config.components:
+        backfill = await async_get_backfill_manager(hass)
+        for node in config_nodes(entry.data):
+            backfill.async_resume(entry, coordinator.hub.api_client, node)
+
+
+def request_policy_from_options(options: dict) -> RequestPolicy:
+    """Return the request policy configured in an entry's options."""
+    return RequestPolicy(
+        max_retries=options.get(CONF_MAX_RETRIES, DEFAULT_MAX_RETRIES),
+        requests_per_minute=options.get(CONF_REQUESTS_PER_MINUTE, DEFAULT_REQUESTS_PER_MINUTE),
+    )
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator: WitsDataUpdateCoordinator | WitsHubCoordinator = hass.data[DOMAIN].pop(
+            entry.entry_id
+        )
+        await coordinator.async_shutdown()
+        async_release_hub(hass, coordinator.setup_data, entry.entry_id)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the warm-start cache when an entry is removed."""
+    if CONF_NODES in entry.data:
+        for node in config_nodes(entry.data):
+            await _node_cache(hass, entry, node).async_remove()
+        return
+    await WitsDataCache(hass, entry.entry_id).async_remove()
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle an options update."""
     await hass.config_entries.async_reload(entry.entry_id)
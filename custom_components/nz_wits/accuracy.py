@@ -0,0 +1,193 @@
+"""How far PRSS/PRSL forecasts ended up from the settled Interim prices."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from math import ceil, isnan, nan
+from typing import Any
+
+from .const import (
+    SCHEDULE_TYPES,
+    SCHEDULE_PRSS,
+    SCHEDULE_PRSL,
+    TRADING_PERIOD_SECONDS,
+    ACCURACY_MAX_SAMPLES,
+    ACCURACY_SETTLE_PERIODS,
+)
+from .series import PriceSeries
+from .trading_clock import current_period_start
+
+FORECAST_SCHEDULES = (SCHEDULE_PRSS, SCHEDULE_PRSL)
+
+_EMPTY = -1
+
+
+class ForecastRing:
+    """Recent forecasts of one schedule, as rows of a fixed-size array ring.
+
+    Each row is one forecast, identified by the start of the trading period it
+    was issued in; slot ``lead`` holds the price forecast for the period
+    ``lead`` periods later, or NaN once scored or if the forecast had none.
+    A later forecast issued in the same period replaces the row.
+    """
+
+    __slots__ = ("rows", "slots", "_issued", "_prices", "_newest")
+
+    def __init__(self, rows: int, slots: int) -> None:
+        """Allocate an empty ring."""
+        self.rows = rows
+        self.slots = slots
+        self._issued = array("q", [_EMPTY]) * rows
+        self._prices = array("d", [nan]) * (rows * slots)
+        self._newest = -1
+
+    def add(self, issued: int, series: PriceSeries) -> None:
+        """Record a forecast issued in the period starting at ``issued``."""
+        if self._newest < 0 or self._issued[self._newest] != issued:
+            self._newest = (self._newest + 1) % self.rows
+            self._issued[self._newest] = issued
+        base = self._newest * self.slots
+        prices = self._prices
+        for slot in range(base, base + self.slots):
+            prices[slot] = nan
+        timestamps = series.timestamps
+        for index in range(bisect_left(timestamps, issued), len(timestamps)):
+            lead = (timestamps[index] - issued) // TRADING_PERIOD_SECONDS
+            if lead >= self.slots:
+                break
+            prices[base + lead] = series.prices[index]
+
+    def score(self, actuals: dict[int, float]) -> list[tuple[int, float]]:
+        """Return (lead, forecast - actual) for every forecast period with an actual price.
+
+        Each forecast period is scored once; its slot is cleared afterwards.
+        """
+        errors = []
+        prices = self._prices
+        for row, issued in enumerate(self._issued):
+            if issued == _EMPTY:
+                continue
+            base = row * self.slots
+            for lead in range(self.slots):
+                forecast = prices[base + lead]
+                if isnan(forecast):
+                    continue
+                actual = actuals.get(issued + lead * TRADING_PERIOD_SECONDS)
+                if actual is not None:
+                    errors.append((lead, forecast - actual))
+                    prices[base + lead] = nan
+        return errors
+
+
+class LeadTimeErrors:
+    """Mean absolute error and bias per lead time, updated one error at a time.
+
+    Means are running averages. Once a lead time has ``max_samples`` errors,
+    each new one is weighted 1/``max_samples``, so the figures follow recent
+    forecast quality rather than freezing.
+    """
+
+    __slots__ = ("max_samples", "counts", "mae", "bias")
+
+    def __init__(self, slots: int, max_samples: int = ACCURACY_MAX_SAMPLES) -> None:
+        """Allocate zeroed statistics for ``slots`` lead times."""
+        self.max_samples = max_samples
+        self.counts = array("q", [0]) * slots
+        self.mae = array("d", [0.0]) * slots
+        self.bias = array("d", [0.0]) * slots
+
+    def add(self, lead: int, error: float) -> None:
+        """Fold in one forecast error, in $/MWh."""
+        count = self.counts[lead] + 1
+        self.counts[lead] = count
+        weight = min(count, self.max_samples)
+        self.mae[lead] += (abs(error) - self.mae[lead]) / weight
+        self.bias[lead] += (error - self.bias[lead]) / weight
+
+    @property
+    def samples(self) -> int:
+        """Return the number of errors recorded across every lead time."""
+        return sum(self.counts)
+
+    def overall(self) -> tuple[float, float] | None:
+        """Return the MAE and bias across lead times, weighted by their sample counts."""
+        weights = [min(count, self.max_samples) for count in self.counts]
+        total = sum(weights)
+        if not total:
+            return None
+        return (
+            sum(w * m for w, m in zip(weights, self.mae)) / total,
+            sum(w * b for w, b in zip(weights, self.bias)) / total,
+        )
+
+    def by_lead(self) -> list[dict[str, Any]]:
+        """Return the statistics of every lead time with samples, in $/kWh."""
+        return [
+            {
+                "lead_hours": lead * TRADING_PERIOD_SECONDS / 3600,
+                "mae": round(self.mae[lead] / 1000, 5),
+                "bias": round(self.bias[lead] / 1000, 5),
+                "samples": count,
+            }
+            for lead, count in enumerate(self.counts)
+            if count
+        ]
+
+
+class ForecastAccuracyTracker:
+    """Forecast snapshots and their errors for one node's PRSS and PRSL schedules.
+
+    Memory is fixed when the tracker is created: each schedule keeps enough
+    forecasts to cover its horizon until the Interim price settles, and one
+    set of statistics per lead time.
+    """
+
+    def __init__(self) -> None:
+        """Allocate a ring and statistics per forecast schedule."""
+        self._rings: dict[str, ForecastRing] = {}
+        self.errors: dict[str, LeadTimeErrors] = {}
+        for schedule_type in FORECAST_SCHEDULES:
+            info = SCHEDULE_TYPES[schedule_type]
+            slots = info["params"]["forward"] + 1
+            cadence = max(info["poll_interval"] // TRADING_PERIOD_SECONDS, 1)
+            rows = ceil((slots + ACCURACY_SETTLE_PERIODS) / cadence) + 1
+            self._rings[schedule_type] = ForecastRing(rows, slots)
+            self.errors[schedule_type] = LeadTimeErrors(slots)
+        # Schedules whose statistics changed in the last call to ``score``
+        self.changed: set[str] = set()
+
+    def record(self, schedule_type: str, series: PriceSeries, now: datetime) -> None:
+        """Keep a freshly fetched forecast until its periods can be scored."""
+        self._rings[schedule_type].add(current_period_start(now.timestamp()), series)
+
+    def score(self, actuals: PriceSeries, now: datetime) -> None:
+        """Score every kept forecast period that has ended and has a price in ``actuals``."""
+        ended = current_period_start(now.timestamp())
+        prices = {
+            timestamp: price
+            for timestamp, price in zip(actuals.timestamps, actuals.prices)
+            if timestamp < ended
+        }
+        self.changed = set()
+        for schedule_type, ring in self._rings.items():
+            errors = ring.score(prices)
+            stats = self.errors[schedule_type]
+            for lead, error in errors:
+                stats.add(lead, error)
+            if errors:
+                self.changed.add(schedule_type)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return each schedule's statistics for diagnostics."""
+        result = {}
+        for schedule_type, stats in self.errors.items():
+            overall = stats.overall()
+            result[schedule_type] = {
+                "forecasts_kept": self._rings[schedule_type].rows,
+                "samples": stats.samples,
+                "mae": round(overall[0] / 1000, 5) if overall else None,
+                "bias": round(overall[1] / 1000, 5) if overall else None,
+                "by_lead": stats.by_lead(),
+            }
+        return result
@@ -0,0 +1,169 @@
+"""Summary statistics and cheapest/most expensive windows over a price forecast."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from statistics import fmean, quantiles
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_WINDOW_HOURS,
+    DEFAULT_WINDOW_HOURS,
+    FORECAST_PERCENTILES,
+    MAX_WINDOW_HOURS,
+    TRADING_PERIOD_SECONDS,
+)
+from .series import PriceSeries
+
+PERIODS_PER_HOUR = 3600 // TRADING_PERIOD_SECONDS
+
+
+@dataclass(frozen=True, slots=True)
+class PriceWindow:
+    """A run of consecutive trading periods and their mean price in $/MWh."""
+
+    hours: float
+    start: int  # Unix seconds
+    end: int
+    mean_price: float
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the window with local ISO times and the price in $/kWh."""
+        return {
+            "hours": self.hours,
+            "start": dt_util.as_local(dt_util.utc_from_timestamp(self.start)).isoformat(),
+            "end": dt_util.as_local(dt_util.utc_from_timestamp(self.end)).isoformat(),
+            "mean_price": round(self.mean_price / 1000, 5),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ForecastAnalytics:
+    """Statistics over the remaining periods of a forecast, in $/MWh."""
+
+    count: int
+    minimum: float
+    maximum: float
+    mean: float
+    percentiles: Mapping[int, float]
+    cheapest: Mapping[float, PriceWindow]
+    most_expensive: Mapping[float, PriceWindow]
+
+    def as_attributes(self) -> dict[str, Any]:
+        """Return the statistics as sensor attributes, with prices in $/kWh."""
+        return {
+            "forecast_min": round(self.minimum / 1000, 5),
+            "forecast_max": round(self.maximum / 1000, 5),
+            "forecast_mean": round(self.mean / 1000, 5),
+            **{
+                f"forecast_p{pct}": round(value / 1000, 5)
+                for pct, value in self.percentiles.items()
+            },
+            "cheapest_windows": [window.as_dict() for window in self.cheapest.values()],
+            "most_expensive_windows": [
+                window.as_dict() for window in self.most_expensive.values()
+            ],
+        }
+
+
+def analyze_forecast(
+    series: PriceSeries, now: datetime, window_hours: list[float]
+) -> ForecastAnalytics | None:
+    """Compute statistics over the periods from the current one to the end of the forecast.
+
+    Windows only span consecutive periods; a duration longer than every run of
+    consecutive periods is left out.
+    """
+    first = series.index_at(now.timestamp()) or 0
+    timestamps = series.timestamps[first:]
+    prices = series.prices[first:]
+    if not prices:
+        return None
+
+    cuts = quantiles(prices, n=100, method="inclusive") if len(prices) > 1 else [prices[0]] * 99
+    cheapest: dict[float, PriceWindow] = {}
+    most_expensive: dict[float, PriceWindow] = {}
+    for hours in window_hours:
+        size = round(hours * PERIODS_PER_HOUR)
+        low, high = _extreme_windows(timestamps, prices, size)
+        if low is None:
+            continue
+        cheapest[hours] = _window(hours, timestamps, prices, low, size)
+        most_expensive[hours] = _window(hours, timestamps, prices, high, size)
+
+    return ForecastAnalytics(
+        count=len(prices),
+        minimum=min(prices),
+        maximum=max(prices),
+        mean=fmean(prices),
+        percentiles=MappingProxyType({pct: cuts[pct - 1] for pct in FORECAST_PERCENTILES}),
+        cheapest=MappingProxyType(cheapest),
+        most_expensive=MappingProxyType(most_expensive),
+    )
+
+
+def _extreme_windows(timestamps, prices, size: int) -> tuple[int | None, int | None]:
+    """Return the start indexes of the cheapest and dearest ``size``-period windows.
+
+    One pass with a running sum: the period leaving the window is subtracted as
+    the next one is added, and the sum restarts after a gap in the series.
+    Ties go to the earliest window.
+    """
+    low = high = None
+    low_sum = high_sum = 0.0
+    window_sum = 0.0
+    run_start = 0
+    for i, price in enumerate(prices):
+        if i and timestamps[i] - timestamps[i - 1] != TRADING_PERIOD_SECONDS:
+            run_start = i
+            window_sum = 0.0
+        window_sum += price
+        if i - run_start >= size:
+            window_sum -= prices[i - size]
+        if i - run_start + 1 >= size:
+            start = i - size + 1
+            if low is None or window_sum < low_sum:
+                low, low_sum = start, window_sum
+            if high is None or window_sum > high_sum:
+                high, high_sum = start, window_sum
+    return low, high
+
+
+def _window(hours: float, timestamps, prices, start: int, size: int) -> PriceWindow:
+    """Return the window of ``size`` periods beginning at index ``start``."""
+    return PriceWindow(
+        hours=hours,
+        start=timestamps[start],
+        end=timestamps[start + size - 1] + TRADING_PERIOD_SECONDS,
+        # Summed afresh so drift in the running sum does not reach the result
+        mean_price=fmean(prices[start:start + size]),
+    )
+
+
+def parse_window_hours(value: str) -> list[float]:
+    """Parse a comma-separated list of durations in hours, e.g. ``"1, 2.5, 4"``.
+
+    Durations must be whole trading periods (multiples of half an hour) up to
+    ``MAX_WINDOW_HOURS``. Raises ValueError otherwise.
+    """
+    durations = []
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        hours = float(part)
+        if not 0 < hours <= MAX_WINDOW_HOURS or (hours * PERIODS_PER_HOUR) % 1:
+            raise ValueError(f"Invalid window duration: {part.strip()}")
+        if hours not in durations:
+            durations.append(hours)
+    return sorted(durations)
+
+
+def window_hours_from_options(options: Mapping[str, Any]) -> list[float]:
+    """Return the window durations configured in a config entry's options."""
+    try:
+        return parse_window_hours(options.get(CONF_WINDOW_HOURS, DEFAULT_WINDOW_HOURS))
+    except ValueError:
+        return parse_window_hours(DEFAULT_WINDOW_HOURS)
@@ -1,120 +1,264 @@
 """API Client for NZ WITS Spot Price."""
 import asyncio
 import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any
 
 import aiohttp
+import yarl
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
+from .auth import WitsTokenManager
+from .decode import PricePoint, decode_prices, loads
+from .exceptions import CannotConnect, InvalidAuth, RateLimited
+from .metrics import WitsMetrics
+from .resilience import RequestEngine, RequestPolicy, SingleFlight
 from .const import (
-    TOKEN_URL,
-    PRICES_URL,
+    API_BASE_URL,
+    PRICES_PATH,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
     CONF_NODE,
     SCHEDULE_TYPES,
+    MAX_NODES_PER_REQUEST,
+    MAX_CONDITIONAL_ENTRIES,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class CannotConnect(Exception):
-    """Error to indicate we cannot connect."""
-
-class InvalidAuth(Exception):
-    """Error to indicate there is invalid auth."""
-
-
 class WitsApiClient:
     """Handles all communication with the WITS API."""
 
-    def __init__(self, config: dict[str, Any], session: aiohttp.ClientSession | None = None):
-        """Initialize the API client."""
+    def __init__(
+        self,
+        config: dict[str, Any],
+        session: aiohttp.ClientSession | None = None,
+        token_manager: WitsTokenManager | None = None,
+        policy: RequestPolicy | None = None,
+        base_url: str = API_BASE_URL,
+    ):
+        """Initialize the API client.
+
+        ``base_url`` points the client at another WITS-compatible server, such as
+        the local stand-in used by the benchmarks.
+        """
         self._client_id = config[CONF_CLIENT_ID]
         self._client_secret = config[CONF_CLIENT_SECRET]
-        self.node = config[CONF_NODE]
+        self.node = config.get(CONF_NODE)
         self._session = session
-        self._access_token = None
-        self._lock = asyncio.Lock()
+        # Clients sharing a client_id should share a token manager
+        self.token_manager = token_manager or WitsTokenManager(
+            session, self._client_id, self._client_secret, base_url=base_url
+        )
+        self._prices_url = f"{base_url}{PRICES_PATH}"
+        self.engine = RequestEngine(yarl.URL(base_url).host, policy)
+        # Validators and raw bodies of recent responses, for conditional requests
+        self._validators: OrderedDict[tuple, tuple[dict[str, str], bytes]] = OrderedDict()
+        # Latency, payload size and decode time per schedule
+        self.metrics = WitsMetrics()
+        # Identical GETs in flight at the same time share one request
+        self._flight = SingleFlight()
 
-    async def _get_access_token(self) -> str:
-        """Get a new access token using client credentials."""
-        if self._session is None:
-            raise CannotConnect("Session not initialized")
-            
-        _LOGGER.debug("Requesting new access token")
-        headers = {"content-type": "application/x-www-form-urlencoded"}
-        data = {
-            "grant_type": "client_credentials",
-            "client_id": self._client_id,
-            "client_secret": self._client_secret,
-        }
-        try:
-            async with self._session.post(TOKEN_URL, headers=headers, data=data, timeout=10) as response:
-                if response.status == 401 or response.status == 400:
-                    raise InvalidAuth("Authentication failed")
-                response.raise_for_status()
-                token_data = await response.json()
-                self._access_token = token_data["access_token"]
-                _LOGGER.info("Successfully obtained new access token")
-                return self._access_token
-        except asyncio.TimeoutError as exc:
-            raise CannotConnect("Timeout connecting to API") from exc
-        except aiohttp.ClientError as exc:
-            raise CannotConnect(f"Error connecting to API: {exc}") from exc
+    def set_session(self, session: aiohttp.ClientSession) -> None:
+        """Send this client's and its token manager's requests through another session."""
+        self._session = session
+        self.token_manager.set_session(session)
 
-    async def _request(self, method: str, url: str, params: dict | None = None) -> Any:
-        """Make an authenticated request to the API."""
-        async with self._lock:
-            if self._access_token is None:
-                await self._get_access_token()
+    def matches_credentials(self, config: dict[str, Any]) -> bool:
+        """Return True if the config carries the same credentials as this client."""
+        return (
+            config[CONF_CLIENT_ID] == self._client_id
+            and config[CONF_CLIENT_SECRET] == self._client_secret
+        )
 
+    async def _request(
+        self, method: str, url: str, params: dict | None = None, metric_key: str | None = None
+    ) -> Any:
+        """Make an authenticated request to the API.
+
+        A GET with the same URL and parameters as one already in flight waits
+        for that request instead of sending another. Each attempt is recorded
+        in ``metrics`` under ``metric_key``.
+        """
         if self._session is None:
             raise CannotConnect("Session not initialized")
+        if method != "GET":
+            return await self._authorized_request(method, url, params, metric_key)
+
+        key = (url, tuple(sorted((params or {}).items())))
+        if self._flight.in_flight(key):
+            self.metrics.increment("coalesced", metric_key)
+        return await self._flight.async_do(
+            key, lambda: self._authorized_request(method, url, params, metric_key)
+        )
+
+    async def _authorized_request(
+        self, method: str, url: str, params: dict | None, metric_key: str | None
+    ) -> Any:
+        """Send a request with the current token, retrying once with a new token on a 401."""
+        access_token = await self.token_manager.async_get_token()
+        headers = {"Authorization": f"Bearer {access_token}"}
 
-        headers = {"Authorization": f"Bearer {self._access_token}"}
-        
         try:
-            return await self._perform_request(method, url, headers, params)
+            return await self.engine.async_call(
+                lambda: self._perform_request(method, url, headers, params, metric_key)
+            )
         except InvalidAuth:
             _LOGGER.info("Access token expired or invalid, requesting a new one")
-            async with self._lock:
-                await self._get_access_token() # Force a refresh
+            # Only refreshes if no other caller has already replaced this token
+            access_token = await self.token_manager.async_get_token(stale_token=access_token)
             # Retry the request with the new token
-            headers = {"Authorization": f"Bearer {self._access_token}"}
-            return await self._perform_request(method, url, headers, params)
+            headers = {"Authorization": f"Bearer {access_token}"}
+            self.metrics.increment("auth_retries", metric_key)
+            return await self.engine.async_call(
+                lambda: self._perform_request(method, url, headers, params, metric_key)
+            )
 
-    async def _perform_request(self, method, url, headers, params):
-        """Helper to perform the actual HTTP request."""
+    async def _perform_request(self, method, url, headers, params, metric_key=None):
+        """Helper to perform the actual HTTP request.
+
+        GET requests send ``If-None-Match``/``If-Modified-Since`` when the server
+        gave us validators for the same request before, and a 304 reply is
+        answered from the raw body we kept. Bodies are decoded with orjson when
+        it is available.
+        """
+        cache_key = (url, tuple(sorted((params or {}).items()))) if method == "GET" else None
+        cached = self._validators.get(cache_key) if cache_key else None
+        if cached is not None:
+            headers = {**headers, **cached[0]}
+
+        self.metrics.increment("requests", metric_key)
+        started = time.perf_counter()
         try:
             async with self._session.request(method, url, headers=headers, params=params, timeout=15) as response:
                 if response.status == 401:
+                    self.metrics.increment("failures", metric_key)
                     raise InvalidAuth("Token is invalid")
+                if response.status == 429 or (response.status == 503 and "Retry-After" in response.headers):
+                    self.metrics.increment("rate_limited", metric_key)
+                    raise RateLimited(
+                        f"API asked us to slow down (HTTP {response.status})",
+                        _parse_retry_after(response.headers.get("Retry-After")),
+                        response.status,
+                    )
+                if response.status == 304 and cached is not None:
+                    _LOGGER.debug("Not modified: %s %s", url, params)
+                    self.metrics.increment("not_modified", metric_key)
+                    self.metrics.record("latency_ms", (time.perf_counter() - started) * 1000, metric_key)
+                    self._validators.move_to_end(cache_key)
+                    return loads(cached[1])
                 response.raise_for_status()
-                return await response.json()
+                raw = await response.read()
+                received = time.perf_counter()
+                body = loads(raw)
+                decoded = time.perf_counter()
+                self.metrics.record("latency_ms", (received - started) * 1000, metric_key)
+                self.metrics.record("payload_bytes", len(raw), metric_key)
+                self.metrics.record("decode_ms", (decoded - received) * 1000, metric_key)
+                if cache_key is not None:
+                    self._remember_validators(cache_key, response.headers, raw)
+                return body
         except asyncio.TimeoutError as exc:
+            self.metrics.increment("failures", metric_key)
             raise CannotConnect("Timeout during API request") from exc
         except aiohttp.ClientError as exc:
+            self.metrics.increment("failures", metric_key)
             raise CannotConnect(f"Error during API request: {exc}") from exc
+        except ValueError as exc:
+            self.metrics.increment("failures", metric_key)
+            raise CannotConnect(f"Invalid JSON in API response: {exc}") from exc
+
+    def _remember_validators(self, cache_key: tuple, response_headers, body: bytes) -> None:
+        """Keep a response's ETag/Last-Modified so the next request can be conditional."""
+        validators = {}
+        if etag := response_headers.get("ETag"):
+            validators["If-None-Match"] = etag
+        if last_modified := response_headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = last_modified
+        if not validators:
+            self._validators.pop(cache_key, None)
+            return
+        self._validators[cache_key] = (validators, body)
+        self._validators.move_to_end(cache_key)
+        while len(self._validators) > MAX_CONDITIONAL_ENTRIES:
+            self._validators.popitem(last=False)
 
     async def test_authentication(self):
-        """Test if we can authenticate with the API."""
-        await self._get_access_token()
+        """Test if we can authenticate with the API.
+
+        A cached token for the same credentials is accepted as proof.
+        """
+        await self.token_manager.async_get_token()
 
-    async def get_price_data(self, schedule_type: str) -> list[dict[str, Any]]:
+    async def get_price_data(self, schedule_type: str) -> list[PricePoint]:
         """Fetch price data for a given schedule."""
+        data = await self.get_price_data_for_nodes(schedule_type, [self.node])
+        return data.get(self.node, [])
+
+    async def get_price_data_for_nodes(
+        self,
+        schedule_type: str,
+        nodes: list[str],
+        overrides: dict[str, Any] | None = None,
+    ) -> dict[str, list[PricePoint]]:
+        """Fetch price data for a schedule across several nodes.
+
+        Nodes are sent in chunks of ``MAX_NODES_PER_REQUEST`` using a comma
+        separated ``nodes`` parameter, and the response is split back out by
+        each price's ``node`` field into compact points. ``overrides`` replace schedule parameters,
+        e.g. a smaller ``back`` window.
+        """
         if schedule_type not in SCHEDULE_TYPES:
             _LOGGER.error("Unknown schedule type: %s", schedule_type)
-            return []
+            return {}
 
         params = SCHEDULE_TYPES[schedule_type]["params"].copy()
-        params["nodes"] = self.node
-        
-        _LOGGER.debug("Fetching price data for schedule '%s' with params: %s", schedule_type, params)
-        data = await self._request("GET", PRICES_URL, params=params)
-
-        if not data or not isinstance(data, list) or "prices" not in data[0]:
-            _LOGGER.warning("Received empty or malformed price data for %s", schedule_type)
-            return []
-        
-        return data[0]["prices"]
+        params.update(overrides or {})
+        return await self._async_fetch_nodes(schedule_type, params, nodes)
+
+    async def get_price_history(
+        self, schedule: str, node: str, back: int, offset: int
+    ) -> list[PricePoint]:
+        """Fetch ``back`` trading periods of a historical schedule for one node.
+
+        The window ends ``offset`` trading periods before the current one.
+        """
+        params = {"schedules": schedule, "marketType": "E", "back": back, "offset": offset}
+        data = await self._async_fetch_nodes(schedule, params, [node])
+        return data[node]
+
+    async def _async_fetch_nodes(
+        self, schedule_type: str, base_params: dict[str, Any], nodes: list[str]
+    ) -> dict[str, list[PricePoint]]:
+        """Request ``base_params`` for nodes in chunks and split the prices by node."""
+        result: dict[str, list[PricePoint]] = {}
+        for start in range(0, len(nodes), MAX_NODES_PER_REQUEST):
+            chunk = nodes[start:start + MAX_NODES_PER_REQUEST]
+            params = {**base_params, "nodes": ",".join(chunk)}
+
+            _LOGGER.debug("Fetching price data for schedule '%s' with params: %s", schedule_type, params)
+            data = await self._request("GET", self._prices_url, params=params, metric_key=schedule_type)
+            started = time.perf_counter()
+            result.update(decode_prices(data, chunk, schedule_type))
+            self.metrics.record("prune_ms", (time.perf_counter() - started) * 1000, schedule_type)
+
+        return result
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Return a Retry-After header (seconds or HTTP date) as seconds from now."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -0,0 +1,309 @@
+"""OAuth token management for the NZ WITS integration."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any
+
+import aiohttp
+import yarl
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    API_BASE_URL,
+    TOKEN_PATH,
+    CONF_CLIENT_ID,
+    CONF_CLIENT_SECRET,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_STORAGE_KEY,
+    TOKEN_STORAGE_VERSION,
+)
+from .exceptions import CannotConnect, InvalidAuth
+from .metrics import RollingHistogram
+from .resilience import SingleFlight, get_circuit_breaker
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_TOKENS = "tokens"
+DATA_TOKEN_STORE = "token_store"
+
+
+class WitsTokenManager:
+    """Caches a client-credentials access token and refreshes it before it expires.
+
+    One manager is shared by every client using the same client_id. When a
+    token store is given, the token and its expiry are persisted so a restart
+    can reuse it instead of logging in again.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None,
+        client_id: str,
+        client_secret: str,
+        store: WitsTokenStore | None = None,
+        base_url: str = API_BASE_URL,
+    ):
+        """Initialize the token manager."""
+        self._session = session
+        self._token_url = f"{base_url}{TOKEN_PATH}"
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._store = store
+        self._access_token: str | None = None
+        self._expires_at: float | None = None  # Unix time, None if unknown
+        self._lifetime: float | None = None  # Seconds the token was issued for, None if unknown
+        # Concurrent callers needing a new token share one fetch
+        self._flight = SingleFlight()
+        self._refresh_handle: asyncio.TimerHandle | None = None
+        self._background = False
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.fetch_latency_ms = RollingHistogram()
+
+    @property
+    def client_id(self) -> str:
+        """Return the client id this manager holds a token for."""
+        return self._client_id
+
+    @property
+    def expires_at(self) -> float | None:
+        """Return when the current token expires, as Unix time."""
+        return self._expires_at
+
+    def set_session(self, session: aiohttp.ClientSession) -> None:
+        """Fetch tokens through another session."""
+        self._session = session
+
+    def matches_secret(self, client_secret: str) -> bool:
+        """Return True if this manager was created for the given secret."""
+        return client_secret == self._client_secret
+
+    def _refresh_margin(self) -> float:
+        """Return how long before expiry the token is treated as stale.
+
+        Tokens issued for less than twice the usual margin are refreshed halfway
+        through their lifetime, so a short-lived token is still used at all.
+        """
+        if self._lifetime is None:
+            return TOKEN_REFRESH_MARGIN
+        return min(TOKEN_REFRESH_MARGIN, self._lifetime / 2)
+
+    def _is_valid(self) -> bool:
+        """Return True if the cached token can still be used."""
+        if self._access_token is None:
+            return False
+        if self._expires_at is None:
+            return True  # Unknown lifetime; rely on a 401 to tell us otherwise
+        return time.time() < self._expires_at - self._refresh_margin()
+
+    def restore(self, stored: dict[str, Any]) -> None:
+        """Restore a previously persisted token."""
+        self._access_token = stored.get("access_token")
+        self._expires_at = stored.get("expires_at")
+        self._lifetime = stored.get("lifetime")
+        if not self._is_valid():
+            self._access_token = None
+            self._expires_at = None
+            self._lifetime = None
+
+    async def async_get_token(self, stale_token: str | None = None) -> str:
+        """Return a valid access token.
+
+        If ``stale_token`` is given and is still the cached token, it is treated as
+        rejected and a new one is fetched. Concurrent callers share one refresh.
+        """
+        if self._is_valid() and (stale_token is None or stale_token != self._access_token):
+            return self._access_token
+        return await self._flight.async_do("token", self._async_fetch_token)
+
+    async def _async_fetch_token(self) -> str:
+        """Get a new access token using client credentials."""
+        if self._session is None:
+            raise CannotConnect("Session not initialized")
+
+        _LOGGER.debug("Requesting new access token")
+        headers = {"content-type": "application/x-www-form-urlencoded"}
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self._client_id,
+            "client_secret": self._client_secret,
+        }
+        # Token requests share the price requests' circuit breaker
+        breaker = get_circuit_breaker(yarl.URL(self._token_url).host)
+        breaker.before_request()
+        started = time.perf_counter()
+        try:
+            async with self._session.post(self._token_url, headers=headers, data=data, timeout=10) as response:
+                if response.status == 401 or response.status == 400:
+                    self.failure_count += 1
+                    breaker.record_success()  # The API answered; the credentials are wrong
+                    raise InvalidAuth("Authentication failed")
+                response.raise_for_status()
+                token_data = await response.json()
+        except asyncio.TimeoutError as exc:
+            self.failure_count += 1
+            breaker.record_failure()
+            raise CannotConnect("Timeout connecting to API") from exc
+        except aiohttp.ClientError as exc:
+            self.failure_count += 1
+            breaker.record_failure()
+            raise CannotConnect(f"Error connecting to API: {exc}") from exc
+        finally:
+            breaker.release_probe()
+        breaker.record_success()
+        self.fetch_latency_ms.add((time.perf_counter() - started) * 1000)
+
+        self._access_token = token_data["access_token"]
+        expires_in = token_data.get("expires_in")
+        try:
+            self._lifetime = float(expires_in) if expires_in is not None else None
+        except (TypeError, ValueError):
+            self._lifetime = None
+        self._expires_at = time.time() + self._lifetime if self._lifetime is not None else None
+        self.refresh_count += 1
+        _LOGGER.info("Successfully obtained new access token")
+
+        self._schedule_refresh()
+        self._persist()
+        return self._access_token
+
+    def start_background_refresh(self) -> None:
+        """Refresh the token in the background shortly before it expires."""
+        self._background = True
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        """Arm the background refresh timer for the current token."""
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+        if not self._background or self._expires_at is None:
+            return
+        delay = max(self._expires_at - self._refresh_margin() - time.time(), 0)
+        loop = asyncio.get_running_loop()
+        self._refresh_handle = loop.call_later(delay, self._on_refresh_due)
+
+    def _on_refresh_due(self) -> None:
+        """Start a background token refresh."""
+        self._refresh_handle = None
+        asyncio.get_running_loop().create_task(self._async_background_refresh())
+
+    async def _async_background_refresh(self) -> None:
+        """Fetch a new token, retrying on the next request if this fails."""
+        try:
+            await self._flight.async_do("token", self._async_fetch_token)
+        except (CannotConnect, InvalidAuth) as err:
+            _LOGGER.warning("Background access token refresh failed: %s", err)
+
+    def _persist(self) -> None:
+        """Schedule saving the current token to storage."""
+        if self._store is None:
+            return
+        self._store.async_save_token(
+            self._client_id,
+            {
+                "access_token": self._access_token,
+                "expires_at": self._expires_at,
+                "lifetime": self._lifetime,
+                "secret_hash": _hash_secret(self._client_secret),
+            },
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the token's expiry and refresh counters for diagnostics."""
+        return {
+            "expires_at": self._expires_at,
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            "fetch_latency_ms": self.fetch_latency_ms.summary(),
+        }
+
+    def close(self) -> None:
+        """Stop background refreshes."""
+        self._background = False
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+
+
+class WitsTokenStore:
+    """Persists access tokens for all client_ids in one private storage file."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the token store."""
+        self._store = Store(hass, TOKEN_STORAGE_VERSION, TOKEN_STORAGE_KEY, private=True)
+        self._data: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load persisted tokens."""
+        self._data = await self._store.async_load() or {}
+
+    def get(self, client_id: str, client_secret: str) -> dict[str, Any]:
+        """Return the stored token for these credentials, if any."""
+        stored = self._data.get(client_id) or {}
+        if stored.get("secret_hash") != _hash_secret(client_secret):
+            return {}
+        return stored
+
+    def async_save_token(self, client_id: str, payload: dict[str, Any]) -> None:
+        """Schedule saving a token."""
+        self._data[client_id] = payload
+        self._store.async_delay_save(lambda: self._data, 1)
+
+
+def _hash_secret(client_secret: str) -> str:
+    """Return a digest of the client secret, so the secret itself is never stored."""
+    return hashlib.sha256(client_secret.encode()).hexdigest()
+
+
+async def _async_get_store(hass: HomeAssistant) -> WitsTokenStore:
+    """Return the token store, loading persisted tokens on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    store = domain_data.get(DATA_TOKEN_STORE)
+    if store is None:
+        store = WitsTokenStore(hass)
+        await store.async_load()
+        domain_data[DATA_TOKEN_STORE] = store
+    return store
+
+
+async def async_get_token_manager(
+    hass: HomeAssistant, config: dict[str, Any], *, replace: bool = True
+) -> WitsTokenManager:
+    """Return the shared token manager for these credentials.
+
+    If a manager exists for the client_id with a different secret, it is replaced
+    when ``replace`` is True. Otherwise a standalone manager is returned so that
+    validating unconfirmed credentials cannot disturb running entries.
+    """
+    managers: dict[str, WitsTokenManager] = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_TOKENS, {})
+    client_id = config[CONF_CLIENT_ID]
+    client_secret = config[CONF_CLIENT_SECRET]
+    session = async_get_clientsession(hass)
+
+    manager = managers.get(client_id)
+    if manager is not None and manager.matches_secret(client_secret):
+        return manager
+    if manager is not None and not replace:
+        return WitsTokenManager(session, client_id, client_secret)
+
+    store = await _async_get_store(hass)
+    new_manager = WitsTokenManager(session, client_id, client_secret, store)
+    new_manager.restore(store.get(client_id, client_secret))
+    if manager is not None:
+        manager.close()
+    managers[client_id] = new_manager
+    return new_manager
+
+
+def async_release_token_manager(hass: HomeAssistant, client_id: str) -> None:
+    """Stop and forget the shared token manager for a client_id."""
+    managers: dict[str, WitsTokenManager] = hass.data.get(DOMAIN, {}).get(DATA_TOKENS, {})
+    if (manager := managers.pop(client_id, None)) is not None:
+        manager.close()
@@ -0,0 +1,245 @@
+"""Backfill of historical WITS prices into long-term statistics."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from statistics import fmean
+from typing import Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import WitsApiClient
+from .const import (
+    DOMAIN,
+    TRADING_PERIOD_SECONDS,
+    BACKFILL_STORAGE_VERSION,
+    BACKFILL_PAGE_PERIODS,
+    BACKFILL_IMPORT_PAGES,
+    BACKFILL_PAGE_DELAY,
+)
+from .exceptions import CannotConnect, InvalidAuth
+from .trading_clock import current_period_start
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_BACKFILL = "backfill"
+
+HOUR_SECONDS = 3600
+
+
+def statistic_id(node: str, schedule: str) -> str:
+    """Return the external statistic id holding a node's historical prices."""
+    return f"{DOMAIN}:{node.lower()}_{schedule.lower()}_price"
+
+
+@dataclass
+class BackfillJob:
+    """A node, schedule and time range to import, and how far the import got.
+
+    Times are Unix seconds aligned to the hour. Pages are fetched from ``end``
+    backwards; everything from ``next_end`` onwards has been imported.
+    """
+
+    node: str
+    schedule: str
+    start: int
+    end: int
+    next_end: int
+    imported: int = 0  # Hourly statistics imported so far
+
+    @property
+    def key(self) -> str:
+        """Return the key the job is stored under; one job per node and schedule."""
+        return f"{self.node}:{self.schedule}"
+
+    @property
+    def done(self) -> bool:
+        """Return True once the whole range has been imported."""
+        return self.next_end <= self.start
+
+
+class WitsBackfillManager:
+    """Runs backfill jobs and saves their progress so they resume after a restart."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the manager."""
+        self.hass = hass
+        self._store: Store[dict[str, Any]] = Store(
+            hass, BACKFILL_STORAGE_VERSION, f"{DOMAIN}.backfill"
+        )
+        self.jobs: dict[str, BackfillJob] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def async_load(self) -> None:
+        """Load saved jobs."""
+        stored = await self._store.async_load() or {}
+        for data in stored.get("jobs", []):
+            job = BackfillJob(**data)
+            self.jobs[job.key] = job
+
+    def async_start(
+        self,
+        entry: ConfigEntry,
+        api_client: WitsApiClient,
+        node: str,
+        schedule: str,
+        start: float,
+        end: float,
+    ) -> BackfillJob:
+        """Start importing a range, continuing a saved job for the same range if there is one."""
+        # Only whole hours that have already started can be imported
+        now = time.time()
+        start_hour = int(start) // HOUR_SECONDS * HOUR_SECONDS
+        end_hour = int(min(end, now)) // HOUR_SECONDS * HOUR_SECONDS
+        job = self.jobs.get(f"{node}:{schedule}")
+        if job is None or (job.start, job.end) != (start_hour, end_hour):
+            job = BackfillJob(node, schedule, start_hour, end_hour, next_end=end_hour)
+            self.jobs[job.key] = job
+            self._async_save()
+        self._async_run_in_background(entry, api_client, job)
+        return job
+
+    def async_resume(self, entry: ConfigEntry, api_client: WitsApiClient, node: str) -> None:
+        """Continue any unfinished jobs for a node, e.g. after a restart."""
+        for job in self.jobs.values():
+            if job.node == node and not job.done:
+                _LOGGER.info("Resuming %s price backfill for node %s", job.schedule, node)
+                self._async_run_in_background(entry, api_client, job)
+
+    def _async_run_in_background(
+        self, entry: ConfigEntry, api_client: WitsApiClient, job: BackfillJob
+    ) -> None:
+        """Run a job as the entry's background task, replacing one already running."""
+        if (task := self._tasks.get(job.key)) is not None and not task.done():
+            task.cancel()
+        self._tasks[job.key] = entry.async_create_background_task(
+            self.hass,
+            self._async_run(api_client, job),
+            f"{DOMAIN} backfill ({job.node} {job.schedule})",
+        )
+
+    async def _async_run(self, api_client: WitsApiClient, job: BackfillJob) -> None:
+        """Fetch pages from the newest backwards, importing every few pages.
+
+        Each page spans ``BACKFILL_PAGE_PERIODS`` trading periods, counted back
+        from ``end`` (the last page stops at ``start``). Both are on the hour, so
+        every page boundary is too and every import covers complete hours.
+        Progress is saved after each import; a restart refetches at most
+        ``BACKFILL_IMPORT_PAGES`` pages.
+        """
+        metadata = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=f"WITS {job.schedule} price {job.node}",
+            source=DOMAIN,
+            statistic_id=statistic_id(job.node, job.schedule),
+            unit_of_measurement="NZD/kWh",
+        )
+        page_span = BACKFILL_PAGE_PERIODS * TRADING_PERIOD_SECONDS
+        # Prices keyed by period start, so overlapping pages are deduplicated
+        pending: dict[int, float] = {}
+        cursor = job.next_end
+        pages = 0
+        try:
+            while cursor > job.start:
+                page_start = max(cursor - page_span, job.start)
+                prices = await self._async_fetch_page(api_client, job, page_start, cursor)
+                pending.update(prices)
+                cursor = page_start
+                pages += 1
+                if pages % BACKFILL_IMPORT_PAGES == 0 or cursor <= job.start:
+                    self._async_import(metadata, job, pending, cursor)
+                    pending = {}
+                if cursor > job.start:
+                    await asyncio.sleep(BACKFILL_PAGE_DELAY)
+        except (CannotConnect, InvalidAuth) as err:
+            _LOGGER.warning(
+                "Backfill of %s prices for node %s stopped at %s and will resume later: %s",
+                job.schedule,
+                job.node,
+                dt_util.utc_from_timestamp(job.next_end).isoformat(),
+                err,
+            )
+            return
+        _LOGGER.info(
+            "Backfill of %s prices for node %s finished: %d hours imported",
+            job.schedule,
+            job.node,
+            job.imported,
+        )
+
+    async def _async_fetch_page(
+        self, api_client: WitsApiClient, job: BackfillJob, page_start: int, page_end: int
+    ) -> dict[int, float]:
+        """Return the prices of the periods in [page_start, page_end), keyed by period start."""
+        current_period = current_period_start(time.time())
+        last_period = page_end - TRADING_PERIOD_SECONDS
+        offset = max((current_period - last_period) // TRADING_PERIOD_SECONDS, 0)
+        back = (page_end - page_start) // TRADING_PERIOD_SECONDS
+        points = await api_client.get_price_history(job.schedule, job.node, back, offset)
+        return {
+            timestamp: price
+            for timestamp, price, _ in points
+            if page_start <= timestamp < page_end
+        }
+
+    def _async_import(
+        self,
+        metadata: StatisticMetaData,
+        job: BackfillJob,
+        prices: dict[int, float],
+        cursor: int,
+    ) -> None:
+        """Import fetched prices as hourly statistics and record the progress."""
+        hours: dict[int, list[float]] = {}
+        for timestamp, price in prices.items():
+            hours.setdefault(timestamp // HOUR_SECONDS * HOUR_SECONDS, []).append(price / 1000)
+        statistics = [
+            StatisticData(
+                start=dt_util.utc_from_timestamp(hour),
+                mean=fmean(values),
+                min=min(values),
+                max=max(values),
+            )
+            for hour, values in sorted(hours.items())
+        ]
+        if statistics:
+            async_add_external_statistics(self.hass, metadata, statistics)
+        job.imported += len(statistics)
+        job.next_end = cursor
+        self._async_save()
+
+    def _async_save(self) -> None:
+        """Save every job's progress."""
+        self._store.async_delay_save(
+            lambda: {"jobs": [asdict(job) for job in self.jobs.values()]}, 1
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the jobs and their progress for diagnostics."""
+        return {
+            key: {
+                **asdict(job),
+                "done": job.done,
+                "running": key in self._tasks and not self._tasks[key].done(),
+            }
+            for key, job in self.jobs.items()
+        }
+
+
+async def async_get_backfill_manager(hass: HomeAssistant) -> WitsBackfillManager:
+    """Return the shared backfill manager, loading saved jobs on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    manager = domain_data.get(DATA_BACKFILL)
+    if manager is None:
+        manager = WitsBackfillManager(hass)
+        await manager.async_load()
+        domain_data[DATA_BACKFILL] = manager
+    return manager
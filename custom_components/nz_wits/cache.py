@@ -0,0 +1,76 @@
+"""Persistent warm-start cache of coordinator data."""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    SCHEDULE_TYPES,
+    CACHE_STORAGE_VERSION,
+    CACHE_SAVE_DELAY,
+    CACHE_MAX_AGE,
+)
+from .series import PriceSeries
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WitsDataCache:
+    """Saves the last good coordinator data so setup does not have to wait for WITS."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize the cache."""
+        self._store = Store(hass, CACHE_STORAGE_VERSION, f"{DOMAIN}.cache.{entry_id}")
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Return the cached coordinator data, or None if missing or too old."""
+        try:
+            stored = await self._store.async_load()
+        except Exception:  # A corrupt cache must never block setup
+            _LOGGER.warning("Could not read the WITS warm-start cache", exc_info=True)
+            return None
+        if not stored:
+            return None
+
+        saved_at = dt_util.parse_datetime(stored.get("saved_at") or "")
+        if saved_at is None or (dt_util.utcnow() - saved_at).total_seconds() > CACHE_MAX_AGE:
+            _LOGGER.debug("Ignoring WITS warm-start cache saved at %s", stored.get("saved_at"))
+            return None
+
+        data: dict[str, Any] = {}
+        for key, series in (stored.get("schedules") or {}).items():
+            if key in SCHEDULE_TYPES:
+                data[key] = PriceSeries.from_dict(series)
+        last_success = stored.get("last_api_success_utc")
+        data["last_api_success_utc"] = (
+            dt_util.parse_datetime(last_success).replace(tzinfo=None) if last_success else None
+        )
+        return data
+
+    def async_save(self, data: dict[str, Any]) -> None:
+        """Schedule saving the coordinator data."""
+        self._store.async_delay_save(lambda: _serialize(data), CACHE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Delete the cache."""
+        await self._store.async_remove()
+
+
+def _serialize(data: dict[str, Any]) -> dict[str, Any]:
+    """Return coordinator data in a JSON-serialisable form."""
+    last_success: datetime | None = data.get("last_api_success_utc")
+    return {
+        "saved_at": dt_util.utcnow().isoformat(),
+        "last_api_success_utc": last_success.isoformat() if last_success else None,
+        "schedules": {
+            key: data[key].as_dict()
+            for key in SCHEDULE_TYPES
+            if data.get(key) is not None
+        },
+    }
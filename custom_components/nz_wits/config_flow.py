@@ -11,17 +11,33 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
+from .analytics import parse_window_hours
+from .resample import parse_tou_bands
 from .api import WitsApiClient, CannotConnect, InvalidAuth
+from .auth import async_get_token_manager
+from .hub import parse_nodes
 from .const import (
     DOMAIN,
     CONF_CLIENT_ID,
     CONF_CLIENT_SECRET,
     CONF_NODE,
+    CONF_NODES,
     DEFAULT_NODE,
     CONF_UPDATE_RTD,
     CONF_UPDATE_INTERIM,
     CONF_UPDATE_PRSS,
     CONF_UPDATE_PRSL,
+    CONF_MAX_RETRIES,
+    CONF_REQUESTS_PER_MINUTE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    CONF_WINDOW_HOURS,
+    DEFAULT_WINDOW_HOURS,
+    CONF_DEDICATED_SESSION,
+    CONF_HOURLY_SENSORS,
+    CONF_DAILY_SENSORS,
+    CONF_TOU_BANDS,
+    DEFAULT_TOU_BANDS,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -34,11 +50,24 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+STEP_HUB_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_CLIENT_ID): str,
+        vol.Required(CONF_CLIENT_SECRET): str,
+        vol.Required(CONF_NODES): str,
+    }
+)
+
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
-    client = WitsApiClient(data, async_get_clientsession(hass))
+    # Reuse the shared token when these credentials are already in use, but never
+    # let unconfirmed credentials replace the token running entries depend on.
+    token_manager = await async_get_token_manager(hass, data, replace=False)
+    client = WitsApiClient(data, async_get_clientsession(hass), token_manager)
     await client.test_authentication()
+    if CONF_NODES in data:
+        return {"title": f"WITS Hub ({len(data[CONF_NODES])} nodes)"}
     return {"title": f"WITS Node {data[CONF_NODE]}"}
 
 
@@ -85,13 +114,16 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 await self.hass.config_entries.async_reload(entry.entry_id)
                 return self.async_abort(reason="reauth_successful")
 
-        prefill_schema = vol.Schema(
-            {
-                vol.Required(CONF_CLIENT_ID, default=entry.data.get(CONF_CLIENT_ID) if entry else ""): str,
-                vol.Required(CONF_CLIENT_SECRET, default=""): str,
-                vol.Optional(CONF_NODE, default=entry.data.get(CONF_NODE, DEFAULT_NODE) if entry else DEFAULT_NODE): str,
-            }
-        )
+        prefill_fields = {
+            vol.Required(CONF_CLIENT_ID, default=entry.data.get(CONF_CLIENT_ID) if entry else ""): str,
+            vol.Required(CONF_CLIENT_SECRET, default=""): str,
+        }
+        if not entry or CONF_NODES not in entry.data:
+            # A hub entry's nodes are edited in its options instead
+            prefill_fields[
+                vol.Optional(CONF_NODE, default=entry.data.get(CONF_NODE, DEFAULT_NODE) if entry else DEFAULT_NODE)
+            ] = str
+        prefill_schema = vol.Schema(prefill_fields)
 
         return self.async_show_form(
             step_id="reauth_confirm",
@@ -102,7 +134,13 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Handle the initial step."""
+        """Ask whether to monitor one node or a set of nodes."""
+        return self.async_show_menu(step_id="user", menu_options=["node", "hub"])
+
+    async def async_step_node(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle setting up a single node."""
         errors: dict[str, str] = {}
         if user_input is not None:
             await self.async_set_unique_id(user_input[CONF_NODE])
@@ -121,7 +159,38 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 return self.async_create_entry(title=info["title"], data=user_input)
 
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="node", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_hub(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle setting up a hub that monitors a set of nodes with one entry."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            # One hub per set of credentials; add nodes to it in the options
+            await self.async_set_unique_id(f"hub_{user_input[CONF_CLIENT_ID]}")
+            self._abort_if_unique_id_configured()
+
+            try:
+                data = {**user_input, CONF_NODES: parse_nodes(user_input[CONF_NODES])}
+            except ValueError:
+                errors[CONF_NODES] = "invalid_nodes"
+            else:
+                try:
+                    info = await validate_input(self.hass, data)
+                except CannotConnect:
+                    errors["base"] = "cannot_connect"
+                except InvalidAuth:
+                    errors["base"] = "invalid_auth"
+                except Exception:
+                    _LOGGER.exception("Unexpected exception")
+                    errors["base"] = "unknown"
+                else:
+                    return self.async_create_entry(title=info["title"], data=data)
+
+        return self.async_show_form(
+            step_id="hub", data_schema=STEP_HUB_DATA_SCHEMA, errors=errors
         )
 
 
@@ -132,6 +201,11 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Initialize options flow."""
         # self.config_entry = config_entry # This is automatically available
 
+    @property
+    def _is_hub(self) -> bool:
+        """Return True if the entry monitors a set of nodes."""
+        return CONF_NODES in self.config_entry.data
+
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -139,25 +213,47 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         errors: dict[str, str] = {}
 
         if user_input is not None:
+            try:
+                parse_window_hours(user_input.get(CONF_WINDOW_HOURS, DEFAULT_WINDOW_HOURS))
+            except ValueError:
+                errors[CONF_WINDOW_HOURS] = "invalid_window_hours"
+            try:
+                parse_tou_bands(user_input.get(CONF_TOU_BANDS, DEFAULT_TOU_BANDS))
+            except ValueError:
+                errors[CONF_TOU_BANDS] = "invalid_tou_bands"
+
             # Prepare updated data for validation if credentials/node changed
             updated_core_data = self.config_entry.data.copy()
             core_data_changed = False
 
+            # A hub entry edits its list of nodes instead of a single node
+            node_key = CONF_NODES if self._is_hub else CONF_NODE
+            nodes = user_input.get(node_key)
+            if self._is_hub:
+                try:
+                    nodes = parse_nodes(nodes or "")
+                except ValueError:
+                    errors[CONF_NODES] = "invalid_nodes"
+                    nodes = self.config_entry.data[CONF_NODES]
+
             if user_input.get(CONF_CLIENT_ID) != self.config_entry.data.get(CONF_CLIENT_ID) or \
                user_input.get(CONF_CLIENT_SECRET) != self.config_entry.data.get(CONF_CLIENT_SECRET) or \
-               user_input.get(CONF_NODE) != self.config_entry.data.get(CONF_NODE):
+               nodes != self.config_entry.data.get(node_key):
                 core_data_changed = True
                 updated_core_data[CONF_CLIENT_ID] = user_input[CONF_CLIENT_ID]
                 updated_core_data[CONF_CLIENT_SECRET] = user_input[CONF_CLIENT_SECRET]
-                updated_core_data[CONF_NODE] = user_input[CONF_NODE]
+                updated_core_data[node_key] = nodes
 
-            if core_data_changed:
+            if core_data_changed and not errors:
                 try:
                     _LOGGER.debug("WITS Options: Core data changed, validating new credentials/node.")
-                    await validate_input(self.hass, updated_core_data)
+                    info = await validate_input(self.hass, updated_core_data)
                     # If validation passes, update the main config entry data
                     self.hass.config_entries.async_update_entry(
-                        self.config_entry, data=updated_core_data
+                        self.config_entry,
+                        data=updated_core_data,
+                        # A hub's title gives its node count
+                        title=info["title"] if self._is_hub else self.config_entry.title,
                     )
                     _LOGGER.debug("WITS Options: Core data updated successfully.")
                 except CannotConnect:
@@ -175,7 +271,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 # Exclude core config from options dict
                 options_data = {
                     k: v for k, v in user_input.items()
-                    if k not in [CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_NODE]
+                    if k not in [CONF_CLIENT_ID, CONF_CLIENT_SECRET, CONF_NODE, CONF_NODES]
                 }
                 return self.async_create_entry(title="", data=options_data)
 
@@ -190,10 +286,21 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_CLIENT_SECRET,
                     default=self.config_entry.data.get(CONF_CLIENT_SECRET),
                 ): str,
-                vol.Optional(
-                    CONF_NODE,
-                    default=self.config_entry.data.get(CONF_NODE, DEFAULT_NODE),
-                ): str,
+                **(
+                    {
+                        vol.Required(
+                            CONF_NODES,
+                            default=", ".join(self.config_entry.data[CONF_NODES]),
+                        ): str,
+                    }
+                    if self._is_hub
+                    else {
+                        vol.Optional(
+                            CONF_NODE,
+                            default=self.config_entry.data.get(CONF_NODE, DEFAULT_NODE),
+                        ): str,
+                    }
+                ),
                 vol.Required(
                     CONF_UPDATE_RTD,
                     default=self.config_entry.options.get(CONF_UPDATE_RTD, True),
@@ -210,6 +317,41 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_UPDATE_PRSL,
                     default=self.config_entry.options.get(CONF_UPDATE_PRSL, True),
                 ): bool,
+                vol.Required(
+                    CONF_MAX_RETRIES,
+                    default=self.config_entry.options.get(CONF_MAX_RETRIES, DEFAULT_MAX_RETRIES),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=5)),
+                vol.Required(
+                    CONF_REQUESTS_PER_MINUTE,
+                    default=self.config_entry.options.get(
+                        CONF_REQUESTS_PER_MINUTE, DEFAULT_REQUESTS_PER_MINUTE
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=600)),
+                vol.Required(
+                    CONF_WINDOW_HOURS,
+                    default=self.config_entry.options.get(CONF_WINDOW_HOURS, DEFAULT_WINDOW_HOURS),
+                ): str,
+                vol.Required(
+                    CONF_HOURLY_SENSORS,
+                    default=self.config_entry.options.get(CONF_HOURLY_SENSORS, False),
+                ): bool,
+                vol.Required(
+                    CONF_DAILY_SENSORS,
+                    default=self.config_entry.options.get(CONF_DAILY_SENSORS, False),
+                ): bool,
+                # Suggested rather than defaulted, so the bands can be cleared
+                vol.Optional(
+                    CONF_TOU_BANDS,
+                    description={
+                        "suggested_value": self.config_entry.options.get(
+                            CONF_TOU_BANDS, DEFAULT_TOU_BANDS
+                        )
+                    },
+                ): str,
+                vol.Required(
+                    CONF_DEDICATED_SESSION,
+                    default=self.config_entry.options.get(CONF_DEDICATED_SESSION, False),
+                ): bool,
             }
         )
 
@@ -4,13 +4,16 @@ DOMAIN = "nz_wits"
 
 # API Configuration
 API_BASE_URL = "https://api.electricityinfo.co.nz"
-TOKEN_URL = f"{API_BASE_URL}/login/oauth2/token"
-PRICES_URL = f"{API_BASE_URL}/api/market-prices/v1/prices"
+TOKEN_PATH = "/login/oauth2/token"
+PRICES_PATH = "/api/market-prices/v1/prices"
+TOKEN_URL = f"{API_BASE_URL}{TOKEN_PATH}"
+PRICES_URL = f"{API_BASE_URL}{PRICES_PATH}"
 
 # Configuration keys
 CONF_CLIENT_ID = "client_id"
 CONF_CLIENT_SECRET = "client_secret"
 CONF_NODE = "node"
+CONF_NODES = "nodes"  # Hub entries: the set of nodes one entry monitors
 
 # Options keys for update toggles
 CONF_UPDATE_RTD = "update_rtd"
@@ -19,6 +22,9 @@ CONF_UPDATE_PRSS = "update_prss"
 CONF_UPDATE_PRSL = "update_prsl"
 
 
+# Dispatcher signal sent when an entry's options change, formatted with the entry id
+SIGNAL_OPTIONS_UPDATED = f"{DOMAIN}_options_updated_{{}}"
+
 # Default values
 DEFAULT_NODE = "TGA0331"
 
@@ -28,21 +34,128 @@ SCHEDULE_INTERIM = "Interim"
 SCHEDULE_PRSS = "PRSS"
 SCHEDULE_PRSL = "PRSL"
 
+TRADING_PERIOD_SECONDS = 30 * 60
+
+# poll_interval: how often the schedule is published, in seconds.
+# publish_delay: how long after each publish boundary to poll, in seconds.
 SCHEDULE_TYPES = {
     SCHEDULE_RTD: {
         "name": "Real Time Dispatch (RTD)",
         "params": {"schedules": SCHEDULE_RTD, "marketType": "E", "offset": 0},
+        "poll_interval": 5 * 60,  # Every dispatch interval
+        "publish_delay": 45,
     },
     SCHEDULE_INTERIM: {
         "name": "Interim Price",
         "params": {"schedules": "Interim", "marketType": "E", "back": 3, "offset": 0},
+        "poll_interval": 30 * 60,  # Settles per trading period
+        "publish_delay": 2 * 60,
     },
     SCHEDULE_PRSS: {
         "name": "Price Responsive Schedule Short (PRSS)",
         "params": {"schedules": SCHEDULE_PRSS, "marketType": "E", "forward": 6, "offset": 0},
+        "poll_interval": 30 * 60,
+        "publish_delay": 4 * 60,
     },
     SCHEDULE_PRSL: {
         "name": "Price Responsive Schedule Long (PRSL)",
         "params": {"schedules": SCHEDULE_PRSL, "marketType": "E", "forward": 48, "offset": 0},
+        "poll_interval": 2 * 60 * 60,
+        "publish_delay": 10 * 60,
     },
 }
+
+# Coordinator fetch pipeline
+SCHEDULE_FETCH_TIMEOUT = 60  # Seconds allowed for a single schedule fetch, retries included
+
+# Shared hub batching
+MAX_NODES_PER_REQUEST = 50  # Nodes combined into one `nodes=` request
+HUB_BATCH_WINDOW = 0.25  # Seconds to wait for other coordinators to join a batch
+HUB_RESULT_TTL = 60  # Seconds a batched result can be served to late callers
+MAX_CONCURRENT_REQUESTS = 4  # Batched requests a hub has in flight at once, across all its nodes
+MAX_CONDITIONAL_ENTRIES = 32  # Responses kept per client for If-None-Match/If-Modified-Since
+
+# OAuth token cache
+TOKEN_REFRESH_MARGIN = 120  # Seconds before expiry to treat a token as stale
+TOKEN_STORAGE_KEY = f"{DOMAIN}.tokens"
+TOKEN_STORAGE_VERSION = 1
+
+# Polling scheduler
+CATCH_UP_DELAY = 60  # Seconds before re-polling a schedule that has not published yet
+MAX_CATCH_UP_ATTEMPTS = 3
+STALE_AFTER = 2 * TRADING_PERIOD_SECONDS  # Seconds after a schedule's newest period ends that it is still shown
+
+# Option that enables each schedule
+SCHEDULE_OPTIONS = {
+    SCHEDULE_RTD: CONF_UPDATE_RTD,
+    SCHEDULE_INTERIM: CONF_UPDATE_INTERIM,
+    SCHEDULE_PRSS: CONF_UPDATE_PRSS,
+    SCHEDULE_PRSL: CONF_UPDATE_PRSL,
+}
+
+# Services
+SERVICE_GET_FORECAST = "get_forecast"
+ATTR_NODE = "node"
+ATTR_SCHEDULE = "schedule"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_AGGREGATION = "aggregation"
+AGGREGATION_NONE = "none"
+AGGREGATION_HOURLY = "hourly"
+AGGREGATION_SUMMARY = "summary"
+AGGREGATION_DAILY = "daily"
+AGGREGATION_TOU = "tou"
+SERVICE_GET_PRICE = "get_price"
+ATTR_TIME = "time"
+# Schedules merged for price queries, highest precedence first: settled
+# prices, then dispatch, then the shorter-range forecast over the longer
+PRICE_INDEX_PRECEDENCE = (SCHEDULE_INTERIM, SCHEDULE_RTD, SCHEDULE_PRSS, SCHEDULE_PRSL)
+
+# Warm-start cache
+CACHE_STORAGE_VERSION = 1
+CACHE_SAVE_DELAY = 30  # Seconds to coalesce cache writes
+CACHE_MAX_AGE = 48 * 60 * 60  # Older caches are ignored (the PRSL horizon)
+
+# Request engine
+CONF_MAX_RETRIES = "max_retries"
+CONF_REQUESTS_PER_MINUTE = "requests_per_minute"
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_REQUESTS_PER_MINUTE = 60
+RETRY_BASE_DELAY = 1.0  # Seconds; doubled on every retry
+RETRY_MAX_DELAY = 15.0  # Longest backoff or Retry-After we are willing to wait
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before requests are paused
+BREAKER_RESET_TIMEOUT = 300  # Seconds before a paused host is probed again
+
+# Instrumentation
+METRICS_WINDOW = 100  # Samples kept per rolling histogram
+
+# Historical backfill into long-term statistics
+SERVICE_BACKFILL_HISTORY = "backfill_history"
+BACKFILL_SCHEDULES = ["Final", SCHEDULE_INTERIM]
+BACKFILL_STORAGE_VERSION = 1
+BACKFILL_PAGE_PERIODS = 48  # Trading periods per request (one day)
+BACKFILL_IMPORT_PAGES = 7  # Pages fetched between statistics imports and progress saves
+BACKFILL_PAGE_DELAY = 2.0  # Seconds between pages, leaving room for live polling
+
+# Forecast analytics
+CONF_WINDOW_HOURS = "window_hours"
+DEFAULT_WINDOW_HOURS = "1, 2, 4"
+MAX_WINDOW_HOURS = 24
+FORECAST_PERCENTILES = (10, 25, 50, 75, 90)
+
+# Resampling into hourly, daily and time-of-use buckets
+CONF_HOURLY_SENSORS = "hourly_sensors"
+CONF_DAILY_SENSORS = "daily_sensors"
+CONF_TOU_BANDS = "tou_bands"
+DEFAULT_TOU_BANDS = ""
+RESAMPLE_SCHEDULES = (SCHEDULE_INTERIM, SCHEDULE_PRSS, SCHEDULE_PRSL)  # RTD is a single interval
+
+# Dedicated HTTP session
+CONF_DEDICATED_SESSION = "dedicated_session"
+SESSION_LIMIT_PER_HOST = 8  # Pooled connections to the WITS host
+SESSION_KEEPALIVE_TIMEOUT = 90  # Seconds an idle connection is kept for reuse
+SESSION_DNS_CACHE_TTL = 600  # Seconds a resolved WITS address is reused
+
+# Forecast accuracy
+ACCURACY_SETTLE_PERIODS = 4  # Periods after a forecast period ends that its Interim price may arrive
+ACCURACY_MAX_SAMPLES = 336  # Errors per lead time before older ones are averaged out (a week)
@@ -1,72 +1,697 @@
 """DataUpdateCoordinator for the NZ WITS integration."""
+import asyncio
 import async_timeout
 from datetime import timedelta, datetime # Added datetime
 import logging
+import time
 
+from homeassistant.helpers.event import async_track_point_in_utc_time
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, CALLBACK_TYPE, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.util import dt as dt_util
 
-from .api import WitsApiClient, CannotConnect, InvalidAuth
-from .const import DOMAIN, SCHEDULE_TYPES
+from .accuracy import FORECAST_SCHEDULES, ForecastAccuracyTracker
+from .analytics import ForecastAnalytics, analyze_forecast, parse_window_hours
+from .api import CannotConnect, InvalidAuth
+from .cache import WitsDataCache
+from .hub import WitsHub
+from .metrics import WitsMetrics
+from .price_index import PriceIndex
+from .price_store import PriceStore
+from .resample import ResampledPrices, ResampleSettings, resample
+from .series import PriceSeries
+from .snapshot import ScheduleSnapshot, build_snapshot
+from .trading_clock import TradingPeriod, current_period_start, next_period_start, period_of
+from .const import (
+    DOMAIN,
+    SCHEDULE_TYPES,
+    SCHEDULE_OPTIONS,
+    SCHEDULE_PRSS,
+    SCHEDULE_PRSL,
+    SCHEDULE_INTERIM,
+    RESAMPLE_SCHEDULES,
+    DEFAULT_WINDOW_HOURS,
+    SCHEDULE_FETCH_TIMEOUT,
+    CATCH_UP_DELAY,
+    MAX_CATCH_UP_ATTEMPTS,
+    STALE_AFTER,
+    TRADING_PERIOD_SECONDS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 
 class WitsDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching WITS data from the API."""
+    """Class to manage fetching WITS data from the API.
 
-    def __init__(self, hass: HomeAssistant, api_client: WitsApiClient, node: str):
-        """Initialize."""
-        self.api_client = api_client
+    Each schedule is polled on its own cadence, just after the boundary at which
+    WITS is expected to publish it. The coordinator wakes up for whichever
+    schedule is due next and carries the others forward unchanged.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        hub: WitsHub,
+        node: str,
+        enabled_schedules: set[str] | None = None,
+        cache: WitsDataCache | None = None,
+        window_hours: list[float] | None = None,
+        driven: bool = False,
+        resampling: ResampleSettings | None = None,
+    ):
+        """Initialize.
+
+        A ``driven`` coordinator sets no timers of its own; a WitsHubCoordinator
+        refreshes it and moves it onto each new trading period.
+        """
+        self.hub = hub
         self.node = node
-        # Define a default update interval, e.g., 5 minutes.
-        # This can be made configurable later if needed.
+        # The entry data this coordinator was set up with
+        self.setup_data: dict = {}
+        self._driven = driven
+        self._cache = cache
+        # True while the data shown came from the warm-start cache rather than WITS
+        self.restored = False
+        # Schedules switched on in the options, and consumers of each schedule.
+        # Only schedules that are enabled and (once entities exist) in use are fetched.
+        self._enabled_schedules = set(SCHEDULE_TYPES if enabled_schedules is None else enabled_schedules)
+        self._schedule_demand: dict[str, int] = {}
+        self._demand_tracked = False
+        self._plan_pending = False
+        self.store = PriceStore()
+        # Last error per schedule, cleared when the schedule next succeeds
+        self.schedule_errors: dict[str, str] = {}
+        # When each schedule should next be polled; all are due on the first refresh
+        self._next_poll: dict[str, datetime] = {}
+        self._catch_up_attempts: dict[str, int] = {}
+        # What each sensor shows, rebuilt after every update and period boundary
+        self.snapshots: dict[str, ScheduleSnapshot] = {}
+        # Forecast statistics and windows for PRSS/PRSL, rebuilt with the snapshots
+        self._window_hours = window_hours or parse_window_hours(DEFAULT_WINDOW_HOURS)
+        self.analytics: dict[str, ForecastAnalytics] = {}
+        # Buckets per schedule and kind, recomputed only for schedules that changed
+        self._resampling = resampling or ResampleSettings()
+        self.resampled: dict[str, dict[str, ResampledPrices]] = {}
+        # Recent forecasts, scored against Interim prices as they settle
+        self.accuracy = ForecastAccuracyTracker()
+        # The trading period in force when the snapshots were last built
+        self.current_period: TradingPeriod | None = None
+        # Schedules whose snapshot changed in the last rebuild; only their sensors write state
+        self.changed_schedules: set[str] = set()
+        self._fingerprints: dict[str, int] = {}
+        # Merged price intervals for point and range queries, built on first use
+        self._price_index: PriceIndex | None = None
+        self._unsub_period_boundary: CALLBACK_TYPE | None = None
+        # Refresh wall time and per-schedule fetch/merge times and failures
+        self.metrics = WitsMetrics()
         super().__init__(
             hass,
             _LOGGER,
             name=f"{DOMAIN} ({node})",
-            update_interval=timedelta(minutes=5),
+            # Replaced after every refresh with the time until the next due schedule
+            update_interval=None if driven else timedelta(minutes=5),
+        )
+
+    @property
+    def fetch_plan(self) -> list[str]:
+        """Return the schedules that are fetched, in SCHEDULE_TYPES order."""
+        return [
+            key for key in SCHEDULE_TYPES
+            if key in self._enabled_schedules
+            and (not self._demand_tracked or self._schedule_demand.get(key, 0) > 0)
+        ]
+
+    @callback
+    def async_set_enabled_schedules(self, enabled_schedules: set[str]) -> None:
+        """Update the schedules enabled in the options."""
+        self._enabled_schedules = set(enabled_schedules)
+        self._async_apply_plan()
+
+    @property
+    def window_hours(self) -> list[float]:
+        """Return the durations of the cheapest/most expensive windows."""
+        return list(self._window_hours)
+
+    @callback
+    def async_set_window_hours(self, window_hours: list[float]) -> None:
+        """Change the window durations and rebuild the analytics straight away."""
+        if window_hours == self._window_hours:
+            return
+        self._window_hours = list(window_hours)
+        if self.data is not None:
+            self._build_snapshots(self.data, dt_util.utcnow())
+            self.async_update_listeners()
+
+    @property
+    def resampling(self) -> ResampleSettings:
+        """Return the buckets kept for every schedule and the time-of-use bands."""
+        return self._resampling
+
+    @callback
+    def async_set_resampling(self, resampling: ResampleSettings) -> None:
+        """Change the buckets or bands and resample straight away."""
+        if resampling == self._resampling:
+            return
+        self._resampling = resampling
+        if self.data is not None:
+            self._build_snapshots(self.data, dt_util.utcnow())
+            self.async_update_listeners()
+
+    @callback
+    def async_track_schedule(self, schedule_key: str) -> CALLBACK_TYPE:
+        """Register a consumer of a schedule; returns a callback to unregister it."""
+        self._demand_tracked = True
+        self._schedule_demand[schedule_key] = self._schedule_demand.get(schedule_key, 0) + 1
+        if not self._plan_pending:
+            # Entities register one after another; applying the plan before they
+            # all have would drop the restored data of schedules not yet claimed
+            self._plan_pending = True
+            self.hass.loop.call_soon(self._async_apply_pending_plan)
+
+        @callback
+        def _untrack() -> None:
+            count = self._schedule_demand.get(schedule_key, 0) - 1
+            if count > 0:
+                self._schedule_demand[schedule_key] = count
+            else:
+                self._schedule_demand.pop(schedule_key, None)
+            self._async_apply_plan()
+
+        return _untrack
+
+    @callback
+    def _async_apply_pending_plan(self) -> None:
+        """Apply the plan once the entities registering together have all done so."""
+        self._plan_pending = False
+        self._async_apply_plan()
+
+    @callback
+    def _async_apply_plan(self) -> None:
+        """Drop state for schedules that left the plan and fetch ones that joined it."""
+        plan = set(self.fetch_plan)
+        for key in list(self._next_poll):
+            if key not in plan:
+                del self._next_poll[key]
+                self._catch_up_attempts.pop(key, None)
+                self.schedule_errors.pop(key, None)
+        for key in SCHEDULE_TYPES:
+            if key not in plan:
+                self.store.drop(self.node, key)
+        if self.data is None:
+            return
+        for key in [k for k in SCHEDULE_TYPES if k in self.data and k not in plan]:
+            del self.data[key]
+            self.snapshots.pop(key, None)
+            self._fingerprints.pop(key, None)
+            self._price_index = None
+        if any(key not in self.data for key in plan):
+            # Newly planned schedules have no data yet; fetch them straight away
+            self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def async_restore(self, data: dict) -> None:
+        """Show cached data straight away, until the first live refresh replaces it."""
+        plan = self.fetch_plan
+        restored = {key: data[key] for key in plan if data.get(key) is not None}
+        now = dt_util.utcnow()
+        for key, series in restored.items():
+            self.store.restore(self.node, key, series)
+            self.store.trim(self.node, key, now)
+            restored[key] = self.store.series(self.node, key)
+        restored["last_api_success_utc"] = data.get("last_api_success_utc")
+        self.restored = True
+        self.data = restored
+        self._build_snapshots(restored, now)
+        _LOGGER.debug("Restored cached WITS data for node %s: %s", self.node, list(restored))
+
+    @property
+    def price_index(self) -> PriceIndex:
+        """Return every schedule's prices merged by precedence, rebuilt after a change."""
+        if self._price_index is None:
+            self._price_index = PriceIndex(self.data or {})
+        return self._price_index
+
+    @property
+    def next_poll(self) -> dict[str, datetime]:
+        """Return when each schedule will next be polled."""
+        return dict(self._next_poll)
+
+    @property
+    def has_prices(self) -> bool:
+        """Return True once any schedule has returned prices for this node."""
+        return self.data is not None and any(self.data.get(key) for key in SCHEDULE_TYPES)
+
+    def is_fresh(self, schedule_key: str) -> bool:
+        """Return True if a schedule holds prices that are not stale, however the last refresh went."""
+        return _is_fresh(
+            self.data.get(schedule_key) if self.data else None, dt_util.utcnow().timestamp()
         )
 
+    @property
+    def next_due(self) -> datetime | None:
+        """Return when the next schedule is due, or None if nothing has been polled."""
+        return min(self._next_poll.values()) if self._next_poll else None
+
+    def is_due(self, now: datetime) -> bool:
+        """Return True if any schedule should be polled now."""
+        return bool(self._due_schedules(now))
+
+    def async_mark_due(self, schedule_key: str) -> None:
+        """Poll a schedule on the next refresh regardless of its cadence."""
+        self._next_poll.pop(schedule_key, None)
+
+    def _due_schedules(self, now: datetime) -> list[str]:
+        """Return the schedules that should be polled now."""
+        plan = self.fetch_plan
+        if self.data is None:
+            return plan
+        # Allow a little slack so timer jitter does not push a poll a whole cycle
+        horizon = now + timedelta(seconds=1)
+        return [
+            key for key in plan
+            if key not in self._next_poll or self._next_poll[key] <= horizon
+        ]
+
+    async def _async_fetch_schedule(
+        self, schedule_key: str, max_age: float, now: datetime
+    ) -> PriceSeries:
+        """Fetch a single schedule through the hub, bounded by its own deadline.
+
+        Only the periods that can still change are requested; the response is
+        merged into the price store and the full series returned in compact form.
+        """
+        overrides = self.store.request_params(self.node, schedule_key, now)
+        started = time.perf_counter()
+        async with async_timeout.timeout(SCHEDULE_FETCH_TIMEOUT):
+            prices = await self.hub.async_get_price_data(
+                schedule_key, self.node, max_age, overrides
+            )
+        fetched = time.perf_counter()
+        self.store.merge(self.node, schedule_key, prices)
+        self.store.trim(self.node, schedule_key, now)
+        series = self.store.series(self.node, schedule_key)
+        self.metrics.record("fetch_ms", (fetched - started) * 1000, schedule_key)
+        self.metrics.record("merge_ms", (time.perf_counter() - fetched) * 1000, schedule_key)
+        return series
+
     async def _async_update_data(self):
         """Fetch data from API endpoint.
 
-        This is the place to pre-process the data to lookup tables
-        so entities can quickly look up their data.
+        Only the schedules that are due are requested, concurrently. A schedule
+        that fails keeps its previous data (if any) and records its error in
+        ``schedule_errors``, so one slow or broken schedule does not fail the
+        whole update; it only fails when no planned schedule still holds fresh
+        prices. The wall time of every refresh is recorded in ``metrics``.
         """
+        started = time.perf_counter()
         try:
-            # Using async_timeout.timeout protects against API hangs indefinitely.
-            # Adjust timeout as necessary for your API.
-            async with async_timeout.timeout(30):
-                # Fetch data for all relevant schedule types.
-                # The API client is expected to fetch data for its configured node.
-                # We will store data for all schedules under a common structure.
-                all_schedule_data = {}
-                for schedule_key, schedule_info in SCHEDULE_TYPES.items():
-                    price_data = await self.api_client.get_price_data(schedule_key)
-                    all_schedule_data[schedule_key] = price_data
-
-                if not any(all_schedule_data.values()): # Check if all schedules returned empty data
-                    # This could indicate an issue with the node or API returning no data
-                    # even if the calls were successful.
-                    _LOGGER.warning("No price data received for node %s across all schedules.", self.node)
-                    # Depending on desired behavior, you might raise UpdateFailed here
-                    # or return the empty structure. For now, returning it.
-
-                # Add a timestamp for when the API call was successful
-                all_schedule_data["last_api_success_utc"] = datetime.utcnow()
-
-                return all_schedule_data
-        except InvalidAuth as err:
-            # Raising ConfigEntryAuthFailed will direct user to reconfigure the integration.
-            # This is for cases where credentials are no longer valid.
-            _LOGGER.error("Authentication failed while updating WITS data: %s", err)
-            raise UpdateFailed(f"Authentication failed: {err}") from err
-        except CannotConnect as err:
-            # Temporary connection issues should raise UpdateFailed to retry later.
-            _LOGGER.error("Error connecting to WITS API while updating data: %s", err)
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
-        except Exception as err:
-            # Catch any other unexpected errors.
-            _LOGGER.exception("Unexpected error fetching WITS data for node %s: %s", self.node, err)
+            return await self._async_refresh_schedules()
+        finally:
+            self.metrics.record("refresh_ms", (time.perf_counter() - started) * 1000)
+
+    async def _async_refresh_schedules(self) -> dict:
+        """Fetch the due schedules and combine them with the data carried forward."""
+        now = dt_util.utcnow()
+        schedule_keys = self._due_schedules(now)
+        # Batched results fetched after the schedule became due can be shared
+        max_ages = {
+            key: max((now - self._next_poll[key]).total_seconds(), 0)
+            if key in self._next_poll else 0
+            for key in schedule_keys
+        }
+        results = await asyncio.gather(
+            *(self._async_fetch_schedule(key, max_ages[key], now) for key in schedule_keys),
+            return_exceptions=True,
+        )
+
+        previous = self.data or {}
+        all_schedule_data = {key: previous.get(key) for key in self.fetch_plan}
+        errors: dict[str, Exception] = {}
+        for schedule_key, result in zip(schedule_keys, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result  # Propagate cancellation and other non-errors
+                # Keep the last good data for this schedule, if we have any
+                errors[schedule_key] = result
+                self.metrics.increment("fetch_failures", schedule_key)
+                self._schedule_retry(schedule_key, now)
+            else:
+                self._schedule_next_poll(schedule_key, now, result, previous.get(schedule_key))
+                all_schedule_data[schedule_key] = result
+                self.schedule_errors.pop(schedule_key, None)
+                if schedule_key in FORECAST_SCHEDULES:
+                    self.accuracy.record(schedule_key, result, now)
+
+        self.schedule_errors.update(
+            {key: _describe_error(err) for key, err in errors.items()}
+        )
+        if SCHEDULE_INTERIM in schedule_keys and SCHEDULE_INTERIM not in errors:
+            self.accuracy.score(all_schedule_data[SCHEDULE_INTERIM], now)
+        else:
+            self.accuracy.changed = set()
+        self._update_interval_from_schedule(now)
+
+        timestamp = now.timestamp()
+        if (
+            schedule_keys
+            and len(errors) == len(schedule_keys)
+            and not any(_is_fresh(all_schedule_data[key], timestamp) for key in self.fetch_plan)
+        ):
+            # Nothing succeeded and nothing held is still usable; surface the most meaningful error
+            err = next(
+                (e for e in errors.values() if isinstance(e, InvalidAuth)),
+                next(iter(errors.values())),
+            )
+            if isinstance(err, InvalidAuth):
+                _LOGGER.error("Authentication failed while updating WITS data: %s", err)
+                raise UpdateFailed(f"Authentication failed: {err}") from err
+            if isinstance(err, (CannotConnect, asyncio.TimeoutError)):
+                _LOGGER.error("Error connecting to WITS API while updating data: %s", err)
+                raise UpdateFailed(f"Error communicating with API: {err}") from err
+            _LOGGER.error("Unexpected error fetching WITS data for node %s: %s", self.node, err)
             raise UpdateFailed(f"An unexpected error occurred: {err}") from err
+
+        for schedule_key in errors:
+            _LOGGER.warning(
+                "Failed to update %s schedule for node %s, keeping previous data: %s",
+                schedule_key,
+                self.node,
+                self.schedule_errors[schedule_key],
+            )
+
+        if not any(all_schedule_data.values()):  # Check if all schedules returned empty data
+            # This could indicate an issue with the node or API returning no data
+            # even if the calls were successful.
+            _LOGGER.warning("No price data received for node %s across all schedules.", self.node)
+
+        # Add a timestamp for when the API call was successful
+        if len(errors) < len(schedule_keys):
+            all_schedule_data["last_api_success_utc"] = datetime.utcnow()
+            self.restored = False
+            if self._cache is not None:
+                self._cache.async_save(all_schedule_data)
+        else:
+            all_schedule_data["last_api_success_utc"] = previous.get("last_api_success_utc")
+
+        self._build_snapshots(all_schedule_data, dt_util.utcnow())
+        return all_schedule_data
+
+    @callback
+    def _build_snapshots(self, data: dict, now: datetime) -> None:
+        """Rebuild every schedule's sensor snapshot, and again at the next period boundary.
+
+        Each schedule is fingerprinted on everything its sensor shows other than
+        the refresh time, and ``changed_schedules`` records which ones differ.
+        Forecast analytics cover the periods from the current one onwards, so
+        they are rebuilt here too. Resampled buckets are only recomputed for
+        changed schedules.
+        """
+        timestamp = now.timestamp()
+        self.current_period = period_of(timestamp)
+        period_start = current_period_start(timestamp)
+        fingerprints = {
+            key: hash((
+                data[key].fingerprint(),
+                period_start,
+                self.schedule_errors.get(key),
+                self.restored,
+                tuple(self._window_hours),
+                self._resampling,
+            ))
+            for key in SCHEDULE_TYPES
+            if data.get(key) is not None
+        }
+        self.changed_schedules = {
+            key for key, fingerprint in fingerprints.items()
+            if self._fingerprints.get(key) != fingerprint
+        }
+        if fingerprints != self._fingerprints:
+            self._price_index = None
+        self._fingerprints = fingerprints
+        self.analytics = {
+            key: analytics
+            for key in (SCHEDULE_PRSS, SCHEDULE_PRSL)
+            if data.get(key) is not None
+            and (analytics := analyze_forecast(data[key], now, self._window_hours)) is not None
+        }
+        self.resampled = {
+            key: (
+                self.resampled[key]
+                if key in self.resampled and key not in self.changed_schedules
+                else {
+                    kind: resample(data[key], kind, self._resampling.bands)
+                    for kind in self._resampling.kinds
+                }
+            )
+            for key in RESAMPLE_SCHEDULES
+            if data.get(key) is not None
+        }
+        self.snapshots = {
+            key: build_snapshot(
+                key,
+                data[key],
+                now,
+                data.get("last_api_success_utc"),
+                self.schedule_errors.get(key),
+                self.restored,
+                self.analytics.get(key),
+            )
+            for key in SCHEDULE_TYPES
+            if data.get(key) is not None
+        }
+
+        if self._driven:
+            return
+        if self._unsub_period_boundary is not None:
+            self._unsub_period_boundary()
+        next_boundary = next_period_start(timestamp)
+        self._unsub_period_boundary = async_track_point_in_utc_time(
+            self.hass, self._async_period_boundary, dt_util.utc_from_timestamp(next_boundary)
+        )
+
+    @callback
+    def _async_period_boundary(self, now: datetime) -> None:
+        """Move every sensor onto the new trading period, even if no poll is due."""
+        self._unsub_period_boundary = None
+        if self.data is None:
+            return
+        self._build_snapshots(self.data, now)
+        self.async_update_listeners()
+
+    async def async_shutdown(self) -> None:
+        """Cancel the period boundary timer and shut down."""
+        if self._unsub_period_boundary is not None:
+            self._unsub_period_boundary()
+            self._unsub_period_boundary = None
+        await super().async_shutdown()
+
+    def _schedule_next_poll(
+        self, schedule_key: str, now: datetime, prices: PriceSeries, previous: PriceSeries | None
+    ) -> None:
+        """Plan the next poll after a successful fetch.
+
+        If the newest interval has not changed since the last poll, WITS has
+        probably not published yet, so a short catch-up poll is scheduled.
+        """
+        attempts = self._catch_up_attempts.get(schedule_key, 0)
+        if (
+            previous is not None
+            and _latest_marker(prices) == _latest_marker(previous)
+            and attempts < MAX_CATCH_UP_ATTEMPTS
+        ):
+            self._catch_up_attempts[schedule_key] = attempts + 1
+            self._next_poll[schedule_key] = now + timedelta(seconds=CATCH_UP_DELAY)
+            return
+        self._catch_up_attempts[schedule_key] = 0
+        self._next_poll[schedule_key] = _next_publish_poll(schedule_key, now)
+
+    def _schedule_retry(self, schedule_key: str, now: datetime) -> None:
+        """Plan the next poll after a failed fetch."""
+        attempts = self._catch_up_attempts.get(schedule_key, 0)
+        if attempts < MAX_CATCH_UP_ATTEMPTS:
+            self._catch_up_attempts[schedule_key] = attempts + 1
+            self._next_poll[schedule_key] = now + timedelta(seconds=CATCH_UP_DELAY)
+        else:
+            self._catch_up_attempts[schedule_key] = 0
+            self._next_poll[schedule_key] = _next_publish_poll(schedule_key, now)
+
+    def _update_interval_from_schedule(self, now: datetime) -> None:
+        """Wake up again when the next schedule is due."""
+        if self._driven or not self._next_poll:
+            return
+        next_due = min(self._next_poll.values())
+        self.update_interval = max(next_due - now, timedelta(seconds=1))
+
+
+class WitsHubCoordinator(DataUpdateCoordinator):
+    """Drives the node coordinators of a multi-node hub entry from one timer.
+
+    Every node keeps its own schedules, price store and snapshots, but only
+    this coordinator wakes up: the nodes that are due are refreshed together,
+    so the hub folds them into one request per schedule, and one timer moves
+    them all onto each new trading period. ``data`` maps each node to whether
+    its last refresh succeeded.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        hub: WitsHub,
+        nodes: dict[str, WitsDataUpdateCoordinator],
+    ):
+        """Initialize."""
+        self.hub = hub
+        self.nodes = nodes
+        # The entry data this coordinator was set up with
+        self.setup_data: dict = {}
+        self._unsub_period_boundary: CALLBACK_TYPE | None = None
+        # Cycle wall time, and node fetches that failed per schedule
+        self.metrics = WitsMetrics()
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} hub ({len(nodes)} nodes)",
+            update_interval=timedelta(minutes=5),
+        )
+
+    @callback
+    def async_set_enabled_schedules(self, enabled_schedules: set[str]) -> None:
+        """Update the schedules enabled in the options on every node."""
+        for coordinator in self.nodes.values():
+            coordinator.async_set_enabled_schedules(enabled_schedules)
+
+    @callback
+    def async_set_window_hours(self, window_hours: list[float]) -> None:
+        """Change the window durations on every node."""
+        for coordinator in self.nodes.values():
+            coordinator.async_set_window_hours(window_hours)
+
+    @callback
+    def async_set_resampling(self, resampling: ResampleSettings) -> None:
+        """Change the buckets or bands on every node."""
+        for coordinator in self.nodes.values():
+            coordinator.async_set_resampling(resampling)
+
+    async def _async_update_data(self) -> dict[str, bool]:
+        """Refresh the nodes that are due; fail only if every one of them failed."""
+        started = time.perf_counter()
+        now = dt_util.utcnow()
+        due = [
+            coordinator for coordinator in self.nodes.values()
+            if coordinator.data is None or coordinator.is_due(now)
+        ]
+        failures_before = self._fetch_failures()
+        try:
+            await asyncio.gather(*(coordinator.async_refresh() for coordinator in due))
+        finally:
+            for schedule_key, count in self._fetch_failures().items():
+                if count > failures_before[schedule_key]:
+                    self.metrics.increment(
+                        "fetch_failures", schedule_key, count - failures_before[schedule_key]
+                    )
+            self.metrics.record("refresh_ms", (time.perf_counter() - started) * 1000)
+
+        next_due = [d for c in self.nodes.values() if (d := c.next_due) is not None]
+        if next_due:
+            self.update_interval = max(min(next_due) - now, timedelta(seconds=1))
+        self._async_track_period_boundary(now)
+
+        if due and not any(coordinator.last_update_success for coordinator in due):
+            err = due[0].last_exception
+            if isinstance(err.__cause__, InvalidAuth):
+                raise ConfigEntryAuthFailed(str(err)) from err
+            raise UpdateFailed(f"No node could be updated: {err}") from err
+        return {node: coordinator.last_update_success for node, coordinator in self.nodes.items()}
+
+    def _fetch_failures(self) -> dict[str, int]:
+        """Return the failed fetches per schedule, summed over every node."""
+        return {
+            schedule_key: sum(
+                coordinator.metrics.counter("fetch_failures", schedule_key)
+                for coordinator in self.nodes.values()
+            )
+            for schedule_key in SCHEDULE_TYPES
+        }
+
+    @callback
+    def _async_track_period_boundary(self, now: datetime) -> None:
+        """Move every node onto the next trading period when it starts."""
+        if self._unsub_period_boundary is not None:
+            self._unsub_period_boundary()
+        self._unsub_period_boundary = async_track_point_in_utc_time(
+            self.hass,
+            self._async_period_boundary,
+            dt_util.utc_from_timestamp(next_period_start(now.timestamp())),
+        )
+
+    @callback
+    def _async_period_boundary(self, now: datetime) -> None:
+        """Rebuild every node's snapshots for the new trading period."""
+        self._unsub_period_boundary = None
+        for coordinator in self.nodes.values():
+            coordinator._async_period_boundary(now)
+        self._async_track_period_boundary(now)
+
+    async def async_shutdown(self) -> None:
+        """Cancel the period boundary timer and shut down every node."""
+        if self._unsub_period_boundary is not None:
+            self._unsub_period_boundary()
+            self._unsub_period_boundary = None
+        for coordinator in self.nodes.values():
+            await coordinator.async_shutdown()
+        await super().async_shutdown()
+
+
+def enabled_schedules_from_options(options: dict) -> set[str]:
+    """Return the schedules switched on in a config entry's options."""
+    return {
+        schedule_key for schedule_key, option in SCHEDULE_OPTIONS.items()
+        if options.get(option, True)
+    }
+
+
+def _next_publish_poll(schedule_key: str, now: datetime) -> datetime:
+    """Return the first poll time after ``now`` aligned to the schedule's publish cadence.
+
+    Cadences of a trading period or more are counted in trading periods from
+    the start of the trading day, so a two-hourly schedule polls after periods
+    1, 5, 9, ... even on 46- and 50-period DST days. Shorter cadences divide a
+    period evenly and are aligned to the Unix epoch, which matches period
+    boundaries because NZ is a whole number of hours from UTC.
+    """
+    info = SCHEDULE_TYPES[schedule_key]
+    interval = info["poll_interval"]
+    delay = info["publish_delay"]
+    since = now.timestamp() - delay
+    if interval >= TRADING_PERIOD_SECONDS:
+        boundary = next_period_start(since, interval // TRADING_PERIOD_SECONDS)
+    else:
+        boundary = (int(since) // interval + 1) * interval
+    return dt_util.utc_from_timestamp(boundary + delay)
+
+
+def _is_fresh(prices: PriceSeries | None, timestamp: float) -> bool:
+    """Return True if a series' newest period ended no more than STALE_AFTER before ``timestamp``.
+
+    Forecasts stay fresh until their horizon has nearly passed; Interim and
+    RTD, which end at the current period, go stale after a missed hour.
+    """
+    return bool(prices) and (
+        prices.timestamps[-1] + TRADING_PERIOD_SECONDS + STALE_AFTER > timestamp
+    )
+
+
+def _latest_marker(prices: PriceSeries | None) -> tuple | None:
+    """Return a marker identifying the newest interval in a price series."""
+    if not prices:
+        return None
+    return (len(prices), prices.timestamps[-1], prices.prices[-1])
+
+
+def _describe_error(err: Exception) -> str:
+    """Return a short description of a schedule fetch error."""
+    if isinstance(err, asyncio.TimeoutError):
+        return f"Timed out after {SCHEDULE_FETCH_TIMEOUT}s"
+    return str(err) or type(err).__name__
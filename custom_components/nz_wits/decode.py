@@ -0,0 +1,76 @@
+"""Decoding of WITS price responses into compact price points."""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from .price_store import parse_trading_datetime
+from .trading_clock import period_of
+
+try:  # Bundled with Home Assistant; the standard library is the fallback
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# (trading period start as Unix seconds, price in $/MWh, trading period number)
+PricePoint = tuple[int, float, int]
+
+
+def loads(raw: bytes) -> Any:
+    """Decode a JSON body with the fastest decoder available.
+
+    orjson has no way to skip fields, so every record is built in full and
+    only reduced by ``decode_prices``. That is still about twice as fast as
+    the standard library with an ``object_pairs_hook`` that keeps only the
+    fields we use, and the records are dropped as soon as they are reduced.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def decode_prices(
+    data: Any, nodes: list[str], schedule_type: str
+) -> dict[str, list[PricePoint]]:
+    """Split a decoded prices response into points per node, keeping only the fields we use.
+
+    Each price record is read once and reduced to a PricePoint; records for
+    nodes not in ``nodes`` are skipped. Every node in a batch shares the same
+    trading datetimes, so each distinct string is parsed only once. A record
+    without a ``node`` is assigned to the only requested node, and one without
+    a ``tradingPeriod`` gets the period from the trading calendar.
+    """
+    result: dict[str, list[PricePoint]] = {node: [] for node in nodes}
+    if not data or not isinstance(data, list) or "prices" not in data[0]:
+        _LOGGER.warning("Received empty or malformed price data for %s", schedule_type)
+        return result
+
+    only_node = nodes[0] if len(nodes) == 1 else None
+    timestamps: dict[Any, int | None] = {}
+    for schedule_block in data:
+        for price in schedule_block.get("prices") or ():
+            points = result.get(price.get("node") or only_node)
+            if points is None:
+                continue
+            trading_datetime = price.get("tradingDateTime")
+            try:
+                timestamp = timestamps[trading_datetime]
+            except KeyError:
+                timestamp = timestamps[trading_datetime] = parse_trading_datetime(trading_datetime)
+            except TypeError:  # Unhashable, so certainly not a datetime string
+                timestamp = None
+            try:
+                value = float(price["price"])
+                trading_period = int(price.get("tradingPeriod") or 0)
+            except (KeyError, TypeError, ValueError):
+                timestamp = None
+            if timestamp is None:
+                _LOGGER.debug("Skipping malformed %s price: %s", schedule_type, price)
+                continue
+            if not trading_period:
+                trading_period = period_of(timestamp).period
+            points.append((timestamp, value, trading_period))
+    return result
@@ -0,0 +1,78 @@
+"""Diagnostics support for NZ WITS Spot Price."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_CLIENT_ID, CONF_CLIENT_SECRET
+from .backfill import DATA_BACKFILL
+from .coordinator import WitsDataUpdateCoordinator, WitsHubCoordinator
+from .session import DATA_SESSION
+
+TO_REDACT = {CONF_CLIENT_ID, CONF_CLIENT_SECRET}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: WitsDataUpdateCoordinator | WitsHubCoordinator = hass.data[DOMAIN][
+        entry.entry_id
+    ]
+    backfill = hass.data[DOMAIN].get(DATA_BACKFILL)
+    backfill_jobs = backfill.as_dict() if backfill else {}
+    wits_session = hass.data[DOMAIN].get(DATA_SESSION)
+    api_client = coordinator.hub.api_client
+
+    diagnostics: dict[str, Any] = {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "request_engine": api_client.engine.as_dict(),
+        "http_session": (
+            {"dedicated": True, **wits_session.as_dict()}
+            if wits_session is not None and coordinator.hub.dedicated_session_entries
+            else {"dedicated": False}
+        ),
+        "metrics": {
+            "refresh": coordinator.metrics.as_dict(),
+            "api": api_client.metrics.as_dict(),
+            "token": api_client.token_manager.as_dict(),
+        },
+    }
+    if isinstance(coordinator, WitsHubCoordinator):
+        diagnostics["nodes"] = {
+            node: _node_diagnostics(node_coordinator, backfill_jobs)
+            for node, node_coordinator in coordinator.nodes.items()
+        }
+    else:
+        diagnostics.update(_node_diagnostics(coordinator, backfill_jobs))
+    return diagnostics
+
+
+def _node_diagnostics(
+    coordinator: WitsDataUpdateCoordinator, backfill_jobs: dict[str, Any]
+) -> dict[str, Any]:
+    """Return a node's fetch plan, errors, forecast accuracy and backfill jobs."""
+    return {
+        "last_update_success": coordinator.last_update_success,
+        "fetch_plan": {
+            "schedules": coordinator.fetch_plan,
+            "next_poll": {
+                key: when.isoformat() for key, when in coordinator.next_poll.items()
+            },
+            "update_interval_seconds": (
+                coordinator.update_interval.total_seconds()
+                if coordinator.update_interval else None
+            ),
+        },
+        "schedule_errors": dict(coordinator.schedule_errors),
+        "forecast_accuracy": coordinator.accuracy.as_dict(),
+        "backfill": {
+            key: job for key, job in backfill_jobs.items() if job["node"] == coordinator.node
+        },
+    }
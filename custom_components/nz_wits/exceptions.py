@@ -0,0 +1,19 @@
+"""Exceptions for the NZ WITS integration."""
+
+
+class CannotConnect(Exception):
+    """Error to indicate we cannot connect."""
+
+class InvalidAuth(Exception):
+    """Error to indicate there is invalid auth."""
+
+class RateLimited(CannotConnect):
+    """Error to indicate the API asked us to slow down."""
+
+    def __init__(
+        self, message: str, retry_after: float | None = None, status: int | None = None
+    ) -> None:
+        """Initialize with the server's Retry-After, in seconds, if it sent one."""
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status = status
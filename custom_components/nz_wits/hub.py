@@ -0,0 +1,241 @@
+"""Shared per-credential hub that batches WITS requests across nodes."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .api import WitsApiClient
+from .decode import PricePoint
+from .auth import async_get_token_manager, async_release_token_manager
+from .resilience import RequestPolicy
+from .session import async_get_wits_session, async_release_wits_session
+from .const import (
+    DOMAIN,
+    CONF_CLIENT_ID,
+    CONF_NODE,
+    CONF_NODES,
+    HUB_BATCH_WINDOW,
+    HUB_RESULT_TTL,
+    MAX_CONCURRENT_REQUESTS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_HUBS = "hubs"
+
+
+@dataclass(slots=True)
+class _Batch:
+    """The nodes asking for one schedule in the current batch window, and their request."""
+
+    nodes: set[str] = field(default_factory=set)
+    future: asyncio.Future | None = None
+    sent: bool = False  # Nodes asking once the request is sent need a new batch
+
+
+class WitsHub:
+    """Combines price requests from the registered nodes into one request per schedule.
+
+    Coordinators that ask for the same schedule within ``HUB_BATCH_WINDOW`` share a
+    single multi-node request covering only the nodes that asked, so nodes with
+    the schedule disabled or not due are not fetched. The split result is kept
+    for ``HUB_RESULT_TTL`` seconds so coordinators refreshing slightly later are
+    served without another round trip. At most ``MAX_CONCURRENT_REQUESTS``
+    batches are sent at once; nodes can still join a batch waiting its turn.
+    """
+
+    def __init__(self, api_client: WitsApiClient):
+        """Initialize the hub."""
+        self.api_client = api_client
+        self._nodes: dict[str, int] = {}
+        # Request policy asked for by each config entry; the strictest applies
+        self._policies: dict[str, RequestPolicy] = {}
+        # Entries that asked for the dedicated WITS session; any one is enough
+        self.dedicated_session_entries: set[str] = set()
+        # Batches are keyed by schedule and any parameter overrides
+        self._inflight: dict[tuple, _Batch] = {}
+        self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._results: dict[tuple, tuple[float, dict[str, list[PricePoint]]]] = {}
+
+    @property
+    def nodes(self) -> list[str]:
+        """Return the registered nodes."""
+        return list(self._nodes)
+
+    def register_node(self, node: str) -> None:
+        """Record that an entry monitors a node through this hub."""
+        self._nodes[node] = self._nodes.get(node, 0) + 1
+
+    def unregister_node(self, node: str) -> None:
+        """Record that an entry no longer monitors a node."""
+        count = self._nodes.get(node, 0) - 1
+        if count > 0:
+            self._nodes[node] = count
+        else:
+            self._nodes.pop(node, None)
+
+    def set_policy(self, entry_id: str, policy: RequestPolicy | None) -> None:
+        """Set (or with None, clear) an entry's request policy and apply the strictest."""
+        if policy is None:
+            self._policies.pop(entry_id, None)
+        else:
+            self._policies[entry_id] = policy
+        self.api_client.engine.set_policy(RequestPolicy.strictest(list(self._policies.values())))
+
+    async def async_get_price_data(
+        self,
+        schedule_type: str,
+        node: str,
+        max_age: float = HUB_RESULT_TTL,
+        overrides: dict[str, Any] | None = None,
+    ) -> list[PricePoint]:
+        """Return prices for one node, served from a shared multi-node request.
+
+        A batched result no older than ``max_age`` seconds is reused; otherwise the
+        caller joins the in-flight batch or starts a new one. Callers asking for
+        different parameter ``overrides`` are batched separately.
+        """
+        key = (schedule_type, tuple(sorted((overrides or {}).items())))
+        cached = self._results.get(key)
+        if cached and time.monotonic() - cached[0] <= max_age and node in cached[1]:
+            return cached[1][node]
+
+        batch = self._inflight.get(key)
+        if batch is None or (batch.sent and node not in batch.nodes):
+            batch = self._start_batch(key)
+        batch.nodes.add(node)
+
+        result = await asyncio.shield(batch.future)
+        return result.get(node, [])
+
+    def _start_batch(self, key: tuple) -> _Batch:
+        """Start a new batch that nodes can join until its request is sent."""
+        batch = _Batch()
+        batch.future = asyncio.ensure_future(self._async_fetch_batch(key, batch))
+        self._inflight[key] = batch
+
+        def _done(fut: asyncio.Future) -> None:
+            if self._inflight.get(key) is batch:
+                del self._inflight[key]
+            if not fut.cancelled() and fut.exception() is None:
+                self._results[key] = (time.monotonic(), fut.result())
+
+        batch.future.add_done_callback(_done)
+        return batch
+
+    async def _async_fetch_batch(
+        self, key: tuple, batch: _Batch
+    ) -> dict[str, list[PricePoint]]:
+        """Wait briefly for other callers, then fetch the schedule for the nodes that asked."""
+        schedule_type, overrides = key
+        await asyncio.sleep(HUB_BATCH_WINDOW)
+        async with self._request_slots:
+            batch.sent = True
+            _LOGGER.debug(
+                "Fetching %s for %d node(s) in one batch", schedule_type, len(batch.nodes)
+            )
+            return await self.api_client.get_price_data_for_nodes(
+                schedule_type, sorted(batch.nodes), dict(overrides)
+            )
+
+
+def config_nodes(config: dict[str, Any]) -> list[str]:
+    """Return the nodes a config entry monitors: its node, or a hub entry's nodes."""
+    if CONF_NODES in config:
+        return list(config[CONF_NODES])
+    return [config[CONF_NODE]]
+
+
+def parse_nodes(value: str) -> list[str]:
+    """Parse a comma or whitespace separated list of node codes, e.g. ``"TGA0331, HAY2201"``.
+
+    Codes are upper-cased and duplicates dropped. Raises ValueError if a code
+    is not alphanumeric or the list is empty.
+    """
+    nodes: list[str] = []
+    for part in value.replace(",", " ").split():
+        node = part.upper()
+        if not node.isalnum():
+            raise ValueError(f"Invalid node: {part}")
+        if node not in nodes:
+            nodes.append(node)
+    if not nodes:
+        raise ValueError("No nodes given")
+    return nodes
+
+
+async def async_get_hub(
+    hass: HomeAssistant,
+    config: dict[str, Any],
+    entry_id: str | None = None,
+    policy: RequestPolicy | None = None,
+    dedicated_session: bool = False,
+) -> WitsHub:
+    """Return the shared hub for these credentials, creating it if needed."""
+    hubs: dict[str, WitsHub] = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_HUBS, {})
+    client_id = config[CONF_CLIENT_ID]
+    hub = hubs.get(client_id)
+    if hub is None or not hub.api_client.matches_credentials(config):
+        token_manager = await async_get_token_manager(hass, config)
+        token_manager.start_background_refresh()
+        api_client = WitsApiClient(config, async_get_clientsession(hass), token_manager)
+        if hub is None:
+            hub = hubs[client_id] = WitsHub(api_client)
+        else:
+            # Credentials were updated; keep the registered nodes on a fresh client
+            hub.api_client = api_client
+    for node in config_nodes(config):
+        hub.register_node(node)
+    if entry_id is not None:
+        hub.set_policy(entry_id, policy)
+        async_set_dedicated_session(hass, hub, entry_id, dedicated_session)
+    return hub
+
+
+@callback
+def async_set_dedicated_session(
+    hass: HomeAssistant, hub: WitsHub, entry_id: str, enabled: bool
+) -> None:
+    """Record whether an entry wants the dedicated session and switch the hub's client to match.
+
+    The dedicated session is closed once no hub has an entry that wants it.
+    """
+    if enabled:
+        hub.dedicated_session_entries.add(entry_id)
+    else:
+        hub.dedicated_session_entries.discard(entry_id)
+    session = (
+        async_get_wits_session(hass).session
+        if hub.dedicated_session_entries
+        else async_get_clientsession(hass)
+    )
+    hub.api_client.set_session(session)
+    hubs: dict[str, WitsHub] = hass.data.get(DOMAIN, {}).get(DATA_HUBS, {})
+    if not hub.dedicated_session_entries and not any(
+        other.dedicated_session_entries for other in hubs.values()
+    ):
+        async_release_wits_session(hass)
+
+
+def async_release_hub(
+    hass: HomeAssistant, config: dict[str, Any], entry_id: str | None = None
+) -> None:
+    """Release an entry's nodes from their hub, dropping the hub once no nodes remain."""
+    hubs: dict[str, WitsHub] = hass.data.get(DOMAIN, {}).get(DATA_HUBS, {})
+    hub = hubs.get(config[CONF_CLIENT_ID])
+    if hub is None:
+        return
+    for node in config_nodes(config):
+        hub.unregister_node(node)
+    if entry_id is not None:
+        hub.set_policy(entry_id, None)
+        async_set_dedicated_session(hass, hub, entry_id, False)
+    if not hub.nodes:
+        hubs.pop(config[CONF_CLIENT_ID], None)
+        async_release_token_manager(hass, config[CONF_CLIENT_ID])
@@ -0,0 +1,104 @@
+"""Rolling histograms and counters for the NZ WITS request and refresh paths."""
+from __future__ import annotations
+
+from array import array
+from typing import Any
+
+from .const import METRICS_WINDOW
+
+# Key used for measurements that are not broken down, e.g. by schedule
+TOTAL = "all"
+
+
+class RollingHistogram:
+    """The most recent samples of a measurement, kept in a fixed-size ring."""
+
+    __slots__ = ("_samples", "_size", "_next", "count", "last")
+
+    def __init__(self, size: int = METRICS_WINDOW) -> None:
+        """Initialize an empty histogram."""
+        self._samples = array("d")
+        self._size = size
+        self._next = 0
+        # Samples recorded since startup, including those that left the ring
+        self.count = 0
+        self.last: float | None = None
+
+    def add(self, value: float) -> None:
+        """Record a sample, overwriting the oldest once the ring is full."""
+        if len(self._samples) < self._size:
+            self._samples.append(value)
+        else:
+            self._samples[self._next] = value
+            self._next = (self._next + 1) % self._size
+        self.count += 1
+        self.last = value
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the pct-th percentile of the samples in the ring (nearest rank)."""
+        if not self._samples:
+            return None
+        return _nearest_rank(sorted(self._samples), pct)
+
+    def summary(self) -> dict[str, Any]:
+        """Return count, last, mean and percentiles of the samples in the ring."""
+        if not self._samples:
+            return {"count": self.count}
+        ordered = sorted(self._samples)
+        return {
+            "count": self.count,
+            "window": len(ordered),
+            "last": round(self.last, 3),
+            "mean": round(sum(ordered) / len(ordered), 3),
+            "p50": round(_nearest_rank(ordered, 50), 3),
+            "p90": round(_nearest_rank(ordered, 90), 3),
+            "p99": round(_nearest_rank(ordered, 99), 3),
+            "max": round(ordered[-1], 3),
+        }
+
+
+class WitsMetrics:
+    """Named histograms and counters, each optionally broken down by a key."""
+
+    def __init__(self, size: int = METRICS_WINDOW) -> None:
+        """Initialize empty metrics."""
+        self._size = size
+        self._histograms: dict[str, dict[str, RollingHistogram]] = {}
+        self._counters: dict[str, dict[str, int]] = {}
+
+    def record(self, name: str, value: float, key: str | None = None) -> None:
+        """Add a sample to the ``name`` histogram for ``key``."""
+        by_key = self._histograms.setdefault(name, {})
+        histogram = by_key.get(key or TOTAL)
+        if histogram is None:
+            histogram = by_key[key or TOTAL] = RollingHistogram(self._size)
+        histogram.add(value)
+
+    def increment(self, name: str, key: str | None = None, amount: int = 1) -> None:
+        """Add ``amount`` to the ``name`` counter for ``key``."""
+        by_key = self._counters.setdefault(name, {})
+        by_key[key or TOTAL] = by_key.get(key or TOTAL, 0) + amount
+
+    def histogram(self, name: str, key: str | None = None) -> RollingHistogram | None:
+        """Return a histogram, or None if nothing was recorded in it."""
+        return self._histograms.get(name, {}).get(key or TOTAL)
+
+    def counter(self, name: str, key: str | None = None) -> int:
+        """Return a counter's value."""
+        return self._counters.get(name, {}).get(key or TOTAL, 0)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return every histogram summary and counter for diagnostics."""
+        return {
+            "histograms": {
+                name: {key: histogram.summary() for key, histogram in by_key.items()}
+                for name, by_key in self._histograms.items()
+            },
+            "counters": {name: dict(by_key) for name, by_key in self._counters.items()},
+        }
+
+
+def _nearest_rank(ordered: list[float], pct: float) -> float:
+    """Return the pct-th percentile of a sorted, non-empty list."""
+    index = round(pct / 100 * len(ordered) + 0.5) - 1
+    return ordered[min(len(ordered) - 1, max(0, index))]
@@ -0,0 +1,138 @@
+"""Interval index answering price-at-time and range-average queries for one node."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from .const import PRICE_INDEX_PRECEDENCE, TRADING_PERIOD_SECONDS
+from .series import PriceSeries
+from .trading_clock import current_period_start
+
+
+class IndexedPrice(NamedTuple):
+    """The price in force over an interval and the schedule it came from."""
+
+    price: float  # $/MWh
+    schedule: str
+    start: int  # Unix seconds
+    end: int
+
+
+class RangeAverage(NamedTuple):
+    """The time-weighted mean price over the covered part of a range."""
+
+    mean_price: float | None  # $/MWh, None if nothing in the range is covered
+    covered_seconds: int
+    intervals: int
+
+
+class PriceIndex:
+    """A node's schedules merged into sorted, non-overlapping price intervals.
+
+    Where schedules overlap, the one earliest in ``PRICE_INDEX_PRECEDENCE``
+    wins: settled Interim prices over RTD dispatch, and both over the PRSS and
+    then PRSL forecasts. A point lasts until the next point of its schedule or
+    the end of its trading period, whichever is first, so 5-minute RTD
+    intervals and half-hour periods mix freely. Gaps are left uncovered.
+
+    Lookups bisect the interval starts. Prefix sums of price x seconds and of
+    covered seconds make a range average two lookups, whatever its length.
+    """
+
+    __slots__ = ("starts", "ends", "prices", "_sources", "_price_seconds", "_covered")
+
+    def __init__(self, data: dict[str, PriceSeries | None]) -> None:
+        """Build the index from coordinator data keyed by schedule."""
+        layers = [
+            (rank, _intervals(data[schedule]))
+            for rank, schedule in enumerate(PRICE_INDEX_PRECEDENCE)
+            if data.get(schedule)
+        ]
+        boundaries = sorted({t for _, (starts, ends, _) in layers for t in (*starts, *ends)})
+
+        self.starts = array("q")
+        self.ends = array("q")
+        self.prices = array("d")
+        self._sources = array("b")
+        for start, end in zip(boundaries, boundaries[1:]):
+            # Highest-precedence layer covering this elementary segment
+            for rank, (starts, ends, prices) in layers:
+                i = bisect_right(starts, start) - 1
+                if i >= 0 and start < ends[i]:
+                    price = prices[i]
+                    break
+            else:
+                continue
+            if (
+                self.ends and self.ends[-1] == start
+                and self.prices[-1] == price and self._sources[-1] == rank
+            ):
+                self.ends[-1] = end  # Extend the previous interval
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+            self.prices.append(price)
+            self._sources.append(rank)
+
+        self._price_seconds = array("d", [0.0])
+        self._covered = array("q", [0])
+        for start, end, price in zip(self.starts, self.ends, self.prices):
+            self._price_seconds.append(self._price_seconds[-1] + price * (end - start))
+            self._covered.append(self._covered[-1] + end - start)
+
+    def __len__(self) -> int:
+        """Return the number of intervals."""
+        return len(self.starts)
+
+    def price_at(self, timestamp: float) -> IndexedPrice | None:
+        """Return the price in force at an instant, or None if it is not covered."""
+        i = bisect_right(self.starts, timestamp) - 1
+        if i < 0 or timestamp >= self.ends[i]:
+            return None
+        return IndexedPrice(
+            self.prices[i], PRICE_INDEX_PRECEDENCE[self._sources[i]], self.starts[i], self.ends[i]
+        )
+
+    def average(self, start: float, end: float) -> RangeAverage:
+        """Return the time-weighted mean price over the covered part of [start, end)."""
+        if end <= start:
+            return RangeAverage(None, 0, 0)
+        price_seconds_start, covered_start, first = self._cumulative(start)
+        price_seconds_end, covered_end, _ = self._cumulative(end)
+        covered = covered_end - covered_start
+        if covered <= 0:
+            return RangeAverage(None, 0, 0)
+        # Intervals overlapping the range: those starting before ``end``, less
+        # those that ended by ``start``
+        first_overlap = first if first >= 0 and self.ends[first] > start else first + 1
+        last = bisect_left(self.starts, end) - 1
+        return RangeAverage(
+            (price_seconds_end - price_seconds_start) / covered,
+            round(covered),
+            last - first_overlap + 1,
+        )
+
+    def _cumulative(self, timestamp: float) -> tuple[float, float, int]:
+        """Return price x seconds and covered seconds up to an instant, and its interval index."""
+        i = bisect_right(self.starts, timestamp) - 1
+        if i < 0:
+            return 0.0, 0, -1
+        covered = min(timestamp, self.ends[i]) - self.starts[i]
+        return (
+            self._price_seconds[i] + self.prices[i] * covered,
+            self._covered[i] + covered,
+            i,
+        )
+
+
+def _intervals(series: PriceSeries) -> tuple[array, array, array]:
+    """Return a series as (starts, ends, prices), each point lasting to the next or its period end."""
+    timestamps = series.timestamps
+    ends = array("q")
+    for i, timestamp in enumerate(timestamps):
+        end = current_period_start(timestamp) + TRADING_PERIOD_SECONDS
+        if i + 1 < len(timestamps):
+            end = min(end, timestamps[i + 1])
+        ends.append(end)
+    return timestamps, ends, series.prices
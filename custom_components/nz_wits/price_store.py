@@ -0,0 +1,120 @@
+"""Local time-indexed store of WITS prices."""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Any, Iterable
+
+from homeassistant.util import dt as dt_util
+
+from .const import SCHEDULE_TYPES, TRADING_PERIOD_SECONDS
+from .series import PriceSeries
+from .trading_clock import current_period_start
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def parse_trading_datetime(value: Any) -> int | None:
+    """Return a tradingDateTime string as a Unix timestamp, or None if invalid."""
+    if not isinstance(value, str):
+        return None
+    try:
+        # WITS sends ISO 8601 with an offset, which the C parser handles directly
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = dt_util.parse_datetime(value)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_util.get_time_zone("Pacific/Auckland"))
+    return int(parsed.timestamp())
+
+
+class PriceStore:
+    """Prices keyed by (node, schedule, trading datetime).
+
+    New responses are merged in rather than replacing the whole window, so a
+    poll only needs to request the periods that can still change. Periods that
+    have fallen out of a schedule's retention window are trimmed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        # Only the fields the integration uses are kept: (price, trading period)
+        self._periods: dict[tuple[str, str], dict[int, tuple[float, int]]] = {}
+
+    def merge(
+        self, node: str, schedule_type: str, points: Iterable[tuple[int, float, int]]
+    ) -> int:
+        """Merge fetched (timestamp, price, trading period) points; returns how many periods changed."""
+        periods = self._periods.setdefault((node, schedule_type), {})
+        changed = 0
+        for timestamp, price, trading_period in points:
+            point = (price, trading_period)
+            if periods.get(timestamp) != point:
+                periods[timestamp] = point
+                changed += 1
+        return changed
+
+    def series(self, node: str, schedule_type: str) -> PriceSeries:
+        """Return the stored prices for a node and schedule as a compact series."""
+        periods = self._periods.get((node, schedule_type)) or {}
+        return PriceSeries.from_points(
+            node,
+            ((timestamp, *periods[timestamp]) for timestamp in sorted(periods)),
+        )
+
+    def restore(self, node: str, schedule_type: str, series: PriceSeries) -> None:
+        """Seed the store from a previously saved series."""
+        self._periods[(node, schedule_type)] = {
+            timestamp: (price, trading_period)
+            for timestamp, price, trading_period in zip(
+                series.timestamps, series.prices, series.trading_periods
+            )
+        }
+
+    def trim(self, node: str, schedule_type: str, now: datetime) -> int:
+        """Drop periods older than the schedule's retention window; returns how many.
+
+        The newest period is always kept, so a schedule that has not published
+        for the new trading period yet still has a value.
+        """
+        periods = self._periods.get((node, schedule_type))
+        if not periods:
+            return 0
+        cutoff = _retention_cutoff(schedule_type, now)
+        newest = max(periods)
+        expired = [timestamp for timestamp in periods if timestamp < cutoff and timestamp != newest]
+        for timestamp in expired:
+            del periods[timestamp]
+        return len(expired)
+
+    def drop(self, node: str, schedule_type: str) -> None:
+        """Forget everything stored for a node and schedule."""
+        self._periods.pop((node, schedule_type), None)
+
+    def request_params(self, node: str, schedule_type: str, now: datetime) -> dict[str, Any]:
+        """Return parameter overrides that request only the periods that can still change.
+
+        For schedules that look back over several periods (``back``), only the
+        periods since the newest stored one are requested, plus the newest stored
+        period itself because it may not have settled yet. Forecast schedules are
+        re-run as a whole on every publish, so their full window is requested.
+        """
+        full_back = SCHEDULE_TYPES[schedule_type]["params"].get("back")
+        periods = self._periods.get((node, schedule_type))
+        if not full_back or not periods:
+            return {}
+        newest = max(periods)
+        missing = int(now.timestamp() - newest) // TRADING_PERIOD_SECONDS
+        back = min(max(missing, 0) + 1, full_back)
+        if back == full_back:
+            return {}
+        return {"back": back}
+
+
+def _retention_cutoff(schedule_type: str, now: datetime) -> int:
+    """Return the start of the oldest period a schedule keeps, as a Unix timestamp."""
+    back = SCHEDULE_TYPES[schedule_type]["params"].get("back", 0)
+    # Keep the period in force, plus any look-back the schedule asks for
+    return current_period_start(now.timestamp()) - back * TRADING_PERIOD_SECONDS
@@ -0,0 +1,268 @@
+"""Trading-period prices resampled into hourly, daily and time-of-use buckets."""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Mapping
+
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    AGGREGATION_HOURLY,
+    AGGREGATION_DAILY,
+    AGGREGATION_TOU,
+    CONF_HOURLY_SENSORS,
+    CONF_DAILY_SENSORS,
+    CONF_TOU_BANDS,
+    DEFAULT_TOU_BANDS,
+    TRADING_PERIOD_SECONDS,
+)
+from .series import PriceSeries
+from .trading_clock import NZ_TIMEZONE, day_start, period_of
+
+HOUR_SECONDS = 3600
+DAY_MINUTES = 24 * 60
+SLOT_MINUTES = TRADING_PERIOD_SECONDS // 60
+
+
+@dataclass(frozen=True, slots=True)
+class TouBand:
+    """A named set of daily NZ wall-clock ranges and the weight applied to their prices."""
+
+    name: str
+    # (start, end) in minutes after midnight; an end past 1440 runs into the next day
+    ranges: tuple[tuple[int, int], ...]
+    weight: float = 1.0
+
+    @property
+    def key(self) -> str:
+        """Return the band's name as an identifier."""
+        return slugify(self.name)
+
+
+@dataclass(frozen=True, slots=True)
+class ResampleSettings:
+    """Which buckets the coordinator keeps for every schedule, and the TOU bands."""
+
+    kinds: tuple[str, ...] = ()
+    bands: tuple[TouBand, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class ResampledPrices:
+    """A series' mean price per bucket, in $/MWh with band weights applied.
+
+    Buckets are in time order and only those with at least one price are
+    kept. ``periods`` counts the trading periods that had a price, so a bucket
+    is complete when it matches the periods the bucket spans.
+    """
+
+    kind: str
+    starts: array  # Unix seconds
+    ends: array
+    means: array
+    periods: array
+    bands: tuple[str | None, ...]
+
+    def __len__(self) -> int:
+        """Return the number of buckets."""
+        return len(self.starts)
+
+    def current(self, timestamp: float, band: str | None = None) -> int | None:
+        """Return the bucket in force at an instant or the next one, else the latest one.
+
+        With ``band``, only that time-of-use band's buckets are considered.
+        """
+        latest = None
+        for index in range(len(self.starts)):
+            if band is not None and self.bands[index] != band:
+                continue
+            if self.ends[index] > timestamp:
+                return index
+            latest = index
+        return latest
+
+    def bucket(self, index: int) -> dict[str, Any]:
+        """Return a bucket with local ISO times and the price in $/kWh."""
+        result = {
+            "start": _isoformat(self.starts[index]),
+            "end": _isoformat(self.ends[index]),
+            "price": round(self.means[index] / 1000, 5),
+            "periods": self.periods[index],
+            "complete": self.periods[index] * TRADING_PERIOD_SECONDS
+            >= self.ends[index] - self.starts[index],
+        }
+        if self.bands[index] is not None:
+            result["band"] = self.bands[index]
+        return result
+
+    def as_list(self, band: str | None = None) -> list[dict[str, Any]]:
+        """Return every bucket, or only one band's, as ``bucket`` does."""
+        return [
+            self.bucket(index)
+            for index in range(len(self.starts))
+            if band is None or self.bands[index] == band
+        ]
+
+
+@lru_cache(maxsize=64)
+def bucket_bounds(
+    kind: str, start: float, end: float, bands: tuple[TouBand, ...] = ()
+) -> tuple[tuple[int, int, str | None, float], ...]:
+    """Return (start, end, band, weight) for the buckets overlapping [start, end), in time order.
+
+    Hours and days follow NZ time: a day is a trading day, 46 to 50 periods
+    long. Time-of-use buckets are one per band range per day, and a range
+    past midnight stays one bucket. Buckets are not clipped to the range.
+    Every node of a hub covers the same range, so the bounds are cached.
+    """
+    if end <= start:
+        return ()
+    if kind == AGGREGATION_HOURLY:
+        first = int(start) // HOUR_SECONDS * HOUR_SECONDS
+        return tuple(
+            (hour, hour + HOUR_SECONDS, None, 1.0)
+            for hour in range(first, int(-(-end // 1)), HOUR_SECONDS)
+        )
+
+    first_date = period_of(start).trading_date
+    last_date = period_of(end - 1).trading_date
+    days = [
+        first_date + timedelta(days=offset)
+        for offset in range(-1, (last_date - first_date).days + 1)
+    ]
+    if kind == AGGREGATION_DAILY:
+        return tuple(
+            (day_start(day), day_start(day + timedelta(days=1)), None, 1.0)
+            for day in days[1:]
+        )
+    if kind != AGGREGATION_TOU:
+        raise ValueError(f"Unknown bucket kind: {kind}")
+    # The day before is included for ranges that run past its midnight
+    bounds = [
+        (_wall_clock(day, range_start), _wall_clock(day, range_end), band.name, band.weight)
+        for day in days
+        for band in bands
+        for range_start, range_end in band.ranges
+    ]
+    return tuple(sorted(bound for bound in bounds if bound[1] > start and bound[0] < end))
+
+
+def resample(
+    series: PriceSeries, kind: str, bands: tuple[TouBand, ...] = ()
+) -> ResampledPrices:
+    """Return a series' mean price per bucket, walking its periods and the buckets once.
+
+    A period belongs to the bucket its start falls in.
+    """
+    timestamps = series.timestamps
+    bounds = (
+        bucket_bounds(kind, timestamps[0], timestamps[-1] + TRADING_PERIOD_SECONDS, bands)
+        if len(timestamps) else ()
+    )
+    sums = array("d", [0.0]) * len(bounds)
+    counts = array("q", [0]) * len(bounds)
+    bucket = 0
+    for timestamp, price in zip(timestamps, series.prices):
+        while bucket < len(bounds) and bounds[bucket][1] <= timestamp:
+            bucket += 1
+        if bucket == len(bounds):
+            break
+        if timestamp >= bounds[bucket][0]:
+            sums[bucket] += price
+            counts[bucket] += 1
+
+    kept = [index for index, count in enumerate(counts) if count]
+    return ResampledPrices(
+        kind,
+        array("q", [bounds[index][0] for index in kept]),
+        array("q", [bounds[index][1] for index in kept]),
+        array("d", [sums[index] / counts[index] * bounds[index][3] for index in kept]),
+        array("q", [counts[index] for index in kept]),
+        tuple(bounds[index][2] for index in kept),
+    )
+
+
+def parse_tou_bands(value: str) -> tuple[TouBand, ...]:
+    """Parse time-of-use bands, e.g. ``"peak=07:00-11:00,17:00-21:00*1.2; night=23:00-07:00"``.
+
+    Bands are separated by semicolons. Each has a name, one or more NZ
+    wall-clock ranges on half-hour boundaries (24:00 may end a range, and a
+    range ending at or before its start runs past midnight) and an optional
+    weight applied to its prices. Bands may not overlap. Raises ValueError
+    otherwise.
+    """
+    bands: list[TouBand] = []
+    taken = [False] * (DAY_MINUTES // SLOT_MINUTES)
+    for part in value.split(";"):
+        if not part.strip():
+            continue
+        name, equals, spec = part.partition("=")
+        name = name.strip()
+        if not equals or not name or not slugify(name):
+            raise ValueError(f"Invalid time-of-use band: {part.strip()}")
+        if any(band.key == slugify(name) for band in bands):
+            raise ValueError(f"Duplicate time-of-use band: {name}")
+        spec, star, weight_text = spec.partition("*")
+        weight = float(weight_text) if star else 1.0
+        if not weight > 0:
+            raise ValueError(f"Invalid weight for time-of-use band {name}: {weight_text.strip()}")
+
+        ranges = []
+        for text in spec.split(","):
+            start_text, dash, end_text = text.partition("-")
+            if not dash:
+                raise ValueError(f"Invalid time range for time-of-use band {name}: {text.strip()}")
+            start, end = _minutes(start_text), _minutes(end_text)
+            if start == DAY_MINUTES:
+                raise ValueError(f"Invalid time range for time-of-use band {name}: {text.strip()}")
+            if end <= start:
+                end += DAY_MINUTES
+            for slot in range(start // SLOT_MINUTES, end // SLOT_MINUTES):
+                slot %= len(taken)
+                if taken[slot]:
+                    raise ValueError(f"Time-of-use band {name} overlaps another band")
+                taken[slot] = True
+            ranges.append((start, end))
+        bands.append(TouBand(name, tuple(ranges), weight))
+    return tuple(bands)
+
+
+def resampling_from_options(options: Mapping[str, Any]) -> ResampleSettings:
+    """Return the buckets and time-of-use bands configured in a config entry's options."""
+    try:
+        bands = parse_tou_bands(options.get(CONF_TOU_BANDS, DEFAULT_TOU_BANDS))
+    except ValueError:
+        bands = ()
+    kinds = [
+        kind
+        for kind, enabled in (
+            (AGGREGATION_HOURLY, options.get(CONF_HOURLY_SENSORS, False)),
+            (AGGREGATION_DAILY, options.get(CONF_DAILY_SENSORS, False)),
+            (AGGREGATION_TOU, bool(bands)),
+        )
+        if enabled
+    ]
+    return ResampleSettings(tuple(kinds), bands)
+
+
+def _minutes(text: str) -> int:
+    """Return an ``HH:MM`` time on a half-hour boundary as minutes after midnight."""
+    hours, colon, minutes = text.strip().partition(":")
+    value = int(hours) * 60 + int(minutes) if colon else -1
+    if not 0 <= value <= DAY_MINUTES or value % SLOT_MINUTES:
+        raise ValueError(f"Invalid time: {text.strip()}")
+    return value
+
+
+def _wall_clock(day: date, minutes: int) -> int:
+    """Return the Unix time of an NZ wall-clock time, given in minutes after a day's midnight."""
+    midnight = datetime(day.year, day.month, day.day, tzinfo=NZ_TIMEZONE)
+    return int((midnight + timedelta(minutes=minutes)).timestamp())
+
+
+def _isoformat(timestamp: int) -> str:
+    """Return a Unix timestamp as a local ISO 8601 string."""
+    return dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).isoformat()
@@ -0,0 +1,272 @@
+"""Retry, circuit breaker, rate budget and request coalescing for WITS requests."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from .const import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+)
+from .exceptions import CannotConnect, RateLimited
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    """How hard the client tries, and how fast it may send requests."""
+
+    max_retries: int = DEFAULT_MAX_RETRIES
+    requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE
+    base_delay: float = RETRY_BASE_DELAY
+    max_delay: float = RETRY_MAX_DELAY
+
+    @classmethod
+    def strictest(cls, policies: list[RequestPolicy]) -> RequestPolicy:
+        """Combine policies, keeping the most conservative of each setting."""
+        if not policies:
+            return cls()
+        return replace(
+            policies[0],
+            max_retries=min(p.max_retries for p in policies),
+            requests_per_minute=min(p.requests_per_minute for p in policies),
+        )
+
+
+class CircuitBreaker:
+    """Stops requests to a host after repeated failures, then lets one probe through.
+
+    Closed: requests flow. Open: requests fail immediately until ``reset_timeout``
+    has passed. Half-open: a single request is allowed; success closes the
+    breaker and failure opens it again. Callers must ``release_probe`` once a
+    request ends, however it ends, so a cancelled probe cannot hold the
+    breaker half-open for good.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the breaker."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Return closed, open or half_open."""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_request(self) -> None:
+        """Raise CannotConnect if the breaker does not allow a request now."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probe_in_flight):
+            raise CannotConnect("WITS API circuit breaker is open after repeated failures")
+        if state == "half_open":
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker at the threshold."""
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._opened_at is not None or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                _LOGGER.warning("WITS API unavailable, pausing requests for %ss", self._reset_timeout)
+            self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """Let another probe through, without changing the state, if this one did not finish."""
+        self._probe_in_flight = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker state for diagnostics."""
+        return {"state": self.state, "consecutive_failures": self._failures}
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(host: str) -> CircuitBreaker:
+    """Return the circuit breaker shared by every client talking to a host."""
+    if (breaker := _BREAKERS.get(host)) is None:
+        breaker = _BREAKERS[host] = CircuitBreaker()
+    return breaker
+
+
+class RateBudget:
+    """Token bucket limiting how many requests are sent per minute."""
+
+    def __init__(self, requests_per_minute: int) -> None:
+        """Initialize the budget with a full bucket."""
+        self._capacity = float(requests_per_minute)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def set_rate(self, requests_per_minute: int) -> None:
+        """Change the rate, keeping the tokens already available."""
+        self._capacity = float(requests_per_minute)
+        self._tokens = min(self._tokens, self._capacity)
+
+    @property
+    def available(self) -> float:
+        """Return the tokens currently available."""
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._capacity / 60)
+        self._updated = now
+
+    async def async_acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                wait = (1 - self._tokens) * 60 / self._capacity
+                _LOGGER.debug("Request rate budget exhausted, waiting %.1fs", wait)
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= 1
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one call and its result.
+
+    The first caller starts the call; callers arriving while it is in flight
+    await the same outcome, including its exception. The call runs as its own
+    task, so a caller being cancelled does not cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with nothing in flight."""
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Return True if a call for ``key`` is running."""
+        return key in self._calls
+
+    async def async_do(self, key: Hashable, call: Callable[[], Awaitable[_T]]) -> _T:
+        """Return the result of ``call``, or of the call already in flight for ``key``."""
+        future = self._calls.get(key)
+        if future is None:
+            future = self._calls[key] = asyncio.ensure_future(call())
+            future.add_done_callback(partial(self._done, key))
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        """Forget a finished call."""
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # Retrieved here in case every caller was cancelled
+
+
+class RequestEngine:
+    """Runs requests through the rate budget, circuit breaker and retry policy."""
+
+    def __init__(self, host: str, policy: RequestPolicy | None = None) -> None:
+        """Initialize the engine."""
+        self.policy = policy or RequestPolicy()
+        self.breaker = get_circuit_breaker(host)
+        self.budget = RateBudget(self.policy.requests_per_minute)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.last_retry_after: float | None = None
+
+    def set_policy(self, policy: RequestPolicy) -> None:
+        """Apply a new policy."""
+        self.policy = policy
+        self.budget.set_rate(policy.requests_per_minute)
+
+    async def async_call(self, request: Callable[[], Awaitable[_T]]) -> _T:
+        """Call ``request``, retrying connection errors with jittered exponential backoff.
+
+        A 429/503 ``Retry-After`` is honoured when it fits within the policy's
+        maximum delay. Only connection failures and 5xx responses count against
+        the circuit breaker; a 429 means the host is up and asking us to slow down.
+        Other exceptions (such as InvalidAuth) are not retried, and count as the
+        host answering.
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_request()
+            try:
+                await self.budget.async_acquire()
+                self.requests += 1
+                result = await request()
+            except CannotConnect as err:
+                if isinstance(err, RateLimited) and err.status == 429:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                if attempt >= self.policy.max_retries:
+                    self.failures += 1
+                    raise
+                delay = self._backoff(attempt, err)
+                if delay is None:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                _LOGGER.debug("Request failed (%s), retry %d in %.1fs", err, attempt, delay)
+                await asyncio.sleep(delay)
+            except Exception:
+                # The host answered, if only to refuse the request
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                # Only still set if the request was cancelled
+                self.breaker.release_probe()
+
+    def _backoff(self, attempt: int, err: CannotConnect) -> float | None:
+        """Return how long to wait before the next attempt, or None to give up."""
+        if isinstance(err, RateLimited) and err.retry_after is not None:
+            self.last_retry_after = err.retry_after
+            return err.retry_after if err.retry_after <= self.policy.max_delay else None
+        # Full jitter: a random delay up to the exponential ceiling
+        ceiling = min(self.policy.max_delay, self.policy.base_delay * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the engine's settings and counters for diagnostics."""
+        return {
+            "max_retries": self.policy.max_retries,
+            "requests_per_minute": self.policy.requests_per_minute,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "last_retry_after": self.last_retry_after,
+            "rate_budget_available": round(self.budget.available, 2),
+            "circuit_breaker": self.breaker.as_dict(),
+        }
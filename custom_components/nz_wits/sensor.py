@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import logging
 from datetime import timedelta, datetime
+from functools import partial
+from typing import Any, Callable, Mapping
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -10,8 +12,10 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, Platform, UnitOfEnergy, UnitOfTime
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity import DeviceInfo
@@ -19,18 +23,24 @@ from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
-    SCHEDULE_RTD,
-    SCHEDULE_INTERIM,
+    SCHEDULE_TYPES,
     SCHEDULE_PRSS,
     SCHEDULE_PRSL,
-    SCHEDULE_TYPES,
-    CONF_UPDATE_RTD,
-    CONF_UPDATE_INTERIM,
-    CONF_UPDATE_PRSS,
-    CONF_UPDATE_PRSL,
+    SCHEDULE_INTERIM,
+    RESAMPLE_SCHEDULES,
+    AGGREGATION_TOU,
+    SIGNAL_OPTIONS_UPDATED,
     CONF_NODE,
+    CONF_NODES,
+    TRADING_PERIOD_SECONDS,
+)
+from .analytics import PriceWindow, window_hours_from_options
+from .resample import ResampledPrices, TouBand, resampling_from_options
+from .coordinator import (
+    WitsDataUpdateCoordinator,
+    WitsHubCoordinator,
+    enabled_schedules_from_options,
 )
-from .coordinator import WitsDataUpdateCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -42,35 +52,268 @@ async def async_setup_entry(
 ) -> None:
     """Set up the sensor platform."""
     # Get the coordinator from hass
-    coordinator: WitsDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
-
-    # Get options for which sensors to create
-    update_options = {
-        SCHEDULE_RTD: entry.options.get(CONF_UPDATE_RTD, True),
-        SCHEDULE_INTERIM: entry.options.get(CONF_UPDATE_INTERIM, True),
-        SCHEDULE_PRSS: entry.options.get(CONF_UPDATE_PRSS, True),
-        SCHEDULE_PRSL: entry.options.get(CONF_UPDATE_PRSL, True),
-    }
-
-    entities = []
-    # Create a sensor for each schedule type that is enabled in options
+    coordinator: WitsDataUpdateCoordinator | WitsHubCoordinator = hass.data[DOMAIN][
+        entry.entry_id
+    ]
+    node_coordinators = (
+        list(coordinator.nodes.values())
+        if isinstance(coordinator, WitsHubCoordinator)
+        else [coordinator]
+    )
+    new_entities: list[SensorEntity] = []
+    for node_coordinator in node_coordinators:
+        new_entities.extend(
+            _async_setup_node_sensors(hass, entry, node_coordinator, async_add_entities)
+        )
+    # Disabled by default; enable them to watch refresh timings in production
+    new_entities.extend([
+        WitsRefreshDurationSensor(coordinator, entry),
+        WitsFetchFailuresSensor(coordinator, entry),
+    ])
+    async_add_entities(new_entities)
+
+
+@callback
+def _async_setup_node_sensors(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: WitsDataUpdateCoordinator,
+    async_add_entities: AddEntitiesCallback,
+) -> list[WitsScheduleEntity]:
+    """Keep a node's sensors in line with the options; return the ones to add now.
+
+    A node without prices yet gets its sensors once a refresh returns some,
+    so a node WITS does not know never gets entities.
+    """
+    registry = er.async_get(hass)
+    entities: dict[str, WitsScheduleEntity] = {}
+
+    @callback
+    def _async_sync_entities() -> list[WitsScheduleEntity]:
+        """Create sensors for enabled schedules and windows, remove the others and return the new ones."""
+        if not coordinator.has_prices:
+            return []
+        wanted = _wanted_sensors(coordinator, entry)
+        for key in [key for key in entities if key not in wanted]:
+            hass.async_create_task(entities.pop(key).async_remove())
+
+        new_entities = []
+        for key, factory in wanted.items():
+            if key in entities:
+                continue
+            # Entities disabled in the registry are not created, so their schedule
+            # is not fetched. Enabling one reloads the entry.
+            entity_id = registry.async_get_entity_id(
+                Platform.SENSOR, DOMAIN, _sensor_unique_id(entry, coordinator.node, key)
+            )
+            if entity_id and (reg_entry := registry.async_get(entity_id)) and reg_entry.disabled:
+                continue
+            entities[key] = factory()
+            new_entities.append(entities[key])
+        return new_entities
+
+    @callback
+    def _async_add_new_entities() -> None:
+        if new_entities := _async_sync_entities():
+            async_add_entities(new_entities)
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_OPTIONS_UPDATED.format(entry.entry_id), _async_add_new_entities
+        )
+    )
+    if coordinator.has_prices:
+        return _async_sync_entities()
+
+    unsub_first_data: CALLBACK_TYPE | None = None
+
+    @callback
+    def _async_first_data() -> None:
+        nonlocal unsub_first_data
+        if not coordinator.has_prices or unsub_first_data is None:
+            return
+        unsub_first_data()
+        unsub_first_data = None
+        _async_add_new_entities()
+
+    @callback
+    def _async_stop_waiting() -> None:
+        if unsub_first_data is not None:
+            unsub_first_data()
+
+    unsub_first_data = coordinator.async_add_listener(_async_first_data)
+    entry.async_on_unload(_async_stop_waiting)
+    return []
+
+
+def _wanted_sensors(
+    coordinator: WitsDataUpdateCoordinator, entry: ConfigEntry
+) -> dict[str, Callable[[], WitsScheduleEntity]]:
+    """Return factories for the sensors the options ask for, keyed by unique id suffix."""
+    enabled = enabled_schedules_from_options(entry.options)
+    resampling = resampling_from_options(entry.options)
+    wanted: dict[str, Callable[[], WitsScheduleEntity]] = {}
     for schedule_type, details in SCHEDULE_TYPES.items():
-        if update_options.get(schedule_type, False): # Default to False if somehow not in options
-            entities.append(
-                WitsPriceSensor(coordinator, entry, schedule_type, details["name"])
+        if schedule_type not in enabled:
+            continue
+        wanted[schedule_type] = partial(
+            WitsPriceSensor, coordinator, entry, schedule_type, details["name"]
+        )
+        if schedule_type in RESAMPLE_SCHEDULES:
+            for kind in resampling.kinds:
+                for band in resampling.bands if kind == AGGREGATION_TOU else (None,):
+                    wanted[_resample_key(schedule_type, kind, band)] = partial(
+                        WitsResampledPriceSensor, coordinator, entry, schedule_type, kind, band
+                    )
+        if schedule_type not in (SCHEDULE_PRSS, SCHEDULE_PRSL):
+            continue
+        if SCHEDULE_INTERIM in enabled:
+            # Forecasts are scored against Interim prices, so both must be fetched
+            for mae in (True, False):
+                wanted[_accuracy_key(schedule_type, mae)] = partial(
+                    WitsForecastAccuracySensor, coordinator, entry, schedule_type, mae
+                )
+        forward_periods = details["params"]["forward"]
+        for hours in window_hours_from_options(entry.options):
+            if hours * 3600 > forward_periods * TRADING_PERIOD_SECONDS:
+                continue  # Longer than the forecast, so it could never be found
+            for cheapest in (True, False):
+                wanted[_window_key(schedule_type, hours, cheapest)] = partial(
+                    WitsWindowSensor, coordinator, entry, schedule_type, hours, cheapest
+                )
+    return wanted
+
+
+def _entry_unique_id(config_entry: ConfigEntry) -> str:
+    """Return the unique id of a config entry, or a stand-in if it has none."""
+    return config_entry.unique_id or f"fallback_unique_id_{config_entry.entry_id}"
+
+
+def _node_unique_id(config_entry: ConfigEntry, node: str) -> str:
+    """Return the id of a node's device; a hub entry has one per node."""
+    if CONF_NODES in config_entry.data:
+        return f"{_entry_unique_id(config_entry)}_{node}"
+    return _entry_unique_id(config_entry)
+
+
+def _sensor_unique_id(config_entry: ConfigEntry, node: str, key: str) -> str:
+    """Return the unique id of a node's sensor, given its schedule type or window key."""
+    return f"{_node_unique_id(config_entry, node)}_{key}"
+
+
+def _window_key(schedule_type: str, hours: float, cheapest: bool) -> str:
+    """Return the unique id suffix of a window sensor."""
+    return f"{schedule_type}_{'cheapest' if cheapest else 'most_expensive'}_{hours:g}h"
+
+
+def _accuracy_key(schedule_type: str, mae: bool) -> str:
+    """Return the unique id suffix of a forecast accuracy sensor."""
+    return f"{schedule_type}_forecast_{'mae' if mae else 'bias'}"
+
+
+def _resample_key(schedule_type: str, kind: str, band: TouBand | None) -> str:
+    """Return the unique id suffix of a resampled price sensor."""
+    if band is not None:
+        return f"{schedule_type}_{kind}_{band.key}"
+    return f"{schedule_type}_{kind}"
+
+
+def _device_info(config_entry: ConfigEntry, node: str | None = None) -> DeviceInfo:
+    """Return the device of a node's sensors, or without a node the entry's own device.
+
+    A hub entry's own device holds its diagnostic sensors and each node's
+    device is linked to it.
+    """
+    if CONF_NODES in config_entry.data:
+        if node is None:
+            return DeviceInfo(
+                identifiers={(DOMAIN, _entry_unique_id(config_entry))},
+                name=config_entry.title,
+                manufacturer="NZ WITS Data Service",
+                model=f"Hub ({len(config_entry.data[CONF_NODES])} nodes)",
             )
-        
-    async_add_entities(entities)
+        via_device = (DOMAIN, _entry_unique_id(config_entry))
+    else:
+        node = config_entry.data.get(CONF_NODE, "Unknown Node")
+        via_device = None
+    return DeviceInfo(
+        identifiers={(DOMAIN, _node_unique_id(config_entry, node))},
+        name=f"WITS ({node})",
+        manufacturer="NZ WITS Data Service",
+        model=f"Node {node}",
+        configuration_url=f"https://www.electricityinfo.co.nz/historic?node={node}",
+        via_device=via_device,
+    )
 
 
-class WitsPriceSensor(CoordinatorEntity[WitsDataUpdateCoordinator], SensorEntity):
-    """Representation of a WITS Spot Price Sensor."""
+class WitsScheduleEntity(CoordinatorEntity[WitsDataUpdateCoordinator]):
+    """Base for entities that show one schedule's data."""
 
     _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        coordinator: WitsDataUpdateCoordinator,
+        config_entry: ConfigEntry,
+        schedule_type: str,
+        unique_key: str,
+    ):
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._config_entry = config_entry
+        self._schedule_type = schedule_type
+        self._node = coordinator.node
+        self._attr_unique_id = _sensor_unique_id(config_entry, coordinator.node, unique_key)
+        # Register demand straight away so the coordinator keeps fetching this
+        # schedule while the platform is still adding entities.
+        self._untrack_schedule = coordinator.async_track_schedule(schedule_type)
+        self._written_available: bool | None = None
+        self._attr_device_info = _device_info(config_entry, coordinator.node)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if this schedule changed or availability flipped."""
+        available = self.available
+        if not self._data_changed() and available == self._written_available:
+            return
+        self._written_available = available
+        super()._handle_coordinator_update()
+
+    def _data_changed(self) -> bool:
+        """Return True if the last coordinator update changed what this entity shows."""
+        return self._schedule_type in self.coordinator.changed_schedules
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop the coordinator fetching this schedule for us."""
+        await super().async_will_remove_from_hass()
+        self._untrack_schedule()
+
+    async def async_update(self) -> None:
+        """Update the entity on request, polling this schedule even if it is not due."""
+        self.coordinator.async_mark_due(self._schedule_type)
+        await super().async_update()
+
+    @property
+    def available(self) -> bool:
+        """Return True while this schedule has prices that are not stale.
+
+        A failed refresh alone does not make the entity unavailable: the last
+        good or restored prices are shown, flagged by ``last_fetch_error`` and
+        ``restored_from_cache``, until they go stale.
+        """
+        return self.coordinator.is_fresh(self._schedule_type)
+
+
+class WitsPriceSensor(WitsScheduleEntity, SensorEntity):
+    """Representation of a WITS Spot Price Sensor."""
+
     _attr_device_class = SensorDeviceClass.MONETARY
     _attr_suggested_display_precision = None
     _attr_state_class = SensorStateClass.TOTAL
-    
+    # The forecast is large and changes every poll; keep it out of the recorder.
+    # Use the nz_wits.get_forecast service to query it instead.
+    _unrecorded_attributes = frozenset({"forecast_data"})
+
     # The API gives price per MWh, we want price per kWh
     _attr_native_unit_of_measurement = f"NZD/{UnitOfEnergy.KILO_WATT_HOUR}"
 
@@ -82,94 +325,266 @@ class WitsPriceSensor(CoordinatorEntity[WitsDataUpdateCoordinator], SensorEntity
         schedule_name: str,
     ):
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._config_entry = config_entry
-        self._schedule_type = schedule_type
-        self._node = config_entry.data.get(CONF_NODE, "Unknown Node")
-
-        # Unique ID for the sensor
-        # Ensure unique_id is present on the config_entry
-        config_entry_unique_id = config_entry.unique_id or f"fallback_unique_id_{config_entry.entry_id}"
-        self._attr_unique_id = f"{config_entry_unique_id}_{self._schedule_type}"
-        
+        super().__init__(coordinator, config_entry, schedule_type, schedule_type)
         # Name of the sensor
         self._attr_name = f"{schedule_name}" # The device name will provide context
 
-        # Device Info
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, config_entry_unique_id)},
-            name=f"WITS ({self._node})",
-            manufacturer="NZ WITS Data Service",
-            model=f"Node {self._node}",
-            configuration_url=f"https://www.electricityinfo.co.nz/historic?node={self._node}",
-        )
-
     @property
     def native_value(self) -> float | None:
         """Return the state of the sensor."""
-        if not self.coordinator.data or self._schedule_type not in self.coordinator.data:
-            return None
-        
-        schedule_data = self.coordinator.data[self._schedule_type]
-        if not schedule_data or not isinstance(schedule_data, list) or len(schedule_data) == 0:
+        snapshot = self.coordinator.snapshots.get(self._schedule_type)
+        return snapshot.native_value if snapshot else None
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the state attributes."""
+        snapshot = self.coordinator.snapshots.get(self._schedule_type)
+        return snapshot.attributes if snapshot else None
+
+
+class WitsWindowSensor(WitsScheduleEntity, SensorEntity):
+    """Start of the cheapest or most expensive block of a forecast, for load shifting."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    def __init__(
+        self,
+        coordinator: WitsDataUpdateCoordinator,
+        config_entry: ConfigEntry,
+        schedule_type: str,
+        hours: float,
+        cheapest: bool,
+    ):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, config_entry, schedule_type, _window_key(schedule_type, hours, cheapest)
+        )
+        self._hours = hours
+        self._cheapest = cheapest
+        kind = "cheapest" if cheapest else "most expensive"
+        self._attr_name = f"{schedule_type} {kind} {hours:g}h window"
+
+    def _window(self) -> PriceWindow | None:
+        """Return this sensor's window from the coordinator's forecast analytics."""
+        analytics = self.coordinator.analytics.get(self._schedule_type)
+        if analytics is None:
             return None
+        windows = analytics.cheapest if self._cheapest else analytics.most_expensive
+        return windows.get(self._hours)
+
+    @property
+    def native_value(self) -> datetime | None:
+        """Return when the window starts."""
+        window = self._window()
+        return dt_util.utc_from_timestamp(window.start) if window else None
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the window's end and mean price."""
+        window = self._window()
+        return window.as_dict() if window else None
+
+    @property
+    def available(self) -> bool:
+        """Return True if the forecast is long enough for this window."""
+        return super().available and self._window() is not None
+
+
+class WitsForecastAccuracySensor(WitsScheduleEntity, SensorEntity):
+    """Mean absolute error or bias of a forecast against the Interim price, per lead time."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = f"NZD/{UnitOfEnergy.KILO_WATT_HOUR}"
+    _attr_suggested_display_precision = 4
+    # Up to one entry per trading period of the forecast horizon
+    _unrecorded_attributes = frozenset({"by_lead_time"})
 
-        # Assuming the first item in the list is the current/most relevant price
-        price_data = schedule_data[0]
-        price_mwh = price_data.get("price")
+    def __init__(
+        self,
+        coordinator: WitsDataUpdateCoordinator,
+        config_entry: ConfigEntry,
+        schedule_type: str,
+        mae: bool,
+    ):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, config_entry, schedule_type, _accuracy_key(schedule_type, mae)
+        )
+        self._mae = mae
+        self._attr_name = f"{schedule_type} forecast {'error' if mae else 'bias'}"
+        self._untrack_interim = coordinator.async_track_schedule(SCHEDULE_INTERIM)
 
-        if price_mwh is None:
+    def _data_changed(self) -> bool:
+        """Return True if new errors were scored or the forecast changed."""
+        return (
+            self._schedule_type in self.coordinator.accuracy.changed
+            or super()._data_changed()
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop the coordinator fetching Interim prices for us."""
+        await super().async_will_remove_from_hass()
+        self._untrack_interim()
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the error or bias across lead times, in $/kWh."""
+        overall = self.coordinator.accuracy.errors[self._schedule_type].overall()
+        if overall is None:
             return None
-        
-        try:
-            return round(float(price_mwh) / 1000, 5) # Convert MWh to kWh
-        except (ValueError, TypeError):
-            _LOGGER.warning(
-                "Could not parse price '%s' for %s schedule for node %s",
-                price_mwh,
-                self._schedule_type,
-                self._node
-            )
+        return round((overall[0] if self._mae else overall[1]) / 1000, 5)
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the sample count, and on the error sensor the breakdown per lead time."""
+        errors = self.coordinator.accuracy.errors[self._schedule_type]
+        attributes: dict[str, Any] = {"samples": errors.samples}
+        if self._mae:
+            attributes["by_lead_time"] = errors.by_lead()
+        return attributes
+
+
+class WitsResampledPriceSensor(WitsScheduleEntity, SensorEntity):
+    """Mean price of the current or next hour, trading day or time-of-use band.
+
+    A schedule that only covers the past, like Interim, shows its latest bucket.
+    """
+
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_native_unit_of_measurement = f"NZD/{UnitOfEnergy.KILO_WATT_HOUR}"
+    # One entry per bucket the schedule covers
+    _unrecorded_attributes = frozenset({"buckets"})
+
+    def __init__(
+        self,
+        coordinator: WitsDataUpdateCoordinator,
+        config_entry: ConfigEntry,
+        schedule_type: str,
+        kind: str,
+        band: TouBand | None = None,
+    ):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, config_entry, schedule_type, _resample_key(schedule_type, kind, band)
+        )
+        self._kind = kind
+        self._band = band.name if band else None
+        self._attr_name = f"{schedule_type} {self._band or kind} price"
+
+    def _bucket(self) -> tuple[ResampledPrices, int] | None:
+        """Return this sensor's buckets and the index of the one to show."""
+        resampled = self.coordinator.resampled.get(self._schedule_type, {}).get(self._kind)
+        if resampled is None:
             return None
+        index = resampled.current(dt_util.utcnow().timestamp(), self._band)
+        return None if index is None else (resampled, index)
 
     @property
-    def extra_state_attributes(self) -> dict[str, any] | None:
-        """Return the state attributes."""
-        if not self.coordinator.data or self._schedule_type not in self.coordinator.data:
+    def native_value(self) -> float | None:
+        """Return the bucket's mean price in $/kWh."""
+        if (found := self._bucket()) is None:
             return None
-            
-        schedule_data = self.coordinator.data[self._schedule_type]
-        if not schedule_data or not isinstance(schedule_data, list) or len(schedule_data) == 0:
+        resampled, index = found
+        return round(resampled.means[index] / 1000, 5)
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the bucket's times and periods, and every bucket of this kind or band."""
+        if (found := self._bucket()) is None:
             return None
+        resampled, index = found
+        bucket = resampled.bucket(index)
+        del bucket["price"]
+        return {**bucket, "buckets": resampled.as_list(self._band)}
+
+    @property
+    def available(self) -> bool:
+        """Return True if the schedule has a price in any of this sensor's buckets."""
+        return super().available and self._bucket() is not None
+
+
+class WitsDiagnosticSensor(
+    CoordinatorEntity[WitsDataUpdateCoordinator | WitsHubCoordinator], SensorEntity
+):
+    """Base for sensors reporting the coordinator's own refresh metrics."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _metric_key: str
+
+    def __init__(
+        self,
+        coordinator: WitsDataUpdateCoordinator | WitsHubCoordinator,
+        config_entry: ConfigEntry,
+    ):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{_entry_unique_id(config_entry)}_{self._metric_key}"
+        self._attr_device_info = _device_info(config_entry)
+
+    @property
+    def available(self) -> bool:
+        """Metrics are available even when the last refresh failed."""
+        return True
+
+
+class WitsRefreshDurationSensor(WitsDiagnosticSensor):
+    """Wall time of the last refresh, with recent percentiles per schedule."""
 
-        current_data_point = schedule_data[0]
-        
+    _attr_name = "Refresh duration"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 0
+    _metric_key = "refresh_duration"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the last refresh's wall time."""
+        histogram = self.coordinator.metrics.histogram("refresh_ms")
+        return round(histogram.last, 1) if histogram else None
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return recent refresh percentiles and each schedule's p90 fetch time."""
+        metrics = self.coordinator.metrics
+        histogram = metrics.histogram("refresh_ms")
+        if histogram is None:
+            return None
         attributes = {
-            "node": current_data_point.get("node"),
-            "schedule_type": self._schedule_type, # Use the internal schedule type key
-            "schedule_name": SCHEDULE_TYPES[self._schedule_type]["name"], # Get human-readable name
-            "trading_period": current_data_point.get("tradingPeriod"),
-            "trading_datetime": current_data_point.get("tradingDateTime"),
-            "last_updated_from_coordinator": (
-                dt_util.as_local(self.coordinator.data["last_api_success_utc"]).isoformat()
-                if self.coordinator.data and "last_api_success_utc" in self.coordinator.data and self.coordinator.data["last_api_success_utc"]
-                else None
-            ),
+            f"refresh_{name}": value
+            for name, value in histogram.summary().items()
+            if name in ("p50", "p90", "p99", "max")
         }
-        
-        # For forecast schedules, add the full forecast list
-        if self._schedule_type in [SCHEDULE_PRSS, SCHEDULE_PRSL]:
-            attributes["forecast_data"] = schedule_data
-            
+        for schedule_type in SCHEDULE_TYPES:
+            if (fetch := metrics.histogram("fetch_ms", schedule_type)) is not None:
+                attributes[f"{schedule_type.lower()}_fetch_p90"] = round(fetch.percentile(90), 1)
         return attributes
 
+
+class WitsFetchFailuresSensor(WitsDiagnosticSensor):
+    """Schedule fetches that failed since startup."""
+
+    _attr_name = "Fetch failures"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _metric_key = "fetch_failures"
+
     @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        # Available if the coordinator has data and this specific schedule's data is present
-        return (
-            super().available
-            and self.coordinator.data is not None
-            and self._schedule_type in self.coordinator.data
-            and self.coordinator.data[self._schedule_type] is not None
+    def native_value(self) -> int:
+        """Return the failed fetches across every schedule."""
+        return sum(
+            self.coordinator.metrics.counter("fetch_failures", schedule_type)
+            for schedule_type in SCHEDULE_TYPES
         )
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the failures per schedule."""
+        return {
+            f"{schedule_type.lower()}_failures": self.coordinator.metrics.counter(
+                "fetch_failures", schedule_type
+            )
+            for schedule_type in SCHEDULE_TYPES
+        }
@@ -0,0 +1,114 @@
+"""Compact, array-backed price series for the NZ WITS integration."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from typing import Any, Iterable
+
+from homeassistant.util import dt as dt_util
+
+
+class PriceSeries:
+    """Prices for one node and schedule, held in parallel arrays.
+
+    ``timestamps`` are the trading period start times as Unix seconds, in
+    ascending order. ``prices`` are in $/MWh as returned by WITS.
+    """
+
+    __slots__ = ("node", "timestamps", "prices", "trading_periods")
+
+    def __init__(
+        self,
+        node: str,
+        timestamps: array,
+        prices: array,
+        trading_periods: array,
+    ) -> None:
+        """Initialize the series."""
+        self.node = node
+        self.timestamps = timestamps
+        self.prices = prices
+        self.trading_periods = trading_periods
+
+    @classmethod
+    def from_points(
+        cls, node: str, points: Iterable[tuple[int, float, int]]
+    ) -> PriceSeries:
+        """Build a series from (timestamp, price, trading period) tuples in time order."""
+        timestamps = array("q")
+        prices = array("d")
+        trading_periods = array("h")
+        for timestamp, price, trading_period in points:
+            timestamps.append(timestamp)
+            prices.append(price)
+            trading_periods.append(trading_period)
+        return cls(node, timestamps, prices, trading_periods)
+
+    def __len__(self) -> int:
+        """Return the number of periods in the series."""
+        return len(self.timestamps)
+
+    def __eq__(self, other: object) -> bool:
+        """Return True if both series hold the same points."""
+        if not isinstance(other, PriceSeries):
+            return NotImplemented
+        return (
+            self.node == other.node
+            and self.timestamps == other.timestamps
+            and self.prices == other.prices
+            and self.trading_periods == other.trading_periods
+        )
+
+    def fingerprint(self) -> int:
+        """Return a hash of the series contents, for cheap change detection."""
+        return hash((
+            self.node,
+            self.timestamps.tobytes(),
+            self.prices.tobytes(),
+            self.trading_periods.tobytes(),
+        ))
+
+    def index_at(self, timestamp: float) -> int | None:
+        """Return the index of the period in force at ``timestamp``, or None if before the series."""
+        index = bisect_right(self.timestamps, timestamp) - 1
+        return index if index >= 0 else None
+
+    def price_at(self, timestamp: float) -> float | None:
+        """Return the price in force at ``timestamp``."""
+        index = self.index_at(timestamp)
+        return None if index is None else self.prices[index]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the series in a JSON-serialisable form."""
+        return {
+            "node": self.node,
+            "timestamps": self.timestamps.tolist(),
+            "prices": self.prices.tolist(),
+            "trading_periods": self.trading_periods.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PriceSeries:
+        """Rebuild a series saved with ``as_dict``."""
+        return cls(
+            data["node"],
+            array("q", data["timestamps"]),
+            array("d", data["prices"]),
+            array("h", data["trading_periods"]),
+        )
+
+    def to_records(self) -> list[dict[str, Any]]:
+        """Return the series as a list of dicts, in the shape WITS uses."""
+        return [
+            {
+                "node": self.node,
+                "tradingDateTime": dt_util.as_local(
+                    dt_util.utc_from_timestamp(timestamp)
+                ).isoformat(),
+                "tradingPeriod": trading_period,
+                "price": price,
+            }
+            for timestamp, price, trading_period in zip(
+                self.timestamps, self.prices, self.trading_periods
+            )
+        ]
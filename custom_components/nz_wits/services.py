@@ -0,0 +1,300 @@
+"""Services for the NZ WITS Spot Price integration."""
+from __future__ import annotations
+
+from datetime import datetime
+from statistics import fmean
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    SCHEDULE_PRSS,
+    SCHEDULE_PRSL,
+    SERVICE_GET_FORECAST,
+    SERVICE_GET_PRICE,
+    SERVICE_BACKFILL_HISTORY,
+    BACKFILL_SCHEDULES,
+    ATTR_NODE,
+    ATTR_SCHEDULE,
+    ATTR_START,
+    ATTR_END,
+    ATTR_TIME,
+    ATTR_AGGREGATION,
+    AGGREGATION_NONE,
+    AGGREGATION_HOURLY,
+    AGGREGATION_SUMMARY,
+    AGGREGATION_DAILY,
+    AGGREGATION_TOU,
+    TRADING_PERIOD_SECONDS,
+)
+from .backfill import async_get_backfill_manager, statistic_id
+from .coordinator import WitsDataUpdateCoordinator, WitsHubCoordinator
+from .resample import TouBand, bucket_bounds, resample
+from .series import PriceSeries
+
+BUCKET_AGGREGATIONS = [AGGREGATION_HOURLY, AGGREGATION_DAILY, AGGREGATION_TOU]
+
+GET_FORECAST_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_NODE): cv.string,
+        vol.Optional(ATTR_SCHEDULE, default=SCHEDULE_PRSS): vol.In([SCHEDULE_PRSS, SCHEDULE_PRSL]),
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_AGGREGATION, default=AGGREGATION_NONE): vol.In(
+            [AGGREGATION_NONE, AGGREGATION_SUMMARY, *BUCKET_AGGREGATIONS]
+        ),
+    }
+)
+
+
+
+def _point_or_range(data: dict[str, Any]) -> dict[str, Any]:
+    """Require either a time, or a start and an end, but not both."""
+    has_range = ATTR_START in data or ATTR_END in data
+    if has_range and ATTR_TIME in data:
+        raise vol.Invalid("Give either a time or a start and end, not both")
+    if has_range and not (ATTR_START in data and ATTR_END in data):
+        raise vol.Invalid("A range needs both a start and an end")
+    if not has_range and data[ATTR_AGGREGATION] != AGGREGATION_NONE:
+        raise vol.Invalid("Only a range can be aggregated")
+    return data
+
+
+GET_PRICE_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_NODE): cv.string,
+            vol.Optional(ATTR_TIME): cv.datetime,
+            vol.Optional(ATTR_START): cv.datetime,
+            vol.Optional(ATTR_END): cv.datetime,
+            vol.Optional(ATTR_AGGREGATION, default=AGGREGATION_NONE): vol.In(
+                [AGGREGATION_NONE, *BUCKET_AGGREGATIONS]
+            ),
+        }
+    ),
+    _point_or_range,
+)
+
+BACKFILL_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_NODE): cv.string,
+        vol.Optional(ATTR_SCHEDULE, default=BACKFILL_SCHEDULES[0]): vol.In(BACKFILL_SCHEDULES),
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services."""
+
+    async def async_get_forecast(call: ServiceCall) -> ServiceResponse:
+        """Return a slice of a node's in-memory forecast."""
+        node = call.data[ATTR_NODE]
+        schedule = call.data[ATTR_SCHEDULE]
+        _, coordinator = _coordinator_for_node(hass, node)
+        series = coordinator.data.get(schedule) if coordinator.data else None
+        if series is None:
+            raise ServiceValidationError(f"No {schedule} forecast is available for node {node}")
+
+        start = _as_timestamp(call.data.get(ATTR_START))
+        end = _as_timestamp(call.data.get(ATTR_END))
+        periods = _slice(series, start, end)
+
+        response: dict[str, Any] = {"node": node, "schedule": schedule}
+        aggregation = call.data[ATTR_AGGREGATION]
+        if aggregation == AGGREGATION_SUMMARY:
+            prices = periods.prices
+            response["summary"] = (
+                {"min": min(prices), "max": max(prices), "mean": fmean(prices), "count": len(prices)}
+                if prices else None
+            )
+            return response
+        if aggregation == AGGREGATION_NONE:
+            response["forecast"] = [
+                {
+                    "start": _isoformat(timestamp),
+                    "end": _isoformat(timestamp + TRADING_PERIOD_SECONDS),
+                    "price": price,
+                }
+                for timestamp, price in zip(periods.timestamps, periods.prices)
+            ]
+            return response
+        resampled = resample(periods, aggregation, _tou_bands(coordinator, aggregation))
+        response["forecast"] = [
+            {
+                "start": _isoformat(resampled.starts[index]),
+                "end": _isoformat(resampled.ends[index]),
+                "price": resampled.means[index],
+                **({"band": band} if (band := resampled.bands[index]) else {}),
+            }
+            for index in range(len(resampled))
+        ]
+        return response
+
+    async def async_get_price(call: ServiceCall) -> ServiceResponse:
+        """Return a node's price at a time, or its average over a range."""
+        node = call.data[ATTR_NODE]
+        _, coordinator = _coordinator_for_node(hass, node)
+        index = coordinator.price_index
+
+        if ATTR_START in call.data:
+            start = _as_timestamp(call.data[ATTR_START])
+            end = _as_timestamp(call.data[ATTR_END])
+            if start >= end:
+                raise ServiceValidationError("The start of the range must be before its end")
+            average = index.average(start, end)
+            response: dict[str, Any] = {
+                "node": node,
+                "start": _isoformat(start),
+                "end": _isoformat(end),
+                "mean_price": average.mean_price,
+                "covered_seconds": average.covered_seconds,
+                "coverage": round(min(average.covered_seconds / (end - start), 1.0), 4),
+                "intervals": average.intervals,
+            }
+            aggregation = call.data[ATTR_AGGREGATION]
+            if aggregation == AGGREGATION_NONE:
+                return response
+            response["buckets"] = []
+            bands = _tou_bands(coordinator, aggregation)
+            for bucket_start, bucket_end, band, weight in bucket_bounds(
+                aggregation, start, end, bands
+            ):
+                # Each bucket is averaged over its part of the range
+                bucket_start, bucket_end = max(bucket_start, start), min(bucket_end, end)
+                average = index.average(bucket_start, bucket_end)
+                response["buckets"].append({
+                    "start": _isoformat(bucket_start),
+                    "end": _isoformat(bucket_end),
+                    **({"band": band} if band else {}),
+                    "mean_price": (
+                        average.mean_price * weight if average.mean_price is not None else None
+                    ),
+                    "coverage": round(
+                        min(average.covered_seconds / (bucket_end - bucket_start), 1.0), 4
+                    ),
+                })
+            return response
+
+        at = _as_timestamp(call.data.get(ATTR_TIME)) or dt_util.utcnow().timestamp()
+        found = index.price_at(at)
+        return {
+            "node": node,
+            "time": _isoformat(at),
+            "price": found.price if found else None,
+            "schedule": found.schedule if found else None,
+            "start": _isoformat(found.start) if found else None,
+            "end": _isoformat(found.end) if found else None,
+        }
+
+    async def async_backfill_history(call: ServiceCall) -> ServiceResponse:
+        """Start importing a node's historical prices into long-term statistics."""
+        if "recorder" not in hass.config.components:
+            raise ServiceValidationError("The recorder is needed to import price history")
+        node = call.data[ATTR_NODE]
+        entry_id, coordinator = _coordinator_for_node(hass, node)
+        entry = hass.config_entries.async_get_entry(entry_id)
+        start = _as_timestamp(call.data[ATTR_START])
+        end = _as_timestamp(call.data.get(ATTR_END)) or dt_util.utcnow().timestamp()
+        if start >= end:
+            raise ServiceValidationError("The start of the backfill must be before its end")
+
+        manager = await async_get_backfill_manager(hass)
+        job = manager.async_start(
+            entry, coordinator.hub.api_client, node, call.data[ATTR_SCHEDULE], start, end
+        )
+        return {
+            "statistic_id": statistic_id(node, job.schedule),
+            "start": _isoformat(job.start),
+            "end": _isoformat(job.end),
+            "resumed_from": _isoformat(job.next_end) if job.next_end != job.end else None,
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_FORECAST,
+        async_get_forecast,
+        schema=GET_FORECAST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_PRICE,
+        async_get_price,
+        schema=GET_PRICE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKFILL_HISTORY,
+        async_backfill_history,
+        schema=BACKFILL_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _coordinator_for_node(
+    hass: HomeAssistant, node: str
+) -> tuple[str, WitsDataUpdateCoordinator]:
+    """Return the coordinator tracking a node and the id of the entry it belongs to."""
+    for key, value in hass.data.get(DOMAIN, {}).items():
+        if isinstance(value, WitsDataUpdateCoordinator) and value.node == node:
+            return key, value
+        if isinstance(value, WitsHubCoordinator) and node in value.nodes:
+            return key, value.nodes[node]
+    raise ServiceValidationError(f"Node {node} is not configured")
+
+
+def _as_timestamp(value: datetime | None) -> float | None:
+    """Return a datetime as a Unix timestamp, assuming local time if naive."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return value.timestamp()
+
+
+def _isoformat(timestamp: float) -> str:
+    """Return a Unix timestamp as a local ISO 8601 string."""
+    return dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).isoformat()
+
+
+def _slice(series: PriceSeries, start: float | None, end: float | None) -> PriceSeries:
+    """Return the periods overlapping [start, end) as a series."""
+    first = 0
+    if start is not None:
+        index = series.index_at(start)
+        if index is None:
+            first = 0  # Starts before the series
+        elif start >= series.timestamps[index] + TRADING_PERIOD_SECONDS:
+            first = len(series)  # Starts after the last period ends
+        else:
+            first = index
+    last = len(series)
+    if end is not None:
+        index = series.index_at(end - 1)
+        last = 0 if index is None else index + 1
+    return PriceSeries(
+        series.node,
+        series.timestamps[first:last],
+        series.prices[first:last],
+        series.trading_periods[first:last],
+    )
+
+
+def _tou_bands(coordinator: WitsDataUpdateCoordinator, aggregation: str) -> tuple[TouBand, ...]:
+    """Return the node's time-of-use bands if the aggregation needs them."""
+    if aggregation != AGGREGATION_TOU:
+        return ()
+    if not (bands := coordinator.resampling.bands):
+        raise ServiceValidationError(
+            f"No time-of-use bands are configured for node {coordinator.node}"
+        )
+    return bands
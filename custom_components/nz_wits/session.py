@@ -0,0 +1,157 @@
+"""Optional dedicated HTTP session for the WITS host."""
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.util import ssl as ssl_util
+
+from .const import (
+    DOMAIN,
+    SESSION_LIMIT_PER_HOST,
+    SESSION_KEEPALIVE_TIMEOUT,
+    SESSION_DNS_CACHE_TTL,
+)
+
+try:  # aiohttp decodes brotli only when one of these is installed
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SESSION = "session"
+
+
+class SessionStats:
+    """Connection pool counters, collected through aiohttp request tracing."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.bytes_received = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return a trace config that updates these counters."""
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_connection_create_end.append(self._on_connection_create)
+        trace.on_connection_reuseconn.append(self._on_connection_reuse)
+        trace.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(self._on_dns_cache_miss)
+        trace.on_response_chunk_received.append(self._on_chunk)
+        return trace
+
+    async def _on_request_start(self, session, context: SimpleNamespace, params) -> None:
+        self.requests += 1
+
+    async def _on_connection_create(self, session, context: SimpleNamespace, params) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reuse(self, session, context: SimpleNamespace, params) -> None:
+        self.connections_reused += 1
+
+    async def _on_dns_cache_hit(self, session, context: SimpleNamespace, params) -> None:
+        self.dns_cache_hits += 1
+
+    async def _on_dns_cache_miss(self, session, context: SimpleNamespace, params) -> None:
+        self.dns_cache_misses += 1
+
+    async def _on_chunk(self, session, context: SimpleNamespace, params) -> None:
+        # Chunks are counted after decompression
+        self.bytes_received += len(params.chunk)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters for diagnostics."""
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.connections_reused / connections, 3) if connections else None,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+            "decompressed_bytes_received": self.bytes_received,
+        }
+
+
+class WitsSession:
+    """A keep-alive connection pool for the WITS host, shared by token and price calls."""
+
+    def __init__(self) -> None:
+        """Create the connector and session."""
+        self.stats = SessionStats()
+        self.connector = aiohttp.TCPConnector(
+            limit_per_host=SESSION_LIMIT_PER_HOST,
+            keepalive_timeout=SESSION_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=SESSION_DNS_CACHE_TTL,
+            enable_cleanup_closed=True,
+            ssl=ssl_util.get_default_context(),
+        )
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            trace_configs=[self.stats.trace_config()],
+        )
+        # Stops the shutdown listener from closing the session a second time
+        self.unsub_close: CALLBACK_TYPE | None = None
+
+    async def async_close(self) -> None:
+        """Close the session and its connections."""
+        await self.session.close()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the pool settings and counters for diagnostics."""
+        return {
+            "limit_per_host": self.connector.limit_per_host,
+            "keepalive_timeout": SESSION_KEEPALIVE_TIMEOUT,
+            "dns_cache_ttl": SESSION_DNS_CACHE_TTL,
+            "accept_encoding": ACCEPT_ENCODING,
+            **self.stats.as_dict(),
+        }
+
+
+@callback
+def async_get_wits_session(hass: HomeAssistant) -> WitsSession:
+    """Return the dedicated WITS session, creating it on first use.
+
+    It is closed once no entry uses it, or when Home Assistant shuts down.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    wits_session: WitsSession | None = domain_data.get(DATA_SESSION)
+    if wits_session is None:
+        wits_session = domain_data[DATA_SESSION] = WitsSession()
+
+        async def _async_close(event: Event) -> None:
+            wits_session.unsub_close = None
+            await wits_session.async_close()
+
+        wits_session.unsub_close = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, _async_close
+        )
+    return wits_session
+
+
+@callback
+def async_release_wits_session(hass: HomeAssistant) -> None:
+    """Close the dedicated WITS session, if one was created, and forget it."""
+    wits_session: WitsSession | None = hass.data.get(DOMAIN, {}).pop(DATA_SESSION, None)
+    if wits_session is None:
+        return
+    if wits_session.unsub_close is not None:
+        wits_session.unsub_close()
+        wits_session.unsub_close = None
+    hass.async_create_task(wits_session.async_close())
@@ -0,0 +1,71 @@
+"""Precomputed per-schedule state for NZ WITS sensors."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from homeassistant.util import dt as dt_util
+
+from .analytics import ForecastAnalytics
+from .const import SCHEDULE_TYPES, SCHEDULE_PRSS, SCHEDULE_PRSL
+from .series import PriceSeries
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduleSnapshot:
+    """The value and attributes a schedule's sensor shows until the next rebuild."""
+
+    native_value: float | None
+    attributes: Mapping[str, Any]
+
+
+def build_snapshot(
+    schedule_type: str,
+    series: PriceSeries,
+    now: datetime,
+    last_api_success_utc: datetime | None,
+    last_fetch_error: str | None,
+    restored: bool = False,
+    analytics: ForecastAnalytics | None = None,
+) -> ScheduleSnapshot | None:
+    """Build the snapshot for a schedule from its series.
+
+    The current period is located by bisection on the period start times. If the
+    series only holds future periods (a forecast that starts next period), the
+    first of them is used.
+    """
+    if not series:
+        return None
+
+    index = series.index_at(now.timestamp())
+    if index is None:
+        index = 0
+
+    attributes: dict[str, Any] = {
+        "node": series.node,
+        "schedule_type": schedule_type,  # Use the internal schedule type key
+        "schedule_name": SCHEDULE_TYPES[schedule_type]["name"],  # Get human-readable name
+        "trading_period": series.trading_periods[index],
+        "trading_datetime": dt_util.as_local(
+            dt_util.utc_from_timestamp(series.timestamps[index])
+        ).isoformat(),
+        "last_updated_from_coordinator": (
+            dt_util.as_local(last_api_success_utc).isoformat() if last_api_success_utc else None
+        ),
+        "last_fetch_error": last_fetch_error,
+        # True until the first live refresh after a restart replaces cached data
+        "restored_from_cache": restored,
+    }
+
+    # For forecast schedules, add the full forecast list
+    if schedule_type in (SCHEDULE_PRSS, SCHEDULE_PRSL):
+        attributes["forecast_data"] = series.to_records()
+        if analytics is not None:
+            attributes.update(analytics.as_attributes())
+
+    return ScheduleSnapshot(
+        native_value=round(series.prices[index] / 1000, 5),  # Convert MWh to kWh
+        attributes=MappingProxyType(attributes),
+    )
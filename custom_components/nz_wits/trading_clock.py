@@ -0,0 +1,98 @@
+"""The NZ electricity market's trading-period calendar.
+
+A trading day starts at NZ local midnight and is split into half-hour trading
+periods numbered from 1: 48 on most days, 46 on the day clocks go forward and
+50 on the day they go back. Day start times are computed once per year and
+cached, so mapping between an instant and (trading date, period) is O(1).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+from homeassistant.util import dt as dt_util
+
+from .const import TRADING_PERIOD_SECONDS
+
+NZ_TIMEZONE = dt_util.get_time_zone("Pacific/Auckland")
+
+_DAY_SECONDS = 24 * 60 * 60
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# NZ is never less than 12 hours ahead of UTC
+_MIN_OFFSET = 12 * 60 * 60
+
+# Local midnight of each trading day as Unix seconds, keyed by date ordinal
+_day_starts: dict[int, int] = {}
+
+
+class TradingPeriod(NamedTuple):
+    """A trading date and the number of a period within it."""
+
+    trading_date: date
+    period: int
+
+
+def _day_start(ordinal: int) -> int:
+    """Return when the trading day with this date ordinal starts, filling the year's cache."""
+    try:
+        return _day_starts[ordinal]
+    except KeyError:
+        pass
+    year = date.fromordinal(ordinal).year
+    # Include 1 January of the next year so every day in this one has an end
+    for day_ordinal in range(date(year, 1, 1).toordinal(), date(year + 1, 1, 1).toordinal() + 1):
+        day = date.fromordinal(day_ordinal)
+        _day_starts[day_ordinal] = int(
+            datetime(day.year, day.month, day.day, tzinfo=NZ_TIMEZONE).timestamp()
+        )
+    return _day_starts[ordinal]
+
+
+def day_start(trading_date: date) -> int:
+    """Return when a trading day starts, as Unix seconds."""
+    return _day_start(trading_date.toordinal())
+
+
+def periods_in_day(trading_date: date) -> int:
+    """Return how many trading periods a day has: 46, 48 or 50."""
+    ordinal = trading_date.toordinal()
+    return (_day_start(ordinal + 1) - _day_start(ordinal)) // TRADING_PERIOD_SECONDS
+
+
+def period_of(timestamp: float) -> TradingPeriod:
+    """Return the trading date and period in force at an instant."""
+    # The local date is the UTC date shifted by 12 or 13 hours; try the lower first
+    ordinal = (int(timestamp) + _MIN_OFFSET) // _DAY_SECONDS + _EPOCH_ORDINAL
+    if timestamp >= _day_start(ordinal + 1):
+        ordinal += 1
+    start = _day_start(ordinal)
+    return TradingPeriod(
+        date.fromordinal(ordinal), int(timestamp - start) // TRADING_PERIOD_SECONDS + 1
+    )
+
+
+def period_start(trading_date: date, period: int) -> int:
+    """Return when a trading period starts, as Unix seconds."""
+    if not 1 <= period <= periods_in_day(trading_date):
+        raise ValueError(f"{trading_date} has no trading period {period}")
+    return day_start(trading_date) + (period - 1) * TRADING_PERIOD_SECONDS
+
+
+def current_period_start(timestamp: float) -> int:
+    """Return when the trading period in force at an instant started."""
+    trading_date, period = period_of(timestamp)
+    return day_start(trading_date) + (period - 1) * TRADING_PERIOD_SECONDS
+
+
+def next_period_start(timestamp: float, every: int = 1) -> int:
+    """Return the start of the first period after an instant whose number is 1 + a multiple of ``every``.
+
+    With ``every=4`` the boundaries are periods 1, 5, 9, ... of each trading
+    day, i.e. every two hours from local midnight; a short or long DST day
+    restarts the count at the next midnight.
+    """
+    trading_date, period = period_of(timestamp)
+    following = (period - 1) // every * every + every + 1
+    if following > periods_in_day(trading_date):
+        return day_start(trading_date + timedelta(days=1))
+    return day_start(trading_date) + (following - 1) * TRADING_PERIOD_SECONDS
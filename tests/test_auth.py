@@ -0,0 +1,31 @@
+"""Tests for the access token manager."""
+import asyncio
+
+import aiohttp
+
+from benchmarks.fake_wits import FakeWitsConfig, FakeWitsServer
+from custom_components.nz_wits.auth import WitsTokenManager
+
+
+def test_short_lived_token_is_used_and_refreshed_before_expiry():
+    """A token issued for less than the refresh margin is refreshed halfway through its life."""
+
+    async def run():
+        server = FakeWitsServer(FakeWitsConfig(token_ttl=60))
+        url = await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                manager = WitsTokenManager(session, "a", "s", base_url=url)
+                manager.start_background_refresh()
+                token = await manager.async_get_token()
+                assert await manager.async_get_token() == token
+                assert server.stats.token_requests == 1
+
+                loop = asyncio.get_running_loop()
+                delay = manager._refresh_handle.when() - loop.time()
+                assert 25 < delay <= 30
+                manager.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
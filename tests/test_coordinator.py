@@ -0,0 +1,136 @@
+"""Tests for the per-node coordinator's handling of failed schedules."""
+import asyncio
+from array import array
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.nz_wits.const import (
+    SCHEDULE_INTERIM,
+    SCHEDULE_PRSL,
+    SCHEDULE_PRSS,
+    SCHEDULE_RTD,
+    TRADING_PERIOD_SECONDS,
+)
+from custom_components.nz_wits.coordinator import WitsDataUpdateCoordinator
+from custom_components.nz_wits.exceptions import CannotConnect
+from custom_components.nz_wits.sensor import WitsPriceSensor
+from custom_components.nz_wits.series import PriceSeries
+from custom_components.nz_wits.trading_clock import current_period_start, period_of
+
+NODE = "TGA0331"
+
+# Periods each schedule returns, relative to the current one
+PERIOD_OFFSETS = {
+    SCHEDULE_RTD: range(0, 1),
+    SCHEDULE_INTERIM: range(-3, 0),
+    SCHEDULE_PRSS: range(0, 6),
+    SCHEDULE_PRSL: range(0, 48),
+}
+
+
+class FakeHub:
+    """Answers price requests with flat prices around now, failing chosen schedules."""
+
+    def __init__(self) -> None:
+        self.failing: set[str] = set()
+
+    async def async_get_price_data(self, schedule_type, node, max_age=0, overrides=None):
+        if schedule_type in self.failing:
+            raise CannotConnect("WITS is down")
+        start = current_period_start(dt_util.utcnow().timestamp())
+        return [
+            (timestamp, 100.0, period_of(timestamp).period)
+            for offset in PERIOD_OFFSETS[schedule_type]
+            for timestamp in [start + offset * TRADING_PERIOD_SECONDS]
+        ]
+
+
+def run_with_hass(test, tmp_path) -> None:
+    """Run an async test against a bare Home Assistant instance."""
+
+    async def run():
+        hass = HomeAssistant(str(tmp_path))
+        try:
+            await test(hass)
+        finally:
+            await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_failed_schedule_keeps_the_others_available(tmp_path):
+    """A cycle that only polls RTD, and fails, leaves every schedule's data usable."""
+    hub = FakeHub()
+
+    async def test(hass):
+        coordinator = WitsDataUpdateCoordinator(hass, hub, NODE, driven=True)
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        previous = dict(coordinator.data)
+
+        hub.failing = {SCHEDULE_RTD}
+        now = dt_util.utcnow()
+        assert coordinator._due_schedules(now + timedelta(seconds=1)) == []
+        coordinator.async_mark_due(SCHEDULE_RTD)
+        await coordinator.async_refresh()
+
+        assert coordinator.last_update_success
+        assert SCHEDULE_RTD in coordinator.schedule_errors
+        for key in PERIOD_OFFSETS:
+            assert coordinator.data[key] == previous[key]
+            assert coordinator.is_fresh(key)
+
+    run_with_hass(test, tmp_path)
+
+
+def test_update_fails_when_nothing_is_held(tmp_path):
+    """With no data to fall back on, a cycle where everything fails is a failed update."""
+    hub = FakeHub()
+    hub.failing = set(PERIOD_OFFSETS)
+
+    async def test(hass):
+        coordinator = WitsDataUpdateCoordinator(hass, hub, NODE, driven=True)
+        await coordinator.async_refresh()
+        assert not coordinator.last_update_success
+
+    run_with_hass(test, tmp_path)
+
+
+def test_restored_prices_survive_a_failed_first_refresh(tmp_path):
+    """Cached prices stay available while WITS is down, until they go stale."""
+    hub = FakeHub()
+    entry = ConfigEntry(
+        version=1, minor_version=1, domain="nz_wits", title=NODE,
+        data={"node": NODE}, source="user", options={}, unique_id=NODE,
+    )
+
+    async def test(hass):
+        live = WitsDataUpdateCoordinator(hass, hub, NODE, driven=True)
+        await live.async_refresh()
+        cached = dict(live.data)
+        # RTD was last fetched three hours before the restart
+        rtd = cached[SCHEDULE_RTD]
+        cached[SCHEDULE_RTD] = PriceSeries(
+            NODE,
+            array("q", [t - 3 * 3600 for t in rtd.timestamps]),
+            rtd.prices,
+            rtd.trading_periods,
+        )
+
+        hub.failing = set(PERIOD_OFFSETS)
+        coordinator = WitsDataUpdateCoordinator(hass, hub, NODE, driven=True)
+        coordinator.async_restore(cached)
+        sensors = {key: WitsPriceSensor(coordinator, entry, key, key) for key in PERIOD_OFFSETS}
+        await coordinator.async_refresh()
+
+        assert coordinator.last_update_success
+        assert not sensors[SCHEDULE_RTD].available
+        for key in (SCHEDULE_INTERIM, SCHEDULE_PRSS, SCHEDULE_PRSL):
+            assert sensors[key].available
+            assert sensors[key].extra_state_attributes["restored_from_cache"]
+            assert sensors[key].extra_state_attributes["last_fetch_error"]
+
+    run_with_hass(test, tmp_path)
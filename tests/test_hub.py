@@ -0,0 +1,71 @@
+"""Tests for batching node requests through the shared hub."""
+import asyncio
+
+from custom_components.nz_wits.const import MAX_CONCURRENT_REQUESTS, SCHEDULE_PRSL, SCHEDULE_RTD
+from custom_components.nz_wits.hub import WitsHub
+
+
+class FakeApiClient:
+    """Records the nodes of every batched request."""
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, list[str]]] = []
+
+    async def get_price_data_for_nodes(self, schedule_type, nodes, overrides):
+        self.requests.append((schedule_type, nodes))
+        return {node: [(0, 100.0, 1)] for node in nodes}
+
+
+def test_batch_covers_only_the_nodes_that_asked():
+    """Registered nodes that do not ask for a schedule are left out of its request."""
+    client = FakeApiClient()
+    hub = WitsHub(client)
+    for node in ("A", "B", "C"):
+        hub.register_node(node)
+
+    async def run():
+        await asyncio.gather(
+            hub.async_get_price_data(SCHEDULE_PRSL, "A", 0),
+            hub.async_get_price_data(SCHEDULE_PRSL, "B", 0),
+            hub.async_get_price_data(SCHEDULE_RTD, "C", 0),
+        )
+        # A node asking after the request was sent gets a batch of its own
+        first = asyncio.ensure_future(hub.async_get_price_data(SCHEDULE_RTD, "A", 0))
+        await asyncio.sleep(0.3)
+        await asyncio.gather(first, hub.async_get_price_data(SCHEDULE_RTD, "B", 0))
+
+    asyncio.run(run())
+    assert sorted(client.requests) == [
+        (SCHEDULE_PRSL, ["A", "B"]),
+        (SCHEDULE_RTD, ["A"]),
+        (SCHEDULE_RTD, ["B"]),
+        (SCHEDULE_RTD, ["C"]),
+    ]
+
+
+def test_hub_bounds_requests_in_flight():
+    """Batches beyond MAX_CONCURRENT_REQUESTS wait for a slot, whatever the node count."""
+
+    class SlowApiClient(FakeApiClient):
+        in_flight = peak = 0
+
+        async def get_price_data_for_nodes(self, schedule_type, nodes, overrides):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return await super().get_price_data_for_nodes(schedule_type, nodes, overrides)
+
+    client = SlowApiClient()
+    hub = WitsHub(client)
+
+    async def run():
+        # Different overrides cannot share a batch
+        await asyncio.gather(*(
+            hub.async_get_price_data(SCHEDULE_RTD, f"N{i}", 0, {"back": i + 1})
+            for i in range(10)
+        ))
+
+    asyncio.run(run())
+    assert len(client.requests) == 10
+    assert client.peak == MAX_CONCURRENT_REQUESTS
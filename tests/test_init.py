@@ -0,0 +1,170 @@
+"""Tests for setting up, reloading and unloading config entries."""
+import asyncio
+import functools
+from unittest import mock
+
+from homeassistant import config_entries, loader
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import (
+    device_registry as dr,
+    entity as entity_helper,
+    entity_registry as er,
+    issue_registry as ir,
+    translation,
+)
+from homeassistant.setup import async_setup_component
+
+from benchmarks.fake_wits import FakeWitsServer
+from custom_components.nz_wits import (
+    auth as auth_module,
+    cache as cache_module,
+    hub as hub_module,
+    resilience,
+)
+from custom_components.nz_wits.api import WitsApiClient
+from custom_components.nz_wits.auth import DATA_TOKENS, WitsTokenManager
+from custom_components.nz_wits.const import DOMAIN
+from custom_components.nz_wits.hub import DATA_HUBS
+from custom_components.nz_wits.session import DATA_SESSION
+
+CUSTOM_COMPONENTS = __file__.rsplit("/tests/", 1)[0] + "/custom_components"
+
+
+def run_with_fake_wits(test, tmp_path) -> None:
+    """Run an async test against Home Assistant with the integration talking to a local WITS."""
+    (tmp_path / "custom_components").symlink_to(CUSTOM_COMPONENTS)
+
+    async def run():
+        server = FakeWitsServer()
+        url = await server.start()
+        hass = HomeAssistant(str(tmp_path))
+        loader.async_setup(hass)
+        translation.async_setup(hass)
+        entity_helper.async_setup(hass)
+        await er.async_load(hass)
+        await dr.async_load(hass)
+        await ir.async_load(hass)
+        hass.config_entries = config_entries.ConfigEntries(hass, {})
+        await hass.config_entries.async_initialize()
+        await hass.async_start()
+        try:
+            with mock.patch.object(
+                hub_module, "WitsApiClient", functools.partial(WitsApiClient, base_url=url)
+            ), mock.patch.object(
+                auth_module, "WitsTokenManager", functools.partial(WitsTokenManager, base_url=url)
+            ), mock.patch.object(
+                cache_module, "CACHE_SAVE_DELAY", 0
+            ), mock.patch.dict(resilience._BREAKERS, clear=True):
+                await async_setup_component(hass, DOMAIN, {})
+                await test(hass, server)
+        finally:
+            await hass.async_stop(force=True)
+            await server.stop()
+
+    asyncio.run(run())
+
+
+async def async_add_entry(
+    hass: HomeAssistant, data: dict, options: dict | None = None
+) -> config_entries.ConfigEntry:
+    """Add and set up an entry."""
+    title = data.get("node") or ", ".join(data["nodes"])
+    entry = config_entries.ConfigEntry(
+        version=1, minor_version=1, domain=DOMAIN, title=title, data=data,
+        source="user", options=options or {}, unique_id=title,
+    )
+    await hass.config_entries.async_add(entry)
+    await hass.async_block_till_done()
+    assert entry.state is config_entries.ConfigEntryState.LOADED
+    return entry
+
+
+def test_reload_after_changing_node_or_credentials_releases_the_hub(tmp_path):
+    """The hub is released with the data the entry was set up with, not the edited data."""
+
+    async def test(hass, server):
+        data = {"client_id": "a", "client_secret": "s", "node": "N0001"}
+        entry = await async_add_entry(hass, data)
+        hubs = hass.data[DOMAIN][DATA_HUBS]
+
+        hass.config_entries.async_update_entry(entry, data={**data, "node": "N0002"})
+        await hass.async_block_till_done()
+        assert hubs["a"].nodes == ["N0002"]
+
+        hass.config_entries.async_update_entry(
+            entry, data={**data, "client_id": "b", "node": "N0002"}
+        )
+        await hass.async_block_till_done()
+        assert list(hubs) == ["b"]
+        assert hubs["b"].nodes == ["N0002"]
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        assert hubs == {}
+
+    run_with_fake_wits(test, tmp_path)
+
+
+def test_reload_with_new_credentials_stops_the_old_token_refresh(tmp_path):
+    """Dropping the old hub also stops its token manager from logging in in the background."""
+
+    async def test(hass, server):
+        data = {"client_id": "a", "client_secret": "s", "node": "N0001"}
+        entry = await async_add_entry(hass, data)
+        managers = hass.data[DOMAIN][DATA_TOKENS]
+        old_manager = managers["a"]
+        assert old_manager._refresh_handle is not None
+
+        hass.config_entries.async_update_entry(entry, data={**data, "client_id": "b"})
+        await hass.async_block_till_done()
+        assert list(managers) == ["b"]
+        assert old_manager._refresh_handle is None
+        assert not old_manager._background
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        assert managers == {}
+
+    run_with_fake_wits(test, tmp_path)
+
+
+def test_hub_entry_comes_up_from_the_cache_while_wits_is_down(tmp_path):
+    """A hub entry restores its nodes from their caches instead of waiting for WITS."""
+
+    async def test(hass, server):
+        data = {"client_id": "a", "client_secret": "s", "nodes": ["N0001", "N0002"]}
+        entry = await async_add_entry(hass, data)
+        await hass.config_entries.async_unload(entry.entry_id)
+
+        server.config.error_rate = 1.0
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        assert entry.state is config_entries.ConfigEntryState.LOADED
+        nodes = hass.data[DOMAIN][entry.entry_id].nodes
+        assert all(coordinator.restored for coordinator in nodes.values())
+
+    run_with_fake_wits(test, tmp_path)
+
+
+def test_dedicated_session_is_closed_once_no_entry_uses_it(tmp_path):
+    """Turning the option off on the last entry using the session closes it."""
+
+    async def test(hass, server):
+        first = await async_add_entry(
+            hass, {"client_id": "a", "client_secret": "s", "node": "N0001"},
+            {"dedicated_session": True},
+        )
+        second = await async_add_entry(
+            hass, {"client_id": "b", "client_secret": "s", "node": "N0002"},
+            {"dedicated_session": True},
+        )
+        wits_session = hass.data[DOMAIN][DATA_SESSION]
+
+        hass.config_entries.async_update_entry(first, options={"dedicated_session": False})
+        await hass.async_block_till_done()
+        assert hass.data[DOMAIN][DATA_SESSION] is wits_session
+        assert not wits_session.session.closed
+
+        await hass.config_entries.async_unload(second.entry_id)
+        await hass.async_block_till_done()
+        assert DATA_SESSION not in hass.data[DOMAIN]
+        assert wits_session.session.closed
+
+    run_with_fake_wits(test, tmp_path)
@@ -0,0 +1,84 @@
+"""Tests for the request engine's circuit breaker."""
+import asyncio
+
+import pytest
+
+from custom_components.nz_wits.exceptions import CannotConnect, InvalidAuth, RateLimited
+from custom_components.nz_wits.resilience import CircuitBreaker, RequestEngine, RequestPolicy
+
+
+def _half_open_engine() -> RequestEngine:
+    """Return an engine whose breaker has opened and is ready to probe."""
+    engine = RequestEngine("breaker.test", RequestPolicy(max_retries=0))
+    engine.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    engine.breaker.record_failure()
+    assert engine.breaker.state == "half_open"
+    return engine
+
+
+def test_probe_ending_in_invalid_auth_closes_breaker():
+    """A 401 means the host answered, so the probe completes."""
+    engine = _half_open_engine()
+
+    async def unauthorized():
+        raise InvalidAuth("Token is invalid")
+
+    async def ok():
+        return "prices"
+
+    async def run():
+        with pytest.raises(InvalidAuth):
+            await engine.async_call(unauthorized)
+        assert engine.breaker.state == "closed"
+        assert await engine.async_call(ok) == "prices"
+
+    asyncio.run(run())
+
+
+def test_cancelled_probe_lets_the_next_one_through():
+    """A probe cancelled mid-request releases the breaker without closing it."""
+    engine = _half_open_engine()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def ok():
+        return "prices"
+
+    async def run():
+        probe = asyncio.ensure_future(engine.async_call(hang))
+        await started.wait()
+        with pytest.raises(CannotConnect):
+            await engine.async_call(ok)  # Only one probe at a time
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert engine.breaker.state == "half_open"
+        assert await engine.async_call(ok) == "prices"
+        assert engine.breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_rate_limit_does_not_open_breaker_but_server_error_does():
+    """A 429 means the host is up; a 503 counts as a failure even with a Retry-After."""
+    engine = RequestEngine("breaker.test", RequestPolicy(max_retries=0))
+    engine.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=3600)
+
+    async def too_many_requests():
+        raise RateLimited("API asked us to slow down (HTTP 429)", 3600, 429)
+
+    async def unavailable():
+        raise RateLimited("API asked us to slow down (HTTP 503)", 3600, 503)
+
+    async def run():
+        with pytest.raises(RateLimited):
+            await engine.async_call(too_many_requests)
+        assert engine.breaker.state == "closed"
+        with pytest.raises(RateLimited):
+            await engine.async_call(unavailable)
+        assert engine.breaker.state == "open"
+
+    asyncio.run(run())
@@ -0,0 +1,21 @@
+"""Tests for choosing which sensors an entry creates."""
+from homeassistant.config_entries import ConfigEntry
+
+from custom_components.nz_wits.const import CONF_WINDOW_HOURS
+from custom_components.nz_wits.sensor import _wanted_sensors, _window_key
+
+NODE = "TGA0331"
+
+
+def test_windows_longer_than_the_forecast_are_skipped():
+    """PRSS covers three hours, so it gets no 4-hour window sensors; PRSL does."""
+    entry = ConfigEntry(
+        version=1, minor_version=1, domain="nz_wits", title=NODE,
+        data={"node": NODE}, source="user", options={CONF_WINDOW_HOURS: "1, 3, 4"},
+        unique_id=NODE,
+    )
+    wanted = _wanted_sensors(None, entry)
+    for cheapest in (True, False):
+        assert _window_key("PRSS", 3, cheapest) in wanted
+        assert _window_key("PRSS", 4, cheapest) not in wanted
+        assert _window_key("PRSL", 4, cheapest) in wanted
@@ -0,0 +1,24 @@
+"""Tests for the forecast service helpers."""
+from custom_components.nz_wits.const import TRADING_PERIOD_SECONDS
+from custom_components.nz_wits.series import PriceSeries
+from custom_components.nz_wits.services import _slice
+
+START = 1_700_000_000
+SERIES = PriceSeries.from_points(
+    "N0001", [(START + i * TRADING_PERIOD_SECONDS, float(i), i + 1) for i in range(4)]
+)
+END = START + 4 * TRADING_PERIOD_SECONDS
+
+
+def test_slice_keeps_the_periods_overlapping_the_range():
+    """Periods are kept if any part of them falls in [start, end)."""
+    assert list(_slice(SERIES, START - 60, None).prices) == [0, 1, 2, 3]
+    assert list(_slice(SERIES, START, START + 1).prices) == [0]
+    assert list(_slice(SERIES, START + 60, END - 60).prices) == [0, 1, 2, 3]
+    assert list(_slice(SERIES, END - 60, None).prices) == [3]
+
+
+def test_slice_starting_after_the_series_is_empty():
+    """A start after the last period ends gives no periods, not the last one."""
+    assert len(_slice(SERIES, END, None)) == 0
+    assert len(_slice(SERIES, END + 86400, END + 2 * 86400)) == 0